@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_password_reset_code_user_password_reset_expires'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized avatar URLs keyed by variant (thumb)'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:23
+
+from django.db import migrations, models
+
+# istartswith compiles to UPPER("col"::text) LIKE UPPER('term%') on PostgreSQL; trigram
+# indexes on that same expression serve it (and icontains) for the admin user search
+SEARCH_FIELDS = ['email', 'first_name', 'last_name']
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS accounts_user_{field}_trgm '
+            f'ON accounts_user USING gin ((UPPER({field}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS accounts_user_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-date_joined'], name='accounts_us_date_jo_bab293_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['user_type', 'is_active', '-date_joined'], name='accounts_us_user_ty_2f851d_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -13,6 +13,7 @@ class User(AbstractUser):
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='customer')
     phone = models.CharField(max_length=20, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, help_text='Resized avatar URLs keyed by variant (thumb)')
     date_of_birth = models.DateField(blank=True, null=True)
     address = models.TextField(blank=True, null=True)
     
@@ -28,6 +29,13 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['-date_joined']),
+            models.Index(fields=['user_type', 'is_active', '-date_joined']),
+        ]
+        # Prefix search on email/first_name/last_name uses trigram indexes on PostgreSQL (migration 0005)
+
     def __str__(self):
         return f"{self.username} ({self.user_type})"
     
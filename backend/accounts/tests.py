@@ -0,0 +1,51 @@
+import csv
+import io
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import User
+
+
+class ExportUsersTests(TestCase):
+    """The admin user export covers every user matching the list filters, not one page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='x', is_staff=True
+        )
+        for i in range(25):
+            User.objects.create_user(
+                username=f'customer{i}', email=f'customer{i}@example.com', password='x',
+                first_name='Ann' if i % 2 else 'Ben', user_type='customer', is_active=i != 0
+            )
+        User.objects.create_user(
+            username='owner', email='owner@example.com', password='x', first_name='=cmd', user_type='salon_owner'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_users'), params)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_exports_all_pages(self):
+        rows = self.export()
+        self.assertEqual(len(rows), User.objects.count())
+        self.assertEqual(rows[0]['email'], 'admin@example.com')
+
+    def test_applies_the_list_filters(self):
+        rows = self.export(user_type='customer', is_active='true', search='ann')
+        self.assertEqual(len(rows), 12)
+        self.assertEqual({row['first_name'] for row in rows}, {'Ann'})
+
+        owners = self.export(user_type='salon_owner')
+        self.assertEqual(owners[0]['first_name'], "'=cmd")
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.get(username='owner'))
+        self.assertEqual(self.client.get(reverse('export_users')).status_code, 403)
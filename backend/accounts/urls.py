@@ -7,6 +7,7 @@ urlpatterns = [
     path('login/', views.login_user, name='login'),
     path('google-login/', views.google_login, name='google_login'),
     path('users/', views.get_all_users, name='get_all_users'),
+    path('users/export/', views.export_users, name='export_users'),
     path('verify-email/', views.verify_email, name='verify_email'),
     path('resend-verification/', views.resend_verification_code, name='resend_verification'),
     path('request-password-reset/', views.request_password_reset, name='request_password_reset'),
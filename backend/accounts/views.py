@@ -5,7 +5,9 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, get_user_model
 from django.core.mail import send_mail
+from django.db.models import Count, Q
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from datetime import timedelta
@@ -17,6 +19,9 @@ from .utils import send_verification_email, send_password_reset_email, generate_
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 from activity_logger import log_user_activity
+from salon_booking.media import queue_image_variants
+from salon_booking.query_budget import query_budget
+from bookings.exports import FORMATS, csv_lines, export_filename, iterate_rows, jsonl_lines
 import requests as http_requests
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
@@ -62,6 +67,7 @@ def create_robust_google_request():
     return GoogleRequestWithTimeout(session=session)
 
 
+@query_budget(4)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_user(request):
@@ -149,6 +155,7 @@ def register_user(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@query_budget(5)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_user(request):
@@ -247,9 +254,42 @@ def login_user(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Columns of the admin user export
+USER_EXPORT_COLUMNS = [
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone', 'user_type',
+    'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+]
+
+
+def filter_users(users, params):
+    """Apply the user_type, is_active and search filters of the admin user list"""
+    user_type = params.get('user_type')
+    if user_type == 'admin':
+        users = users.filter(Q(is_staff=True) | Q(is_superuser=True))
+    elif user_type:
+        users = users.filter(user_type=user_type)
+    
+    is_active = params.get('is_active')
+    if is_active in ('true', 'false'):
+        users = users.filter(is_active=is_active == 'true')
+    
+    for term in params.get('search', '').split()[:5]:
+        users = users.filter(
+            Q(email__istartswith=term) | Q(first_name__istartswith=term) | Q(last_name__istartswith=term)
+        )
+    return users
+
+@query_budget(4)
 @api_view(['GET'])
 def get_all_users(request):
-    """Get all users (admin only)"""
+    """
+    List users a page at a time (admin only)
+
+    Filters: user_type (customer, salon_owner, or admin for staff accounts),
+    is_active (true/false) and search, matched as a prefix of the email,
+    first name or last name (every word must match). ?stats=1 adds the
+    per-type totals for the dashboard cards.
+    """
     try:
         # Check if user is admin
         if not request.user.is_staff and not request.user.is_superuser:
@@ -257,32 +297,76 @@ def get_all_users(request):
                 'error': 'Admin privileges required'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        users = User.objects.all().order_by('-date_joined')
-        users_data = []
+        users = filter_users(User.objects.order_by('-date_joined'), request.GET)
+        
+        # Paginate results
+        limit = min(int(request.GET.get('limit', 20)), 100)  # Max 100 per request
+        offset = int(request.GET.get('offset', 0))
+        
+        total_count = users.count()
+        users_data = list(users.values(
+            'id', 'username', 'email', 'first_name', 'last_name', 'user_type', 'phone',
+            'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login'
+        )[offset:offset + limit])
+        
+        response_data = {
+            'users': users_data,
+            'pagination': {
+                'total_count': total_count,
+                'limit': limit,
+                'offset': offset,
+                'has_more': offset + limit < total_count
+            }
+        }
+        
+        if request.GET.get('stats') == '1':
+            response_data['stats'] = User.objects.aggregate(
+                total=Count('id'),
+                customers=Count('id', filter=Q(user_type='customer')),
+                salon_owners=Count('id', filter=Q(user_type='salon_owner')),
+                admins=Count('id', filter=Q(is_staff=True) | Q(is_superuser=True)),
+            )
         
-        for user in users:
-            users_data.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'user_type': user.user_type,
-                'phone': user.phone,
-                'is_active': user.is_active,
-                'is_staff': user.is_staff,
-                'is_superuser': user.is_superuser,
-                'date_joined': user.date_joined,
-                'last_login': user.last_login
-            })
+        return Response(response_data, status=status.HTTP_200_OK)
         
-        return Response(users_data, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@query_budget(2)  # Rows are read while streaming, after the view returns
+@api_view(['GET'])
+def export_users(request):
+    """
+    Export every user matching the admin list filters (admin only)
+
+    file_type=csv (default) or jsonl; same user_type, is_active and search
+    filters as get_all_users, without paging.
+    """
+    try:
+        if not request.user.is_staff and not request.user.is_superuser:
+            return Response({
+                'error': 'Admin privileges required'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        file_format = request.GET.get('file_type', 'csv')
+        if file_format not in FORMATS:
+            return Response({
+                'error': f"file_type must be one of: {', '.join(FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rows = iterate_rows(filter_users(User.objects.all(), request.GET), USER_EXPORT_COLUMNS)
+        lines = csv_lines if file_format == 'csv' else jsonl_lines
+        response = StreamingHttpResponse(lines(USER_EXPORT_COLUMNS, rows), content_type=FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename("users", file_format)}"'
+        return response
         
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@query_budget(25)
 @api_view(['DELETE'])
 def delete_user(request, user_id):
     """Delete a user (admin only)"""
@@ -319,6 +403,7 @@ def delete_user(request, user_id):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@query_budget(3)
 @api_view(['PATCH'])
 def toggle_user_status(request, user_id):
     """Toggle user active status (admin only)"""
@@ -358,6 +443,7 @@ def toggle_user_status(request, user_id):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@query_budget(4)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_email(request):
@@ -445,6 +531,7 @@ def verify_email(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def resend_verification_code(request):
@@ -489,6 +576,7 @@ def resend_verification_code(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
 @csrf_exempt
 @api_view(['POST', 'OPTIONS'])
 @permission_classes([AllowAny])
@@ -646,6 +734,7 @@ def google_login(request):
         return Response(error_response, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def request_password_reset(request):
@@ -707,6 +796,7 @@ def request_password_reset(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(2)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_reset_code(request):
@@ -750,6 +840,7 @@ def verify_reset_code(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def reset_password(request):
@@ -811,6 +902,7 @@ def reset_password(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def update_profile(request):
@@ -861,6 +953,7 @@ def update_profile(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def change_password(request):
@@ -911,6 +1004,7 @@ def change_password(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(5)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_avatar(request):
@@ -938,9 +1032,10 @@ def upload_avatar(request):
                 'error': 'Only JPEG, PNG, and GIF images are allowed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save avatar to user profile
+        # Save avatar to user profile; the thumb variant is built in the background
         user.profile_picture = avatar
         user.save()
+        queue_image_variants(user, 'profile_picture', avatar)
         
         # Log activity
         log_user_activity(
@@ -971,6 +1066,7 @@ def upload_avatar(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(2)
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def update_preferences(request):
@@ -998,6 +1094,7 @@ def update_preferences(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(25)
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_account(request):
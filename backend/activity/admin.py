@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import ActivityEvent
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'action', 'actor_email', 'entity_type', 'entity_id', 'salon_id', 'ip_address']
+    list_filter = ['entity_type', 'created_at']
+    search_fields = ['actor_email', 'action']
+    readonly_fields = [
+        'action', 'actor', 'actor_email', 'entity_type', 'entity_id',
+        'salon', 'details', 'ip_address', 'created_at'
+    ]
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
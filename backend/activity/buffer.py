@@ -0,0 +1,99 @@
+"""
+In-process buffer for ActivityEvent rows
+log_*_activity calls append to a list; a flusher thread writes the list with
+one bulk_create every ACTIVITY_EVENT_BATCH_SIZE events or
+ACTIVITY_EVENT_FLUSH_INTERVAL seconds, whichever comes first.
+"""
+import os
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityEventBuffer:
+    """Thread-safe event buffer with one background flusher per process"""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.dropped = 0
+
+    def _ensure_flusher(self):
+        """Start the flusher thread (again after fork, threads do not survive it)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='activity-event-flusher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush)
+
+    def add(self, event):
+        """
+        Queue an unsaved ActivityEvent
+
+        Never touches the database. If the database is unreachable and the
+        buffer passes ACTIVITY_EVENT_MAX_BUFFER, the oldest events are dropped.
+        """
+        self._ensure_flusher()
+        with self._lock:
+            self._events.append(event)
+            overflow = len(self._events) - settings.ACTIVITY_EVENT_MAX_BUFFER
+            if overflow > 0:
+                del self._events[:overflow]
+                self.dropped += overflow
+            full = len(self._events) >= settings.ACTIVITY_EVENT_BATCH_SIZE
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.ACTIVITY_EVENT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write everything buffered so far. Returns the number of rows inserted."""
+        from .models import ActivityEvent
+
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            try:
+                # All or nothing, so a batch put back after a failure is never written twice
+                with transaction.atomic():
+                    ActivityEvent.objects.bulk_create(events, batch_size=settings.ACTIVITY_EVENT_BATCH_SIZE)
+                return len(events)
+            except Exception as e:
+                # Keep the batch ahead of newer events and retry it on the next flush
+                with self._lock:
+                    self._events[:0] = events
+                    overflow = len(self._events) - settings.ACTIVITY_EVENT_MAX_BUFFER
+                    if overflow > 0:
+                        del self._events[:overflow]
+                        self.dropped += overflow
+                logger.error(
+                    f"Activity event bulk insert failed, {len(events)} event(s) kept for the next flush"
+                    + (f", {overflow} oldest dropped" if overflow > 0 else '') + f": {e}"
+                )
+                return 0
+
+
+activity_buffer = ActivityEventBuffer()
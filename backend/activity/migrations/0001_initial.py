@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('salons', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=100)),
+                ('actor_email', models.CharField(blank=True, max_length=255)),
+                ('entity_type', models.CharField(choices=[('user', 'User'), ('salon', 'Salon'), ('booking', 'Booking'), ('transaction', 'Transaction')], max_length=20)),
+                ('entity_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('salon', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='salons.salon')),
+            ],
+            options={
+                'verbose_name': 'Activity Event',
+                'verbose_name_plural': 'Activity Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['actor', '-created_at'], name='activity_ac_actor_i_6c56ef_idx'), models.Index(fields=['entity_type', 'entity_id', '-created_at'], name='activity_ac_entity__ca1bd7_idx'), models.Index(fields=['salon', '-created_at'], name='activity_ac_salon_i_e90ad8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+
+class ActivityEvent(models.Model):
+    """
+    One row per log_*_activity call, for admin analytics
+    Written in batches by activity.buffer, never from the request thread
+    """
+    
+    ENTITY_TYPES = [
+        ('user', 'User'),
+        ('salon', 'Salon'),
+        ('booking', 'Booking'),
+        ('transaction', 'Transaction'),
+    ]
+    
+    action = models.CharField(max_length=100)
+    
+    # Who did it. No FK constraint: events are written after the fact and
+    # must survive (and not block) deletion of the user or salon.
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+    actor_email = models.CharField(max_length=255, blank=True)
+    
+    # What it happened to
+    entity_type = models.CharField(max_length=20, choices=ENTITY_TYPES)
+    entity_id = models.PositiveIntegerField(null=True, blank=True)
+    salon = models.ForeignKey(
+        'salons.Salon', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+    
+    details = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    
+    # Time of the call, not of the batched insert
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Activity Event'
+        verbose_name_plural = 'Activity Events'
+        indexes = [
+            models.Index(fields=['actor', '-created_at']),
+            models.Index(fields=['entity_type', 'entity_id', '-created_at']),
+            models.Index(fields=['salon', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.actor_email or 'system'} - {self.action}"
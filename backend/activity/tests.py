@@ -0,0 +1,59 @@
+from unittest import mock
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from .buffer import ActivityEventBuffer
+from .models import ActivityEvent
+
+
+class ActivityEventBufferTests(TestCase):
+    """Events survive a failed bulk insert and are written by the next flush"""
+
+    def setUp(self):
+        self.buffer = ActivityEventBuffer()
+        # No flusher thread: the test drives every flush
+        patcher = mock.patch.object(ActivityEventBuffer, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_events(self, count, start=0):
+        for i in range(start, start + count):
+            self.buffer.add(ActivityEvent(action=f'EVENT_{i}', entity_type='user', entity_id=i))
+
+    def fail_once(self):
+        bulk_create = QuerySet.bulk_create
+        calls = []
+
+        def flaky(queryset, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise DatabaseError('connection refused')
+            return bulk_create(queryset, *args, **kwargs)
+
+        return mock.patch.object(QuerySet, 'bulk_create', flaky)
+
+    def test_failed_flush_keeps_events_for_the_next_one(self):
+        self.add_events(3)
+        with self.fail_once():
+            self.assertEqual(self.buffer.flush(), 0)
+            self.assertEqual(ActivityEvent.objects.count(), 0)
+            self.add_events(2, start=3)
+            self.assertEqual(self.buffer.flush(), 5)
+
+        self.assertEqual(self.buffer.dropped, 0)
+        self.assertEqual(
+            sorted(ActivityEvent.objects.values_list('entity_id', flat=True)), [0, 1, 2, 3, 4]
+        )
+
+    @override_settings(ACTIVITY_EVENT_MAX_BUFFER=4)
+    def test_failed_flush_drops_only_the_oldest_past_the_limit(self):
+        self.add_events(3)
+        with self.fail_once():
+            self.buffer.flush()
+            self.add_events(3, start=3)
+            self.assertEqual(self.buffer.dropped, 2)
+            self.assertEqual(self.buffer.flush(), 4)
+
+        self.assertEqual(
+            sorted(ActivityEvent.objects.values_list('entity_id', flat=True)), [2, 3, 4, 5]
+        )
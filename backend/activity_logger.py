@@ -1,73 +1,117 @@
 """
 Activity Logger for Salon Booking System
-Tracks user and salon activities to separate log files
+Tracks user and salon activities to separate JSON-lines log files
 """
 import os
+import json
+import queue
+import ipaddress
+import atexit
 import logging
-from datetime import datetime
+import threading
+import logging.handlers
 from django.conf import settings
 from django.utils import timezone
+from salon_booking.log_handlers import ConcurrentRotatingFileHandler, JSONLineFormatter, NonBlockingQueueHandler
+
+# Logger name -> live JSON-lines file in ACTIVITY_LOG_DIR
+ACTIVITY_LOG_FILES = {
+    'user_activity': 'user_activities.jsonl',
+    'salon_activity': 'salon_activities.jsonl',
+}
+
 
 class ActivityLogger:
+    """
+    Writes one JSON object per line to the user and salon activity logs
+
+    log_* calls only build a dict and put it on an in-memory queue. A listener
+    thread (one per process, restarted after fork) does the file I/O and rotation.
+    """
+
     def __init__(self):
-        # Create logs directory if it doesn't exist
-        self.logs_dir = os.path.join(settings.BASE_DIR, 'logs')
-        if not os.path.exists(self.logs_dir):
-            os.makedirs(self.logs_dir)
-        
-        # Setup separate loggers for users and salons
-        self.setup_user_logger()
-        self.setup_salon_logger()
-    
-    def setup_user_logger(self):
-        """Setup logger for user activities"""
+        self.logs_dir = settings.ACTIVITY_LOG_DIR
+        os.makedirs(self.logs_dir, exist_ok=True)
+
         self.user_logger = logging.getLogger('user_activity')
-        self.user_logger.setLevel(logging.INFO)
-        
-        # Remove existing handlers to avoid duplicates
-        for handler in self.user_logger.handlers[:]:
-            self.user_logger.removeHandler(handler)
-        
-        # File handler for user activities
-        user_log_file = os.path.join(self.logs_dir, 'user_activities.txt')
-        user_handler = logging.FileHandler(user_log_file, encoding='utf-8')
-        user_handler.setLevel(logging.INFO)
-        
-        # Custom formatter for user logs
-        user_formatter = logging.Formatter(
-            '%(asctime)s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        user_handler.setFormatter(user_formatter)
-        self.user_logger.addHandler(user_handler)
-        
-        # Prevent propagation to root logger
-        self.user_logger.propagate = False
-    
-    def setup_salon_logger(self):
-        """Setup logger for salon activities"""
         self.salon_logger = logging.getLogger('salon_activity')
-        self.salon_logger.setLevel(logging.INFO)
-        
-        # Remove existing handlers to avoid duplicates
-        for handler in self.salon_logger.handlers[:]:
-            self.salon_logger.removeHandler(handler)
-        
-        # File handler for salon activities
-        salon_log_file = os.path.join(self.logs_dir, 'salon_activities.txt')
-        salon_handler = logging.FileHandler(salon_log_file, encoding='utf-8')
-        salon_handler.setLevel(logging.INFO)
-        
-        # Custom formatter for salon logs
-        salon_formatter = logging.Formatter(
-            '%(asctime)s | %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        salon_handler.setFormatter(salon_formatter)
-        self.salon_logger.addHandler(salon_handler)
-        
-        # Prevent propagation to root logger
-        self.salon_logger.propagate = False
+        self.queue_handler = None
+        self._listener = None
+        self._listener_pid = None
+        self._setup_lock = threading.Lock()
+
+    def setup_loggers(self):
+        """Start this process's queue listener (lazily, so forked workers get their own)"""
+        if self._listener_pid == os.getpid():
+            return
+
+        with self._setup_lock:
+            if self._listener_pid == os.getpid():
+                return
+
+            log_queue = queue.Queue(maxsize=settings.ACTIVITY_LOG_QUEUE_SIZE)
+            self.queue_handler = NonBlockingQueueHandler(log_queue)
+
+            file_handlers = []
+            for logger_name, file_name in ACTIVITY_LOG_FILES.items():
+                file_handler = ConcurrentRotatingFileHandler(
+                    os.path.join(self.logs_dir, file_name),
+                    max_bytes=settings.ACTIVITY_LOG_MAX_BYTES,
+                    when=settings.ACTIVITY_LOG_ROTATE_WHEN
+                )
+                file_handler.setFormatter(JSONLineFormatter())
+                # One queue feeds both files, route records by logger name
+                file_handler.addFilter(logging.Filter(logger_name))
+                file_handlers.append(file_handler)
+
+            for logger in (self.user_logger, self.salon_logger):
+                logger.setLevel(logging.INFO)
+                # Remove existing handlers to avoid duplicates
+                for handler in logger.handlers[:]:
+                    logger.removeHandler(handler)
+                logger.addHandler(self.queue_handler)
+                # Prevent propagation to root logger
+                logger.propagate = False
+
+            self._listener = logging.handlers.QueueListener(log_queue, *file_handlers)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+            atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Flush queued records to disk (called at interpreter exit)"""
+        listener = self._listener
+        if listener is None or self._listener_pid != os.getpid():
+            return
+        self._listener = None
+        self._listener_pid = None
+        try:
+            listener.stop()
+        except queue.Full:
+            pass
+        for handler in listener.handlers:
+            handler.close()
+
+    def _write(self, logger, activity):
+        self.setup_loggers()
+        activity = {'ts': timezone.localtime().isoformat(timespec='milliseconds'), **activity}
+        logger.info(activity['action'], extra={'activity': activity})
+
+    def _describe_user(self, user):
+        if hasattr(user, 'email'):
+            return {
+                'id': user.id,
+                'email': user.email,
+                'type': getattr(user, 'user_type', 'unknown')
+            }
+        return {'id': None, 'email': str(user), 'type': 'unknown'}
+
+    def _details(self, details):
+        if not details:
+            return {}
+        if isinstance(details, dict):
+            return dict(details)
+        return {'note': str(details)}
     
     def log_user_activity(self, user, action, details=None, ip_address=None):
         """
@@ -80,31 +124,13 @@ class ActivityLogger:
             ip_address: User's IP address
         """
         try:
-            # Format user info
-            if hasattr(user, 'email'):
-                user_info = f"{user.email} (ID: {user.id})"
-                user_type = getattr(user, 'user_type', 'unknown')
-            else:
-                user_info = str(user)
-                user_type = 'unknown'
-            
-            # Format details
-            details_str = ""
-            if details:
-                if isinstance(details, dict):
-                    details_list = [f"{k}: {v}" for k, v in details.items()]
-                    details_str = f" | Details: {', '.join(details_list)}"
-                else:
-                    details_str = f" | Details: {details}"
-            
-            # Format IP address
-            ip_str = f" | IP: {ip_address}" if ip_address else ""
-            
-            # Create log message
-            message = f"USER [{user_type.upper()}] {user_info} | Action: {action}{details_str}{ip_str}"
-            
-            # Log to file
-            self.user_logger.info(message)
+            self._write(self.user_logger, {
+                'stream': 'user',
+                'action': action,
+                'user': self._describe_user(user),
+                'details': self._details(details),
+                'ip': ip_address
+            })
             
         except Exception as e:
             print(f"Error logging user activity: {e}")
@@ -121,35 +147,19 @@ class ActivityLogger:
             ip_address: User's IP address
         """
         try:
-            # Format salon info
             if hasattr(salon, 'name'):
-                salon_info = f"{salon.name} (ID: {salon.id})"
-            else:
-                salon_info = str(salon)
-            
-            # Format user info
-            if hasattr(user, 'email'):
-                user_info = f"{user.email} (ID: {user.id})"
+                salon_info = {'id': salon.id, 'name': salon.name}
             else:
-                user_info = str(user)
-            
-            # Format details
-            details_str = ""
-            if details:
-                if isinstance(details, dict):
-                    details_list = [f"{k}: {v}" for k, v in details.items()]
-                    details_str = f" | Details: {', '.join(details_list)}"
-                else:
-                    details_str = f" | Details: {details}"
-            
-            # Format IP address
-            ip_str = f" | IP: {ip_address}" if ip_address else ""
+                salon_info = {'id': None, 'name': str(salon)}
             
-            # Create log message
-            message = f"SALON {salon_info} | User: {user_info} | Action: {action}{details_str}{ip_str}"
-            
-            # Log to file
-            self.salon_logger.info(message)
+            self._write(self.salon_logger, {
+                'stream': 'salon',
+                'action': action,
+                'salon': salon_info,
+                'user': self._describe_user(user),
+                'details': self._details(details),
+                'ip': ip_address
+            })
             
         except Exception as e:
             print(f"Error logging salon activity: {e}")
@@ -260,6 +270,34 @@ class ActivityLogger:
         except:
             return None
 
+    def record_event(self, action, user, entity_type, entity_id=None, salon_id=None, details=None, ip_address=None):
+        """Buffer an ActivityEvent row for the admin dashboard (written in batches)"""
+        if not settings.ACTIVITY_EVENTS_ENABLED:
+            return
+        try:
+            from activity.buffer import activity_buffer
+            from activity.models import ActivityEvent
+
+            try:
+                ip_address = str(ipaddress.ip_address(ip_address.strip())) if ip_address else None
+            except ValueError:
+                ip_address = None
+
+            activity_buffer.add(ActivityEvent(
+                action=action[:100],
+                actor_id=user.id if hasattr(user, 'email') else None,
+                actor_email=(user.email if hasattr(user, 'email') else str(user or ''))[:255],
+                entity_type=entity_type,
+                entity_id=entity_id,
+                salon_id=salon_id,
+                # Round-trip so one odd value (Decimal, date) cannot fail the whole batch insert
+                details=json.loads(json.dumps(self._details(details), default=str)),
+                ip_address=ip_address,
+                created_at=timezone.now()
+            ))
+        except Exception as e:
+            print(f"Error recording activity event: {e}")
+
 # Create global logger instance
 activity_logger = ActivityLogger()
 
@@ -268,18 +306,38 @@ def log_user_activity(user, action, details=None, request=None):
     """Convenience function to log user activity"""
     ip_address = activity_logger.get_client_ip(request) if request else None
     activity_logger.log_user_activity(user, action, details, ip_address)
+    activity_logger.record_event(
+        action, user, 'user',
+        entity_id=getattr(user, 'id', None),
+        details=details, ip_address=ip_address
+    )
 
 def log_salon_activity(salon, user, action, details=None, request=None):
     """Convenience function to log salon activity"""
     ip_address = activity_logger.get_client_ip(request) if request else None
     activity_logger.log_salon_activity(salon, user, action, details, ip_address)
+    activity_logger.record_event(
+        action, user, 'salon',
+        entity_id=getattr(salon, 'id', None), salon_id=getattr(salon, 'id', None),
+        details=details, ip_address=ip_address
+    )
 
 def log_booking_activity(booking, user, action, details=None, request=None):
     """Convenience function to log booking activity"""
     ip_address = activity_logger.get_client_ip(request) if request else None
     activity_logger.log_booking_activity(booking, user, action, details, ip_address)
+    activity_logger.record_event(
+        f"BOOKING {action}", user, 'booking',
+        entity_id=booking.id, salon_id=booking.salon_id,
+        details=details, ip_address=ip_address
+    )
 
 def log_transaction_activity(transaction, user, action, details=None, request=None):
     """Convenience function to log transaction activity"""
     ip_address = activity_logger.get_client_ip(request) if request else None
     activity_logger.log_transaction_activity(transaction, user, action, details, ip_address)
+    activity_logger.record_event(
+        f"PAYMENT {action}", user, 'transaction',
+        entity_id=transaction.id, salon_id=transaction.salon_id,
+        details=details, ip_address=ip_address
+    )
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import DailySalonStats, RollupWatermark
+
+
+@admin.register(DailySalonStats)
+class DailySalonStatsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'salon_id', 'service_id', 'payment_method', 'bookings', 'cancelled_bookings', 'payments', 'revenue']
+    list_filter = ['payment_method', 'date']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'value', 'updated_at']
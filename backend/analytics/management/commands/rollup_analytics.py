@@ -0,0 +1,28 @@
+"""
+Management command to update the daily analytics rollups
+Recomputes the salon-days with booking or transaction changes since the
+last run. Schedule it every few minutes, plus a nightly --full rebuild
+"""
+from django.core.management.base import BaseCommand
+from analytics.rollup import run_rollup
+
+
+class Command(BaseCommand):
+    help = 'Update DailySalonStats from bookings and transactions changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every salon instead of only the changed salon-days'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Salon-days (or salons with --full) per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        run_rollup(full=options['full'], batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Analytics rollup up to date'))
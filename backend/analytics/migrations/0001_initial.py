@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('salons', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySalonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(max_length=20)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('confirmed_bookings', models.PositiveIntegerField(default=0)),
+                ('completed_bookings', models.PositiveIntegerField(default=0)),
+                ('cancelled_bookings', models.PositiveIntegerField(default=0)),
+                ('payments', models.PositiveIntegerField(default=0, help_text='Completed payments')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Amount of completed payments', max_digits=12)),
+                ('platform_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('salon_payout', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('refunds', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pending_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('salon', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='salons.salon')),
+                ('service', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='salons.service')),
+            ],
+            options={
+                'verbose_name': 'Daily Salon Stats',
+                'verbose_name_plural': 'Daily Salon Stats',
+                'indexes': [models.Index(fields=['date'], name='analytics_d_date_887065_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalonstats',
+            constraint=models.UniqueConstraint(fields=('salon', 'date', 'service', 'payment_method'), name='analytics_daily_salon_stats_key'),
+        ),
+    ]
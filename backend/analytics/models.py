@@ -0,0 +1,60 @@
+from django.db import models
+
+
+class DailySalonStats(models.Model):
+    """
+    Daily booking and revenue figures per salon, service and payment method
+    Maintained by analytics.rollup; the dashboards read these instead of
+    aggregating Booking and Transaction rows on every request
+    """
+
+    date = models.DateField()
+    # No FK constraints: rows are rebuilt after the fact and must not block deleting a salon or service
+    salon = models.ForeignKey(
+        'salons.Salon', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    service = models.ForeignKey(
+        'salons.Service', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    payment_method = models.CharField(max_length=20)
+
+    # Bookings, by appointment date
+    bookings = models.PositiveIntegerField(default=0)
+    confirmed_bookings = models.PositiveIntegerField(default=0)
+    completed_bookings = models.PositiveIntegerField(default=0)
+    cancelled_bookings = models.PositiveIntegerField(default=0)
+
+    # Transactions, by the local date they were created
+    payments = models.PositiveIntegerField(default=0, help_text='Completed payments')
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='Amount of completed payments')
+    platform_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    salon_payout = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    refunds = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pending_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Daily Salon Stats'
+        verbose_name_plural = 'Daily Salon Stats'
+        constraints = [
+            # Also serves the per-salon date range reads of the dashboards
+            models.UniqueConstraint(
+                fields=['salon', 'date', 'service', 'payment_method'], name='analytics_daily_salon_stats_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} salon #{self.salon_id} service #{self.service_id} ({self.payment_method})"
+
+
+class RollupWatermark(models.Model):
+    """Newest source change a rollup has incorporated"""
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
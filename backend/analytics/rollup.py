@@ -0,0 +1,165 @@
+"""
+Incremental daily rollup of bookings and transactions into DailySalonStats
+
+A (salon, date) partition is the unit of work: whenever a booking or
+transaction in it changes, its rows are recomputed from the source tables
+and swapped in within one transaction. Changes are found through the
+updated_at columns since the last run's watermark, so a run only touches
+partitions with new activity.
+
+Not seen incrementally: hard deletes, QuerySet.update() calls that do not
+set updated_at, and a booking moved to another date (its old day keeps the
+booking until the next full rebuild). Run with --full now and then, e.g.
+nightly, to catch those.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from bookings.models import Booking, Transaction
+from salons.models import Salon
+from .models import DailySalonStats, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'daily_salon_stats'
+# Rows committed after the previous run started can carry an older updated_at; rescan that window
+OVERLAP = timedelta(minutes=5)
+
+COMPLETED_PAYMENT = Q(transaction_type='payment', status='completed')
+REFUND = Q(transaction_type__in=['refund', 'partial_refund'], status__in=['completed', 'refunded'])
+
+BOOKING_METRICS = {
+    'bookings': Count('id'),
+    'confirmed_bookings': Count('id', filter=Q(status='confirmed')),
+    'completed_bookings': Count('id', filter=Q(status='completed')),
+    'cancelled_bookings': Count('id', filter=Q(status='cancelled')),
+}
+
+TRANSACTION_METRICS = {
+    'payments': Count('id', filter=COMPLETED_PAYMENT),
+    'revenue': Sum('amount', filter=COMPLETED_PAYMENT),
+    'platform_fees': Sum('platform_fee', filter=COMPLETED_PAYMENT),
+    'salon_payout': Sum('salon_payout', filter=COMPLETED_PAYMENT),
+    'refunds': Sum('amount', filter=REFUND),
+    'pending_amount': Sum('amount', filter=Q(transaction_type='payment', status='pending')),
+}
+
+
+def build_rows(bookings, transactions):
+    """DailySalonStats rows (unsaved) for the given Booking and Transaction querysets"""
+    rows = {}
+
+    def row(salon_id, date, service_id, payment_method):
+        key = (salon_id, date, service_id, payment_method)
+        if key not in rows:
+            rows[key] = DailySalonStats(salon_id=salon_id, date=date, service_id=service_id, payment_method=payment_method)
+        return rows[key]
+
+    booking_groups = (
+        bookings.order_by()
+        .values('salon_id', 'booking_date', 'service_id', 'payment_method')
+        .annotate(**BOOKING_METRICS)
+    )
+    for group in booking_groups:
+        stats = row(group['salon_id'], group['booking_date'], group['service_id'], group['payment_method'])
+        for field in BOOKING_METRICS:
+            setattr(stats, field, group[field])
+
+    transaction_groups = (
+        transactions.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('salon_id', 'day', 'booking__service_id', 'payment_method')
+        .annotate(**TRANSACTION_METRICS)
+    )
+    for group in transaction_groups:
+        stats = row(group['salon_id'], group['day'], group['booking__service_id'], group['payment_method'])
+        for field in TRANSACTION_METRICS:
+            setattr(stats, field, group[field] or 0)
+
+    return list(rows.values())
+
+
+def changed_partitions(since):
+    """(salon_id, date) pairs with a booking or transaction updated after `since`"""
+    partitions = set(
+        Booking.objects.filter(updated_at__gt=since)
+        .order_by().values_list('salon_id', 'booking_date').distinct()
+    )
+    partitions.update(
+        Transaction.objects.filter(updated_at__gt=since)
+        .order_by().annotate(day=TruncDate('created_at'))
+        .values_list('salon_id', 'day').distinct()
+    )
+    return partitions
+
+
+def refresh_partitions(partitions):
+    """Recompute the given (salon_id, date) pairs; returns the number of rows written"""
+    dates_by_salon = defaultdict(set)
+    for salon_id, date in partitions:
+        dates_by_salon[salon_id].add(date)
+
+    stats_filter, booking_filter, transaction_filter = Q(pk__in=[]), Q(pk__in=[]), Q(pk__in=[])
+    for salon_id, dates in dates_by_salon.items():
+        stats_filter |= Q(salon_id=salon_id, date__in=dates)
+        booking_filter |= Q(salon_id=salon_id, booking_date__in=dates)
+        transaction_filter |= Q(salon_id=salon_id, created_at__date__in=dates)
+
+    rows = build_rows(Booking.objects.filter(booking_filter), Transaction.objects.filter(transaction_filter))
+    with transaction.atomic():
+        DailySalonStats.objects.filter(stats_filter).delete()
+        DailySalonStats.objects.bulk_create(rows)
+    return len(rows)
+
+
+def rebuild_salons(salon_ids):
+    """Recompute every day of the given salons; returns the number of rows written"""
+    rows = build_rows(Booking.objects.filter(salon_id__in=salon_ids), Transaction.objects.filter(salon_id__in=salon_ids))
+    with transaction.atomic():
+        DailySalonStats.objects.filter(salon_id__in=salon_ids).delete()
+        DailySalonStats.objects.bulk_create(rows)
+    return len(rows)
+
+
+def run_rollup(full=False, batch_size=500, log=logger.info):
+    """
+    Bring DailySalonStats up to date
+
+    Incremental unless `full` is set or the rollup never ran. batch_size is
+    the number of partitions (incremental) or salons (full) per transaction.
+    """
+    started_at = timezone.now()
+    started = time.monotonic()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    written = 0
+
+    if full or watermark is None:
+        salon_ids = list(Salon.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(salon_ids), batch_size):
+            written += rebuild_salons(salon_ids[start:start + batch_size])
+        # Salons deleted since the last rebuild
+        DailySalonStats.objects.exclude(salon_id__in=Salon.objects.values('id')).delete()
+        log(f"Rebuilt {len(salon_ids)} salon(s): {written} row(s) in {time.monotonic() - started:.1f}s")
+    else:
+        partitions = sorted(changed_partitions(watermark.value - OVERLAP))
+        for start in range(0, len(partitions), batch_size):
+            written += refresh_partitions(partitions[start:start + batch_size])
+        log(f"Refreshed {len(partitions)} salon-day(s): {written} row(s) in {time.monotonic() - started:.1f}s")
+
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'value': started_at})
+    return written
+
+
+def reset_watermark():
+    """Make the next run a full rebuild (after bulk loads that bypass updated_at)"""
+    RollupWatermark.objects.filter(name=WATERMARK).delete()
+
+
+def last_refreshed():
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return watermark.value if watermark else None
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('salon/', views.salon_analytics, name='salon_analytics'),
+    path('platform/', views.platform_analytics, name='platform_analytics'),
+]
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from salon_booking.query_budget import query_budget
+from .models import DailySalonStats
+from .rollup import last_refreshed
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+# group_by value -> DailySalonStats fields the rows are grouped on
+GROUPINGS = {
+    'day': ['date'],
+    'service': ['service_id', 'service__name'],
+    'payment_method': ['payment_method'],
+    'salon': ['salon_id', 'salon__name'],
+}
+
+METRICS = {
+    name: Sum(name) for name in [
+        'bookings', 'confirmed_bookings', 'completed_bookings', 'cancelled_bookings',
+        'payments', 'revenue', 'platform_fees', 'salon_payout', 'refunds', 'pending_amount',
+    ]
+}
+
+
+def format_metrics(values):
+    """Summed metrics plus the derived rates, JSON friendly"""
+    data = {name: values[name] or 0 for name in METRICS}
+    data['cancellation_rate'] = round(data['cancelled_bookings'] / data['bookings'], 4) if data['bookings'] else None
+    data['average_ticket'] = round(float(data['revenue'] / data['payments']), 2) if data['payments'] else None
+    for name in ['revenue', 'platform_fees', 'salon_payout', 'refunds', 'pending_amount']:
+        data[name] = float(data[name])
+    return data
+
+
+def analytics_report(request, stats, groupings):
+    """Rows grouped by the requested dimension plus totals, over date_from..date_to (inclusive)"""
+    group_by = request.GET.get('group_by', 'day')
+    if group_by not in groupings:
+        return Response({
+            'error': f"group_by must be one of: {', '.join(groupings)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        today = timezone.localdate()
+        date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() if request.GET.get('date_to') else today
+        date_from = (
+            datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from')
+            else date_to - timedelta(days=DEFAULT_DAYS - 1)
+        )
+    except ValueError:
+        return Response({
+            'error': 'Invalid date format. Use YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if date_from > date_to or (date_to - date_from).days >= MAX_DAYS:
+        return Response({
+            'error': f'date_from must be on or before date_to, at most {MAX_DAYS} days apart'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = stats.filter(date__range=(date_from, date_to))
+    fields = GROUPINGS[group_by]
+    rows = []
+    for group in stats.values(*fields).annotate(**METRICS).order_by(*fields):
+        row = {field.replace('__', '_'): group[field] for field in fields}
+        row.update(format_metrics(group))
+        rows.append(row)
+    refreshed = last_refreshed()
+
+    return Response({
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'group_by': group_by,
+        'rows': rows,
+        'totals': format_metrics(stats.aggregate(**METRICS)),
+        'refreshed_at': refreshed.isoformat() if refreshed else None,
+    }, status=status.HTTP_200_OK)
+
+
+@query_budget(5)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def salon_analytics(request):
+    """
+    Daily rollups for the salon owner's salons
+
+    Query parameters: date_from / date_to (YYYY-MM-DD, last 30 days by default),
+    group_by (day, service or payment_method) and optionally salon_id.
+    """
+    try:
+        salon_ids = list(request.user.owned_salons.values_list('id', flat=True))
+        if not salon_ids:
+            return Response({
+                'error': 'Access denied. User is not a salon owner.'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        if request.GET.get('salon_id'):
+            if not request.GET['salon_id'].isdigit() or int(request.GET['salon_id']) not in salon_ids:
+                return Response({
+                    'error': 'Salon not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            salon_ids = [int(request.GET['salon_id'])]
+
+        groupings = {name: fields for name, fields in GROUPINGS.items() if name != 'salon'}
+        return analytics_report(request, DailySalonStats.objects.filter(salon_id__in=salon_ids), groupings)
+
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@query_budget(4)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def platform_analytics(request):
+    """
+    Daily rollups across all salons (admin only)
+
+    Same parameters as salon_analytics; group_by also accepts salon.
+    """
+    try:
+        if not request.user.is_staff and not request.user.is_superuser:
+            return Response({
+                'error': 'Admin privileges required'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        return analytics_report(request, DailySalonStats.objects.all(), GROUPINGS)
+
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,14 +1,25 @@
+from decimal import Decimal
 from django.contrib import admin
+from django.db import models
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Subquery
+from django.db.models.functions import Substr
 from django.urls import reverse
 from django.utils.html import format_html
-from .models import Booking, Transaction, Chat, Message
+from django.utils import timezone
+from salon_booking.admin_tools import AutocompleteFilter, LargeTableAdmin
+from .models import Booking, Transaction, Chat, Message, StripeEvent
+
+# Default rate of Transaction.calculate_platform_fee()
+PLATFORM_FEE_RATE = Decimal('0.03')
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LargeTableAdmin):
     list_display = ['customer_name', 'salon', 'service', 'booking_date', 'booking_time', 'status', 'payment_status', 'price', 'created_at']
-    list_filter = ['status', 'payment_status', 'booking_date', 'created_at', 'salon']
-    search_fields = ['customer_name', 'customer_email', 'salon__name', 'service__name', 'paypal_order_id']
+    list_filter = ['status', 'payment_status', 'booking_date', 'created_at', ('salon', AutocompleteFilter)]
+    # Prefix matches (^) and exact ids (=) instead of substring scans across joins
+    search_fields = ['^customer_name', '^customer_email', '^salon__name', '=paypal_order_id', '=payment_id']
+    autocomplete_fields = ['customer', 'salon', 'service']
     readonly_fields = ['created_at', 'updated_at', 'total_amount']
     
     fieldsets = (
@@ -27,24 +38,24 @@ class BookingAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('customer', 'salon', 'service')
+        return super().get_queryset(request).select_related('customer', 'salon', 'service__salon')
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(LargeTableAdmin):
     list_display = [
         'transaction_id_display', 'customer_info', 'salon_info', 'transaction_type', 
         'amount_display', 'status', 'payment_method', 'created_at'
     ]
     list_filter = [
         'transaction_type', 'status', 'payment_method', 'currency', 
-        'created_at', 'salon', 'booking__service'
+        'created_at', ('salon', AutocompleteFilter), ('booking__service', AutocompleteFilter)
     ]
     search_fields = [
-        'customer__email', 'customer__first_name', 'customer__last_name',
-        'salon__name', 'payment_provider_id', 'payment_provider_transaction_id',
-        'booking__customer_name'
+        '^customer__email', '^salon__name', '=payment_provider_id', '=payment_provider_transaction_id',
+        '^booking__customer_name'
     ]
+    autocomplete_fields = ['customer', 'salon']
     readonly_fields = [
         'created_at', 'updated_at', 'net_amount_display', 'booking_link'
     ]
@@ -124,22 +135,25 @@ class TransactionAdmin(admin.ModelAdmin):
     # Custom actions
     actions = ['mark_as_completed', 'mark_as_failed', 'calculate_fees']
     
+    # updated_at is set explicitly: update() skips auto_now, and the analytics rollup finds changes by it
     def mark_as_completed(self, request, queryset):
-        updated = queryset.update(status='completed')
+        updated = queryset.update(status='completed', updated_at=timezone.now())
         self.message_user(request, f'{updated} transactions marked as completed.')
     mark_as_completed.short_description = 'Mark selected transactions as completed'
     
     def mark_as_failed(self, request, queryset):
-        updated = queryset.update(status='failed')
+        updated = queryset.update(status='failed', updated_at=timezone.now())
         self.message_user(request, f'{updated} transactions marked as failed.')
     mark_as_failed.short_description = 'Mark selected transactions as failed'
     
     def calculate_fees(self, request, queryset):
-        updated = 0
-        for transaction in queryset:
-            transaction.calculate_platform_fee()
-            transaction.save()
-            updated += 1
+        """Transaction.calculate_platform_fee() with the default 3%, as one UPDATE"""
+        fee = ExpressionWrapper(F('amount') * PLATFORM_FEE_RATE, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+        updated = queryset.update(
+            platform_fee=fee,
+            salon_payout=ExpressionWrapper(F('amount') - fee, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+            updated_at=timezone.now(),
+        )
         self.message_user(request, f'Platform fees calculated for {updated} transactions.')
     calculate_fees.short_description = 'Calculate platform fees for selected transactions'
 
@@ -153,10 +167,11 @@ class MessageInline(admin.TabularInline):
 
 
 @admin.register(Chat)
-class ChatAdmin(admin.ModelAdmin):
+class ChatAdmin(LargeTableAdmin):
     list_display = ['customer', 'salon', 'created_at', 'last_message_preview', 'unread_count_customer', 'unread_count_salon', 'is_active']
-    list_filter = ['is_active', 'created_at', 'salon']
-    search_fields = ['customer__email', 'customer__first_name', 'customer__last_name', 'salon__name']
+    list_filter = ['is_active', 'created_at', ('salon', AutocompleteFilter)]
+    search_fields = ['^customer__email', '^customer__first_name', '^customer__last_name', '^salon__name']
+    autocomplete_fields = ['customer', 'salon', 'booking']
     readonly_fields = ['created_at', 'updated_at']
     inlines = [MessageInline]
     
@@ -170,22 +185,38 @@ class ChatAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        # The computed columns come from subqueries, evaluated for the displayed page only
+        last_message = Message.objects.filter(chat=OuterRef('pk')).order_by('-sent_at')
+        unread = Message.objects.filter(chat=OuterRef('pk'), is_read=False).order_by().values('chat')
+        return super().get_queryset(request).select_related('customer', 'salon').annotate(
+            last_message_sender=Subquery(last_message.values('sender_type')[:1]),
+            last_message_content=Subquery(last_message.annotate(preview=Substr('content', 1, 50)).values('preview')[:1]),
+            unread_for_customer=Subquery(
+                unread.filter(sender_type='salon').annotate(count=Count('pk')).values('count'),
+                output_field=models.IntegerField()
+            ),
+            unread_for_salon=Subquery(
+                unread.filter(sender_type='customer').annotate(count=Count('pk')).values('count'),
+                output_field=models.IntegerField()
+            ),
+        )
+    
     def last_message_preview(self, obj):
-        if obj.last_message:
-            content = obj.last_message.content[:50]
-            return f"{obj.last_message.sender_type}: {content}..."
+        if obj.last_message_sender:
+            return f"{obj.last_message_sender}: {obj.last_message_content}..."
         return 'No messages yet'
     last_message_preview.short_description = 'Last Message'
     
     def unread_count_customer(self, obj):
-        count = obj.unread_count_for_customer
+        count = obj.unread_for_customer or 0
         if count > 0:
             return format_html('<span style="color: #dc3545; font-weight: bold;">{}</span>', count)
         return 0
     unread_count_customer.short_description = 'Unread (Customer)'
     
     def unread_count_salon(self, obj):
-        count = obj.unread_count_for_salon
+        count = obj.unread_for_salon or 0
         if count > 0:
             return format_html('<span style="color: #dc3545; font-weight: bold;">{}</span>', count)
         return 0
@@ -193,10 +224,12 @@ class ChatAdmin(admin.ModelAdmin):
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(LargeTableAdmin):
     list_display = ['chat', 'sender_type', 'message_type', 'content_preview', 'sent_at', 'is_read']
-    list_filter = ['sender_type', 'message_type', 'is_read', 'sent_at']
-    search_fields = ['content', 'chat__customer__email', 'chat__salon__name']
+    list_filter = ['sender_type', 'message_type', 'is_read', 'sent_at', ('chat__salon', AutocompleteFilter)]
+    # No substring search over message content: it scans the whole table
+    search_fields = ['^chat__customer__email', '^chat__salon__name']
+    autocomplete_fields = ['chat', 'related_booking']
     readonly_fields = ['sent_at', 'read_at']
     
     fieldsets = (
@@ -218,3 +251,22 @@ class MessageAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('chat', 'chat__customer', 'chat__salon')
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'status', 'attempts', 'stripe_created_at', 'received_at', 'processed_at']
+    list_filter = ['status', 'event_type', 'received_at']
+    search_fields = ['event_id']
+    readonly_fields = [
+        'event_id', 'event_type', 'payload', 'attempts', 'last_error',
+        'stripe_created_at', 'received_at', 'processed_at'
+    ]
+
+    # Custom actions
+    actions = ['retry_events']
+
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status='processed').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} events queued for processing.')
+    retry_events.short_description = 'Retry selected events'
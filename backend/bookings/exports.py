@@ -0,0 +1,185 @@
+"""
+CSV and JSONL exports of transactions and bookings
+
+Rows are read as value tuples (related names joined in the same query) with
+QuerySet.iterator(chunk_size=...), which on PostgreSQL uses a server-side
+cursor, and written out one line at a time, so memory stays flat however
+many rows are exported. Behind a transaction-mode pooler server-side cursors
+are disabled (DB_POOL_MODE=pgbouncer); exports then walk the primary key in
+chunks instead.
+
+Used by the export endpoints in bookings.views and by `manage.py export_data`;
+the admin user export in accounts.views reuses the row and line writers.
+"""
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.db import connections
+from django.utils import timezone
+from .models import Booking, Transaction
+
+CHUNK_SIZE = 2000
+# Customer-entered text starting with one of these is a formula to Excel and LibreOffice
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Export column -> queryset lookup
+TRANSACTION_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('processed_at', 'processed_at'),
+    ('salon_id', 'salon_id'),
+    ('salon_name', 'salon__name'),
+    ('booking_id', 'booking_id'),
+    ('booking_date', 'booking__booking_date'),
+    ('service_name', 'booking__service__name'),
+    ('customer_name', 'booking__customer_name'),
+    ('customer_email', 'customer__email'),
+    ('transaction_type', 'transaction_type'),
+    ('status', 'status'),
+    ('payment_method', 'payment_method'),
+    ('currency', 'currency'),
+    ('amount', 'amount'),
+    ('platform_fee', 'platform_fee'),
+    ('salon_payout', 'salon_payout'),
+    ('payment_provider_id', 'payment_provider_id'),
+    ('payment_provider_transaction_id', 'payment_provider_transaction_id'),
+]
+
+BOOKING_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('salon_id', 'salon_id'),
+    ('salon_name', 'salon__name'),
+    ('service_name', 'service__name'),
+    ('booking_date', 'booking_date'),
+    ('booking_time', 'booking_time'),
+    ('duration', 'duration'),
+    ('customer_name', 'customer_name'),
+    ('customer_email', 'customer_email'),
+    ('customer_phone', 'customer_phone'),
+    ('status', 'status'),
+    ('payment_status', 'payment_status'),
+    ('payment_method', 'payment_method'),
+    ('price', 'price'),
+    ('payment_id', 'payment_id'),
+]
+
+EXPORTS = {
+    'transactions': (Transaction, TRANSACTION_COLUMNS),
+    'bookings': (Booking, BOOKING_COLUMNS),
+}
+
+
+def parse_date_range(params):
+    """date_from / date_to (YYYY-MM-DD, inclusive); ValueError on a bad date"""
+    date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') else None
+    date_to = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') else None
+    return date_from, date_to
+
+
+def filter_transactions(transactions, params):
+    """
+    Apply the date_from / date_to, status and payment_method filters (comma-separated)
+
+    The date range is a plain created_at range so the (salon, created_at) index applies.
+    """
+    date_from, date_to = parse_date_range(params)
+    if date_from:
+        transactions = transactions.filter(created_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        transactions = transactions.filter(created_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    if params.get('status'):
+        transactions = transactions.filter(status__in=params['status'].split(','))
+    if params.get('payment_method'):
+        transactions = transactions.filter(payment_method__in=params['payment_method'].split(','))
+    return transactions
+
+
+def filter_bookings(bookings, params):
+    """Apply the date_from / date_to (appointment date), status and payment_status filters"""
+    date_from, date_to = parse_date_range(params)
+    if date_from:
+        bookings = bookings.filter(booking_date__gte=date_from)
+    if date_to:
+        bookings = bookings.filter(booking_date__lte=date_to)
+    if params.get('status'):
+        bookings = bookings.filter(status__in=params['status'].split(','))
+    if params.get('payment_status'):
+        bookings = bookings.filter(payment_status__in=params['payment_status'].split(','))
+    return bookings
+
+
+FILTERS = {
+    'transactions': filter_transactions,
+    'bookings': filter_bookings,
+}
+
+
+def iterate_rows(queryset, lookups, chunk_size=CHUNK_SIZE):
+    """Yield value tuples in primary key order without holding more than a chunk in memory"""
+    queryset = queryset.order_by('pk').values_list(*lookups)
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    # No named cursors: walk the primary key (the first lookup) a chunk at a time
+    last_pk = None
+    while True:
+        chunk = list((queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1][0]
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """File-like object handing each line csv.writer produces straight back"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    """Plain value for a CSV cell; text a spreadsheet would run as a formula is quoted with a leading '"""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return _plain(value)
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def jsonl_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(_plain, row))), ensure_ascii=False) + '\n'
+
+
+def export_lines(kind, queryset, file_format, chunk_size=CHUNK_SIZE):
+    """Lines of the export of `queryset` (already filtered) as csv or jsonl"""
+    _, columns = EXPORTS[kind]
+    headers = [header for header, _ in columns]
+    rows = iterate_rows(queryset, [lookup for _, lookup in columns], chunk_size)
+    return csv_lines(headers, rows) if file_format == 'csv' else jsonl_lines(headers, rows)
+
+
+def export_filename(kind, file_format):
+    return f"{kind}-{timezone.localdate().strftime('%Y%m%d')}.{file_format}"
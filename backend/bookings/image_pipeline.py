@@ -0,0 +1,186 @@
+"""
+Chat image pipeline
+Validates chat image uploads, stages them on local disk and builds the
+web and thumbnail variants in a background worker. Images lost with their
+worker are queued again from the staged upload by recover_chat_images().
+"""
+import uuid
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from salon_booking.background import run_in_background
+from salon_booking.media import (
+    ImageValidationError, delete_stale_staged_uploads, open_staged_image, render_variant, stage_upload
+)
+from salon_booking.media import validate_image_upload as validate_media_upload
+from salon_booking.storage import get_upload_temp_storage
+
+logger = logging.getLogger(__name__)
+
+CHAT_IMAGE_MAX_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Longest edge in pixels and JPEG quality for each stored variant
+WEB_VARIANT = (1280, 82)
+THUMBNAIL_VARIANT = (320, 75)
+
+
+def validate_image_upload(upload):
+    """Validate a chat image upload (size, type and contents)"""
+    validate_media_upload(upload, CHAT_IMAGE_MAX_SIZE)
+
+
+def process_chat_image(message_id, staged_name):
+    """
+    Build the web and thumbnail variants for a chat message (runs in the worker)
+
+    Args:
+        message_id: Message primary key
+        staged_name: Name of the raw upload in temp storage
+    """
+    from .models import Message
+
+    temp_storage = get_upload_temp_storage()
+    message = Message.objects.filter(id=message_id).first()
+
+    try:
+        if not message:
+            logger.warning(f"Chat image for deleted message #{message_id} discarded")
+            return
+
+        image = open_staged_image(staged_name)
+
+        base_name = uuid.uuid4().hex
+        message.image.save(f'{base_name}.jpg', render_variant(image, *WEB_VARIANT), save=False)
+        message.image_thumbnail.save(f'{base_name}.jpg', render_variant(image, *THUMBNAIL_VARIANT), save=False)
+        message.image_status = 'ready'
+        message.image_staged_name = ''
+        message.save(update_fields=['image', 'image_thumbnail', 'image_status', 'image_staged_name'])
+
+        logger.info(f"Chat image processed for message #{message_id}")
+
+    except Exception as e:
+        logger.error(f"Chat image processing failed for message #{message_id}: {e}", exc_info=True)
+        if message:
+            Message.objects.filter(id=message_id).update(image_status='failed', image_staged_name='')
+
+    finally:
+        temp_storage.delete(staged_name)
+
+
+def queue_chat_image(message, upload):
+    """Stage a validated upload and hand it to the background worker"""
+    message.image_staged_name = stage_upload(upload, 'chat_images')
+    message.image_queued_at = timezone.now()
+    message.image_attempts = 1
+    message.save(update_fields=['image_staged_name', 'image_queued_at', 'image_attempts'])
+    run_in_background(process_chat_image, message.id, message.image_staged_name)
+
+
+def stale_processing_cutoff():
+    """Images queued before this and still processing were lost with their worker (deploy or restart)"""
+    return timezone.now() - timedelta(minutes=settings.CHAT_IMAGE_STALE_MINUTES)
+
+
+def requeue_stale_chat_images():
+    """
+    Queue chat images lost with their worker again; returns (requeued, failed)
+
+    Each is processed again from its staged upload. Images whose upload is gone
+    (another container) or that were already tried CHAT_IMAGE_MAX_ATTEMPTS
+    times are marked failed. The conditional update keeps two processes from
+    queuing the same image.
+    """
+    from .models import Message
+
+    temp_storage = get_upload_temp_storage()
+    cutoff = stale_processing_cutoff()
+    requeued = failed = 0
+    stale = Message.objects.filter(image_status='processing').filter(
+        Q(image_queued_at__lt=cutoff) | Q(image_queued_at__isnull=True)
+    ).only('id', 'image_staged_name', 'image_queued_at', 'image_attempts')
+
+    for message in stale:
+        claimed = Message.objects.filter(
+            id=message.id, image_status='processing', image_queued_at=message.image_queued_at
+        )
+        staged_name = message.image_staged_name
+        if (
+            not staged_name
+            or message.image_attempts >= settings.CHAT_IMAGE_MAX_ATTEMPTS
+            or not temp_storage.exists(staged_name)
+        ):
+            if claimed.update(image_status='failed', image_staged_name=''):
+                failed += 1
+                logger.warning(f"Chat image for message #{message.id} lost with its worker, marked failed")
+                if staged_name:
+                    temp_storage.delete(staged_name)
+            continue
+
+        if claimed.update(image_queued_at=timezone.now(), image_attempts=F('image_attempts') + 1):
+            requeued += 1
+            logger.info(f"Chat image for message #{message.id} queued again")
+            run_in_background(process_chat_image, message.id, staged_name)
+
+    return requeued, failed
+
+
+def delete_orphaned_uploads():
+    """Delete staged uploads older than the stale cutoff that no processing image still needs"""
+    from .models import Message
+
+    in_use = set(
+        Message.objects.filter(image_status='processing').exclude(image_staged_name='')
+        .values_list('image_staged_name', flat=True)
+    )
+    return delete_stale_staged_uploads(stale_processing_cutoff(), keep=in_use)
+
+
+def recover_chat_images():
+    """
+    Requeue lost chat images and clear orphaned uploads, then check again
+    once the oldest image still processing could be stale
+
+    Started by every gunicorn worker as it boots (gunicorn.conf.py), so the
+    worker that replaces a dead one picks up what it left behind.
+    """
+    from .models import Message
+
+    requeued, failed = requeue_stale_chat_images()
+    deleted = delete_orphaned_uploads()
+    if requeued or failed or deleted:
+        logger.info(f"Chat image recovery: {requeued} queued again, {failed} failed, {deleted} orphaned upload(s) deleted")
+
+    oldest = Message.objects.filter(image_status='processing').aggregate(oldest=Min('image_queued_at'))['oldest']
+    if oldest is not None and not settings.BACKGROUND_TASKS_EAGER:
+        delay = (oldest - stale_processing_cutoff()).total_seconds() + 1
+        timer = threading.Timer(max(1.0, delay), run_in_background, args=(recover_chat_images,))
+        timer.daemon = True
+        timer.start()
+    return requeued, failed, deleted
+
+
+def chat_image_fields(message):
+    """
+    Image fields for a serialized chat message
+
+    `image` is the web variant, `image_thumbnail` is meant for chat lists.
+    While processing, both point at the placeholder.
+    """
+    if message.image_status == 'processing':
+        placeholder = settings.CHAT_IMAGE_PLACEHOLDER_URL
+        return {
+            'image': placeholder,
+            'image_thumbnail': placeholder,
+            'image_status': message.image_status
+        }
+
+    image_url = message.image.url if message.image else None
+    thumbnail_url = message.image_thumbnail.url if message.image_thumbnail else image_url
+    return {
+        'image': image_url,
+        'image_thumbnail': thumbnail_url,
+        'image_status': message.image_status
+    }
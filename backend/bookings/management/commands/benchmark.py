@@ -0,0 +1,151 @@
+"""
+Management command to load-test the booking flows
+Seeds data with salon_booking.datagen, replays a realistic request mix and reports latency
+percentiles and throughput per endpoint as JSON
+
+By default the app is served in-process with Stripe, PayPal, Brevo and Google
+stubbed out. For numbers closer to production, start the server separately
+(e.g. `gunicorn salon_booking.benchmark_wsgi`, same database) and pass --url.
+
+    python manage.py benchmark --duration 60 --concurrency 16 --output before.json
+"""
+import json
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from salon_booking import benchmark
+from salon_booking.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Seed benchmark data and measure API latency under a realistic request mix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salons', type=int, default=50, help='Salons to seed (default: 50)')
+        parser.add_argument('--services-per-salon', type=int, default=6, help='Services per salon (default: 6)')
+        parser.add_argument('--customers', type=int, default=500, help='Customers to seed (default: 500)')
+        parser.add_argument('--bookings', type=int, default=5000, help='Bookings to seed (default: 5000)')
+        parser.add_argument(
+            '--skip-seed',
+            action='store_true',
+            help='Reuse the benchmark data left by a previous run'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for data and request mix (default: 42)')
+        parser.add_argument(
+            '--url',
+            default=None,
+            help='Benchmark an already running server instead of an in-process one'
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+        parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds (default: 30)')
+        parser.add_argument('--warmup', type=float, default=5.0, help='Unmeasured seconds before (default: 5)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help=f"Only run the named scenario (repeatable): {', '.join(benchmark.SCENARIOS)}"
+        )
+        parser.add_argument(
+            '--mix',
+            choices=list(benchmark.MIXES),
+            default='default',
+            help='Scenario weights: production-like (default) or I/O-heavy (io)'
+        )
+        parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or list(benchmark.SCENARIOS)
+        unknown = set(scenarios) - set(benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario: {', '.join(sorted(unknown))}")
+        weights = benchmark.MIXES[options['mix']]
+        mix = {name: weights[name] for name in scenarios if name in weights}
+        if not mix:
+            raise CommandError(f"None of the scenarios is part of the {options['mix']} mix")
+
+        dataset = None
+        if not options['skip_seed']:
+            dataset = DataGenerator(
+                salons=options['salons'],
+                services_per_salon=options['services_per_salon'],
+                customers=options['customers'],
+                bookings=options['bookings'],
+                seed=options['seed'],
+                log=self.stderr.write,
+            ).run()
+
+        try:
+            data = benchmark.BenchmarkData(sample_size=max(50, options['concurrency'] * 10), seed=options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            benchmark.install_stubs()
+            server = benchmark.start_server()
+            base_url = f'http://127.0.0.1:{server.server_port}'
+
+        self.stderr.write(
+            f"Running {', '.join(mix)} against {base_url} with {options['concurrency']} client(s) "
+            f"for {options['warmup']:.0f}s warmup + {options['duration']:.0f}s"
+        )
+        started_at = timezone.now()
+        try:
+            samples, elapsed = benchmark.run_load(
+                base_url,
+                data,
+                mix,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            )
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'started_at': started_at.isoformat(),
+                'target': base_url if options['url'] else 'in-process',
+                # Unknown for an external server: it must serve salon_booking.benchmark_wsgi
+                'stubs': True if not options['url'] else None,
+                'database': connection.vendor,
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'scenarios': mix,
+                'dataset': dataset,
+            },
+            **benchmark.summarize(samples, elapsed),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            total = report['total']
+            self.stdout.write(self.style.SUCCESS(
+                f"{total['requests']} requests, {total['throughput_rps']} req/s, "
+                f"p50 {total['latency_ms']['p50']}ms, p95 {total['latency_ms']['p95']}ms, "
+                f"p99 {total['latency_ms']['p99']}ms, {total['errors']} error(s). Report: {options['output']}"
+            ))
+        else:
+            self.stdout.write(output)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,131 @@
+"""
+Management command to compare gunicorn worker profiles under I/O-heavy load
+Starts gunicorn once per GUNICORN_PROFILE (see gunicorn.conf.py) with the
+providers stubbed to a fixed round trip, replays the same request mix against
+each and reports throughput and latency side by side as JSON
+
+Uses the data set left by `manage.py benchmark` or `manage.py seed_data`, and
+the database the settings point at (PostgreSQL for meaningful numbers):
+
+    python manage.py benchmark_profiles --stub-latency 200 --concurrency 64 --output profiles.json
+
+gevent only starts with DB_POOL_MODE=pgbouncer and a GUNICORN_DB_CONNECTIONS
+budget that fits its greenlets, e.g. GUNICORN_DB_CONNECTIONS=500.
+"""
+import json
+import os
+import socket
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from salon_booking import benchmark
+
+PROFILES = ['sync', 'gthread', 'gevent']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the sync, gthread and gevent gunicorn profiles against each other'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            action='append',
+            dest='profiles',
+            choices=PROFILES,
+            help='Only run the named profile (repeatable; default: all)'
+        )
+        parser.add_argument(
+            '--stub-latency',
+            type=int,
+            default=200,
+            help='Simulated provider round trip in milliseconds (default: 200)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Pin WEB_CONCURRENCY for every profile instead of deriving it from the CPUs'
+        )
+        parser.add_argument('--mix', choices=list(benchmark.MIXES), default='io', help='Scenario weights (default: io)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the request mix (default: 42)')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients (default: 32)')
+        parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds per profile (default: 30)')
+        parser.add_argument('--warmup', type=float, default=5.0, help='Unmeasured seconds per profile (default: 5)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds (default: 30)')
+        parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or PROFILES
+        mix = benchmark.MIXES[options['mix']]
+        try:
+            data = benchmark.BenchmarkData(sample_size=max(50, options['concurrency'] * 10), seed=options['seed'])
+        except ValueError as e:
+            raise CommandError(f'{e}. Seed it first with manage.py seed_data or manage.py benchmark')
+
+        extra_env = {'BENCHMARK_STUB_LATENCY_MS': str(options['stub_latency'])}
+        if options['workers']:
+            extra_env['WEB_CONCURRENCY'] = str(options['workers'])
+
+        results = {}
+        for profile in profiles:
+            results[profile] = self.run_profile(profile, data, mix, extra_env, options)
+
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'stub_latency_ms': options['stub_latency'],
+                'workers': options['workers'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'scenarios': mix,
+            },
+            'profiles': results,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        for profile, result in results.items():
+            total = result['total']
+            self.stderr.write(
+                f"{profile:>8}: {total['throughput_rps']} req/s, p50 {total['latency_ms']['p50']}ms, "
+                f"p95 {total['latency_ms']['p95']}ms, p99 {total['latency_ms']['p99']}ms, {total['errors']} error(s)"
+            )
+
+    def run_profile(self, profile, data, mix, extra_env, options):
+        port = self.free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        with tempfile.NamedTemporaryFile('w+', prefix=f'gunicorn-{profile}-', suffix='.log', delete=False) as log_file:
+            process = benchmark.start_gunicorn(profile, port, log_file, extra_env)
+            try:
+                if not benchmark.wait_until_ready(base_url, process):
+                    raise CommandError(f'gunicorn ({profile}) did not start, see {log_file.name}')
+                self.stderr.write(f'Running {profile} against {base_url} for {options["warmup"]:.0f}s warmup + {options["duration"]:.0f}s')
+                samples, elapsed = benchmark.run_load(
+                    base_url,
+                    data,
+                    mix,
+                    concurrency=options['concurrency'],
+                    duration=options['duration'],
+                    warmup=options['warmup'],
+                    seed=options['seed'],
+                    timeout=options['timeout'],
+                )
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+        os.unlink(log_file.name)
+        return benchmark.summarize(samples, elapsed)
+
+    def free_port(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
@@ -0,0 +1,40 @@
+"""
+Management command to apply queued Stripe webhook events
+Processes due events from the StripeEvent inbox oldest first and retries
+failed ones with exponential backoff. Run it every minute from a scheduler,
+or keep it running with --loop when STRIPE_WEBHOOK_PROCESSING is 'worker'
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bookings import stripe_events
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Stripe webhook events and retry failed ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events per batch (default: 100)')
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=stripe_events.MAX_ATTEMPTS,
+            help=f'Attempts before an event is marked failed (default: {stripe_events.MAX_ATTEMPTS})'
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop (default: 2)')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = stripe_events.process_due_events(options['batch_size'], options['max_attempts'])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"{counts['processed']} processed, {counts['retrying']} to retry, {counts['failed']} failed"
+                )
+            if not options['loop']:
+                if counts['processed'] + counts['retrying'] + counts['failed'] < options['batch_size']:
+                    break
+                continue
+            if not any(counts.values()):
+                close_old_connections()
+                time.sleep(options['interval'])
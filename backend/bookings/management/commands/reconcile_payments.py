@@ -0,0 +1,89 @@
+"""
+Management command to reconcile pending Stripe and PayPal transactions with the providers
+Run this periodically (e.g., hourly) using a cron job or scheduler. Paid,
+expired and abandoned payments are settled; anything that needs a person
+is listed as a discrepancy, and written to --report as JSON if given
+"""
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from bookings import reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Cross-check pending payment transactions against Stripe and PayPal'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            action='append',
+            choices=reconciliation.PROVIDERS,
+            dest='providers',
+            help='Only this provider (repeatable; default: all)'
+        )
+        parser.add_argument(
+            '--min-age-minutes',
+            type=int,
+            default=int(reconciliation.MIN_AGE.total_seconds() // 60),
+            help='Skip transactions younger than this, still in checkout (default: 60)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=reconciliation.CHUNK_SIZE,
+            help=f'Transactions per chunk (default: {reconciliation.CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=reconciliation.CONCURRENCY,
+            help=f'Provider lookups in flight at once (default: {reconciliation.CONCURRENCY})'
+        )
+        parser.add_argument('--report', default=None, help='Write the summary and discrepancies to this JSON file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Look everything up and report, without changing any transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--concurrency and --chunk-size must be at least 1')
+        if settings.PAYMENT_GATEWAY == 'fake':
+            # The load-test fakes know no real payment: reconciling against them would settle every one
+            raise CommandError('PAYMENT_GATEWAY=fake: nothing to reconcile against')
+
+        started = time.monotonic()
+        counts, discrepancies = reconciliation.reconcile(
+            providers=options['providers'] or reconciliation.PROVIDERS,
+            min_age=timedelta(minutes=options['min_age_minutes']),
+            chunk_size=options['chunk_size'],
+            concurrency=options['concurrency'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = '[DRY RUN] ' if options['dry_run'] else ''
+        summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(counts.items())) or 'nothing pending'
+        self.stdout.write(f'{prefix}{summary} ({time.monotonic() - started:.1f}s)')
+
+        for item in discrepancies:
+            self.stdout.write(self.style.WARNING(
+                f"  - Transaction #{item['transaction_id']} ({item['provider']} {item['provider_id']}, "
+                f"booking #{item['booking_id']}): {item['note']}"
+            ))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as report:
+                json.dump({
+                    'dry_run': options['dry_run'],
+                    'counts': dict(counts),
+                    'discrepancies': discrepancies,
+                }, report, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+        if discrepancies:
+            self.stdout.write(self.style.WARNING(f'{prefix}{len(discrepancies)} discrepancy(ies) need attention'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{prefix}No discrepancies'))
@@ -0,0 +1,19 @@
+"""
+Management command to recover chat images left processing by a worker that exited
+Queues each one again from its staged upload (or marks it failed when the upload
+is gone) and deletes staged uploads no job needs any more. Gunicorn workers do
+this as they start; elsewhere run it periodically (e.g., every 10 minutes)
+"""
+from django.core.management.base import BaseCommand
+from bookings.image_pipeline import delete_orphaned_uploads, requeue_stale_chat_images
+
+
+class Command(BaseCommand):
+    help = 'Reprocess chat images lost with their worker and delete orphaned staged uploads'
+
+    def handle(self, *args, **options):
+        requeued, failed = requeue_stale_chat_images()
+        deleted = delete_orphaned_uploads()
+        self.stdout.write(
+            f"{requeued} chat image(s) queued again, {failed} marked failed, {deleted} orphaned upload(s) deleted"
+        )
@@ -0,0 +1,79 @@
+"""
+Management command to generate a large synthetic data set
+Populates every model with deterministic, Zipf-skewed data for scale tests
+and benchmarks
+
+Replaces any data it generated before (users in the benchmark email domain
+and everything attached to them); other rows are left alone. For the largest
+volumes use a dedicated PostgreSQL database, where rows are loaded with COPY:
+
+    python manage.py seed_data --salons 100000 --services-per-salon 10 \\
+        --customers 500000 --bookings 10000000
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from salon_booking.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic data set for scale testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salons', type=int, default=1000, help='Salons (default: 1000)')
+        parser.add_argument('--services-per-salon', type=int, default=10, help='Average services per salon (default: 10)')
+        parser.add_argument('--customers', type=int, default=None, help='Customers (default: 5 per salon)')
+        parser.add_argument('--bookings', type=int, default=100000, help='Bookings (default: 100000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of bookings and chats per salon; 0 spreads them evenly (default: 1.1)'
+        )
+        parser.add_argument('--review-ratio', type=float, default=0.3, help='Share of completed bookings reviewed (default: 0.3)')
+        parser.add_argument('--chats-per-customer', type=float, default=1.0, help='Average conversations per customer (default: 1)')
+        parser.add_argument('--messages-per-chat', type=float, default=6, help='Average messages per conversation (default: 6)')
+        parser.add_argument('--notifications-per-user', type=float, default=5, help='Average notifications per user (default: 5)')
+        parser.add_argument('--activity-ratio', type=float, default=0.5, help='Share of bookings with an activity event (default: 0.5)')
+        parser.add_argument('--history-days', type=int, default=365, help='Days of booking history (default: 365)')
+        parser.add_argument(
+            '--today',
+            default=None,
+            help='Anchor date YYYY-MM-DD; pin it to reproduce a data set exactly on another day'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT or COPY (default: 5000)')
+        parser.add_argument(
+            '--method',
+            choices=['auto', 'copy', 'bulk'],
+            default='auto',
+            help='copy (PostgreSQL), bulk (bulk_create) or auto (default)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['today']) if options['today'] else None
+            generator = DataGenerator(
+                salons=options['salons'],
+                services_per_salon=options['services_per_salon'],
+                customers=options['customers'] if options['customers'] is not None else options['salons'] * 5,
+                bookings=options['bookings'],
+                seed=options['seed'],
+                zipf_s=options['zipf'],
+                review_ratio=options['review_ratio'],
+                chats_per_customer=options['chats_per_customer'],
+                messages_per_chat=options['messages_per_chat'],
+                notifications_per_user=options['notifications_per_user'],
+                activity_ratio=options['activity_ratio'],
+                history_days=options['history_days'],
+                today=today,
+                batch_size=options['batch_size'],
+                method=options['method'],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        counts = generator.run()
+        for label, count in counts.items():
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS('Synthetic data set ready'))
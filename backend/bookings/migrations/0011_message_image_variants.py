@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_alter_booking_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No Image'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='chat_images/thumbs/'),
+        ),
+    ]
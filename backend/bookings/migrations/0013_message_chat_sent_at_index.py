@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_stripe_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', '-sent_at'], name='bookings_me_chat_id_00a1ee_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_message_chat_sent_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='image_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='image_queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='image_staged_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
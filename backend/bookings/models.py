@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from salons.models import Salon, Service
 
 User = get_user_model()
@@ -237,11 +238,26 @@ class Message(models.Model):
         ('system', 'System Message'),
     ]
     
+    IMAGE_STATUS_CHOICES = [
+        ('none', 'No Image'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name='messages')
     sender_type = models.CharField(max_length=10, choices=SENDER_CHOICES)
     message_type = models.CharField(max_length=20, choices=MESSAGE_TYPES, default='text')
     content = models.TextField()
+    # Web-sized variant of the uploaded image (originals are never stored)
     image = models.ImageField(upload_to='chat_images/', null=True, blank=True)
+    image_thumbnail = models.ImageField(upload_to='chat_images/thumbs/', null=True, blank=True)
+    image_status = models.CharField(max_length=20, choices=IMAGE_STATUS_CHOICES, default='none')
+    # While processing: the raw upload in UPLOAD_TEMP_ROOT, when it was (re)queued and how often,
+    # so an image lost with its worker can be queued again (bookings.image_pipeline)
+    image_staged_name = models.CharField(max_length=255, blank=True, default='')
+    image_queued_at = models.DateTimeField(null=True, blank=True)
+    image_attempts = models.PositiveSmallIntegerField(default=0)
     
     # Timestamps
     sent_at = models.DateTimeField(auto_now_add=True)
@@ -256,6 +272,10 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            # Latest message and unread counts per chat
+            models.Index(fields=['chat', '-sent_at']),
+        ]
     
     def __str__(self):
         return f"{self.sender_type}: {self.content[:50]}..."
@@ -266,3 +286,44 @@ class Message(models.Model):
             self.is_read = True
             self.read_at = timezone.now()
             self.save()
+
+
+class StripeEvent(models.Model):
+    """
+    Inbox of verified Stripe webhook events, one row per Stripe event id
+
+    The webhook only records the event; bookings.stripe_events applies it
+    later, retrying with backoff. A redelivered event hits the unique
+    event_id and is dropped.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Processing state: next_attempt_at doubles as the lease of the worker holding the event
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+
+    # Timestamps
+    stripe_created_at = models.DateTimeField(help_text='When Stripe created the event; events are applied in this order')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Stripe Event'
+        verbose_name_plural = 'Stripe Events'
+        ordering = ['stripe_created_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} ({self.event_id}) - {self.status}"
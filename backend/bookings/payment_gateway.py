@@ -0,0 +1,300 @@
+"""
+Payment provider gateways
+
+Each provider gets one client per process, created on first use. Stripe is
+configured once with a requests-based HTTP client: keep-alive sessions,
+connect/read timeouts and network retries with idempotency keys. PayPal
+gets a single Api object, so its OAuth access token and HTTP sessions are
+reused. paypalrestsdk.configure() used to build a new Api, and fetch a new
+token, on every payment call.
+
+Calls that reach a provider go through a circuit breaker. After
+PAYMENT_BREAKER_FAILURES consecutive connection errors, timeouts or 5xx
+responses, calls fail fast with PaymentProviderUnavailable for
+PAYMENT_BREAKER_RESET_SECONDS; then one trial call is let through. Declined
+cards and invalid requests are answers from a healthy provider and do not
+count.
+
+PAYMENT_GATEWAY=fake swaps in the in-process fakes from
+salon_booking.benchmark, for local load tests; settings refuses it unless DEBUG.
+"""
+import time
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from decimal import Decimal
+import paypalrestsdk
+import requests
+import stripe
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ('stripe', 'paypal')
+
+# A payment as the provider sees it, for reconciliation. state is 'paid', 'open' (waiting
+# for the customer), 'expired', 'failed' or 'missing'; amount is None when unknown.
+ProviderPayment = namedtuple('ProviderPayment', ['state', 'transaction_id', 'amount'], defaults=[None, None])
+
+
+class PaymentProviderUnavailable(Exception):
+    """The provider's circuit is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by the threads of a worker"""
+
+    def __init__(self, name, transient_errors, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.transient_errors = transient_errors
+        self.failure_threshold = failure_threshold or settings.PAYMENT_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or settings.PAYMENT_BREAKER_RESET_SECONDS
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    @contextmanager
+    def guard(self):
+        """Run the block as one provider call, or raise PaymentProviderUnavailable"""
+        with self._lock:
+            state = self.state
+            if state == 'open':
+                raise PaymentProviderUnavailable(f'{self.name} is temporarily unavailable, please try again shortly')
+            if state == 'half_open':
+                self._trial_running = True
+        try:
+            yield
+        except self.transient_errors:
+            self._record_failure()
+            raise
+        except Exception:
+            # Any other error is an answer from the provider (or our own bug), not an outage
+            self._record_success()
+            raise
+        else:
+            self._record_success()
+
+    def _record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"[PAYMENTS] {self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                logger.warning(
+                    f"[PAYMENTS] {self.name} circuit open for {self.reset_timeout}s "
+                    f"after {self._failures} consecutive failure(s)"
+                )
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def _timeout():
+    return (settings.PAYMENT_CONNECT_TIMEOUT, settings.PAYMENT_READ_TIMEOUT)
+
+
+class StripeGateway:
+    """Stripe Checkout through the process-wide SDK configuration"""
+
+    def __init__(self):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+        # Keeps one keep-alive session per thread
+        stripe.default_http_client = stripe.RequestsClient(timeout=_timeout())
+        self.breaker = CircuitBreaker(
+            'Stripe', (stripe.error.APIConnectionError, stripe.error.APIError, stripe.error.RateLimitError)
+        )
+
+    def create_checkout_session(self, **params):
+        with self.breaker.guard():
+            return stripe.checkout.Session.create(**params)
+
+    def retrieve_checkout_session(self, session_id):
+        with self.breaker.guard():
+            return stripe.checkout.Session.retrieve(session_id)
+
+    def lookup_payment(self, session_id):
+        """ProviderPayment for a Checkout Session id"""
+        try:
+            with self.breaker.guard():
+                session = stripe.checkout.Session.retrieve(session_id)
+        except stripe.error.InvalidRequestError as e:
+            if e.http_status == 404:
+                return ProviderPayment('missing')
+            raise
+
+        amount = Decimal(session.amount_total) / 100 if session.amount_total is not None else None
+        if session.payment_status in ('paid', 'no_payment_required'):
+            return ProviderPayment('paid', session.payment_intent, amount)
+        if session.status == 'expired':
+            return ProviderPayment('expired', amount=amount)
+        return ProviderPayment('open', amount=amount)
+
+    def construct_event(self, payload, sig_header):
+        """Verify a webhook signature (local, no request to Stripe)"""
+        return stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+
+
+class _PayPalApi(paypalrestsdk.Api):
+    """paypalrestsdk.Api with a keep-alive session per thread and a timeout on every call"""
+
+    def __init__(self, timeout, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def http_call(self, url, method, **kwargs):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(method, url, proxies=self.proxies, timeout=self.timeout, **kwargs)
+        return self.handle_response(response, response.content.decode('utf-8'))
+
+
+class PayPalGateway:
+    """PayPal REST payments through one shared Api object"""
+
+    def __init__(self):
+        self.api = _PayPalApi(
+            timeout=_timeout(),
+            mode=settings.PAYPAL_MODE,
+            client_id=settings.PAYPAL_CLIENT_ID,
+            client_secret=settings.PAYPAL_CLIENT_SECRET,
+        )
+        self.breaker = CircuitBreaker('PayPal', (requests.RequestException, paypalrestsdk.exceptions.ServerError))
+
+    def create_payment(self, amount, currency='USD', description='Salon Booking'):
+        payment = paypalrestsdk.Payment({
+            "intent": "sale",
+            "payer": {
+                "payment_method": "paypal"
+            },
+            "redirect_urls": {
+                "return_url": f"{settings.FRONTEND_URL}/payment/success",
+                "cancel_url": f"{settings.FRONTEND_URL}/payment/cancel"
+            },
+            "transactions": [{
+                "amount": {
+                    "total": str(amount),
+                    "currency": currency
+                },
+                "description": description
+            }]
+        }, api=self.api)
+
+        with self.breaker.guard():
+            created = payment.create()
+
+        if created:
+            return {
+                'success': True,
+                'payment_id': payment.id,
+                'approval_url': next((link.href for link in payment.links if link.rel == "approval_url"), None)
+            }
+        return {
+            'success': False,
+            'error': payment.error
+        }
+
+    def execute_payment(self, payment_id, payer_id):
+        with self.breaker.guard():
+            payment = paypalrestsdk.Payment.find(payment_id, api=self.api)
+            executed = payment.execute({"payer_id": payer_id})
+
+        if executed:
+            return {
+                'success': True,
+                'payment': payment
+            }
+        return {
+            'success': False,
+            'error': payment.error
+        }
+
+    def lookup_payment(self, payment_id):
+        """ProviderPayment for a PayPal payment id; 'approved' payments are executed, i.e. paid"""
+        try:
+            with self.breaker.guard():
+                payment = paypalrestsdk.Payment.find(payment_id, api=self.api)
+        except paypalrestsdk.ResourceNotFound:
+            return ProviderPayment('missing')
+
+        transaction = payment.transactions[0] if payment.transactions else None
+        amount = Decimal(transaction.amount.total) if transaction else None
+        if payment.state == 'approved':
+            sales = [resource.sale for resource in (transaction.related_resources or []) if resource.sale] if transaction else []
+            return ProviderPayment('paid', sales[0].id if sales else payment.id, amount)
+        if payment.state == 'failed':
+            return ProviderPayment('failed', amount=amount)
+        return ProviderPayment('open', amount=amount)
+
+    def refund_payment(self, sale_id, amount=None):
+        refund_data = {}
+        if amount:
+            refund_data = {
+                "amount": {
+                    "total": str(amount),
+                    "currency": "USD"
+                }
+            }
+
+        with self.breaker.guard():
+            sale = paypalrestsdk.Sale.find(sale_id, api=self.api)
+            refunded = sale.refund(refund_data)
+
+        if refunded:
+            return {
+                'success': True,
+                'refund_id': sale.refund_id
+            }
+        return {
+            'success': False,
+            'error': sale.error
+        }
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def _create_gateway(provider):
+    if settings.PAYMENT_GATEWAY == 'fake':
+        from salon_booking.benchmark import FakePayPalGateway, FakeStripeGateway
+        logger.warning(f"[PAYMENTS] Using the fake {provider} gateway: no real payments are made")
+        return {'stripe': FakeStripeGateway, 'paypal': FakePayPalGateway}[provider]()
+    return {'stripe': StripeGateway, 'paypal': PayPalGateway}[provider]()
+
+
+def get_gateway(provider):
+    """This process's gateway for 'stripe' or 'paypal', created on first use"""
+    gateway = _gateways.get(provider)
+    if gateway is None:
+        with _gateways_lock:
+            gateway = _gateways.get(provider)
+            if gateway is None:
+                gateway = _gateways[provider] = _create_gateway(provider)
+    return gateway
+
+
+def use_gateways(**gateways):
+    """Replace gateways for the rest of the process, e.g. use_gateways(stripe=FakeStripeGateway())"""
+    unknown = set(gateways) - set(PROVIDERS)
+    if unknown:
+        raise ValueError(f"Unknown payment provider(s): {', '.join(sorted(unknown))}")
+    with _gateways_lock:
+        _gateways.update(gateways)
@@ -0,0 +1,171 @@
+"""
+Reconciliation of pending payment transactions against Stripe and PayPal
+
+Pending Stripe and PayPal payments older than a cutoff are read in primary
+key chunks. Each chunk is looked up at the provider with a bounded number
+of concurrent calls through bookings.payment_gateway, so the circuit
+breakers and timeouts apply. The results are then written back in one
+database transaction per chunk:
+
+- paid at the provider with a matching amount: the transaction is
+  completed, and a booking still waiting for payment is confirmed
+- Checkout Session expired, or PayPal payment failed: the transaction is
+  failed
+- PayPal payment never approved within PAYPAL_APPROVAL_HOURS (the approval
+  link is dead by then): the transaction is cancelled
+
+Everything else is left alone and reported as a discrepancy: amount
+mismatches, payments unknown to the provider, paid bookings that were
+cancelled meanwhile, and lookups that failed. Completed payments found here
+are not notified or emailed, because the customer already left checkout.
+
+Driven by `manage.py reconcile_payments`.
+"""
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Booking, Transaction
+from .payment_gateway import get_gateway
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ('stripe', 'paypal')
+CHUNK_SIZE = 200
+CONCURRENCY = 4
+MIN_AGE = timedelta(hours=1)
+PAYPAL_APPROVAL_HOURS = 3
+
+
+def pending_transactions(providers, cutoff, chunk_size=CHUNK_SIZE):
+    """Yield lists of pending provider payments created before `cutoff`, in primary key order"""
+    queryset = Transaction.objects.filter(
+        transaction_type='payment',
+        status='pending',
+        payment_method__in=providers,
+        created_at__lt=cutoff,
+    ).exclude(payment_provider_id__isnull=True).exclude(payment_provider_id='').select_related('booking').order_by('pk')
+
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def lookup(payment):
+    """(ProviderPayment, None) or (None, error message)"""
+    try:
+        return get_gateway(payment.payment_method).lookup_payment(payment.payment_provider_id), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def decide(payment, provider_payment, now):
+    """(outcome, new status or None, discrepancy note or None) for one transaction"""
+    state = provider_payment.state
+    if state == 'paid':
+        if provider_payment.amount is not None and provider_payment.amount != payment.amount:
+            return 'amount_mismatch', None, f'provider amount {provider_payment.amount}, recorded {payment.amount}'
+        if payment.booking.status == 'cancelled':
+            return 'paid_cancelled_booking', 'completed', 'paid at the provider but the booking is cancelled'
+        return 'paid', 'completed', None
+    if state in ('expired', 'failed'):
+        return state, 'failed', None
+    if state == 'missing':
+        return 'missing', None, 'not found at the provider'
+    if payment.payment_method == 'paypal' and payment.created_at < now - timedelta(hours=PAYPAL_APPROVAL_HOURS):
+        return 'abandoned', 'cancelled', None
+    return 'open', None, None
+
+
+def apply_chunk(results, now):
+    """
+    Write new statuses in bulk; returns the ids actually changed
+
+    Only rows still pending are touched, so a webhook or redirect that got
+    there first wins.
+    """
+    changes = {payment.pk: (payment, provider_payment, new_status) for payment, provider_payment, new_status in results}
+    with transaction.atomic():
+        still_pending = set(
+            Transaction.objects.select_for_update()
+            .filter(pk__in=changes, status='pending')
+            .values_list('pk', flat=True)
+        )
+        updated, paid_bookings, stripe_bookings = [], [], []
+        for pk in still_pending:
+            payment, provider_payment, new_status = changes[pk]
+            payment.status = new_status
+            payment.updated_at = now
+            payment.metadata = {**(payment.metadata or {}), 'reconciled_at': now.isoformat(), 'provider_state': provider_payment.state}
+            if new_status == 'completed':
+                payment.payment_provider_transaction_id = provider_payment.transaction_id
+                payment.processed_at = now
+                paid_bookings.append(payment.booking_id)
+                if payment.payment_method == 'stripe':
+                    # As the webhook does: failed payment_intent events find the booking by it
+                    payment.booking.payment_id = provider_payment.transaction_id
+                    stripe_bookings.append(payment.booking)
+            elif new_status == 'failed':
+                payment.metadata['failure_reason'] = f'Reconciliation: payment {provider_payment.state} at the provider'
+            updated.append(payment)
+
+        Transaction.objects.bulk_update(
+            updated, ['status', 'payment_provider_transaction_id', 'processed_at', 'metadata', 'updated_at']
+        )
+        if paid_bookings:
+            Booking.objects.filter(pk__in=paid_bookings).exclude(payment_status='completed').update(
+                payment_status='completed', updated_at=now
+            )
+            Booking.objects.filter(pk__in=paid_bookings, status='pending').update(status='confirmed', updated_at=now)
+            Booking.objects.bulk_update(stripe_bookings, ['payment_id'])
+    return still_pending
+
+
+def reconcile(providers=PROVIDERS, min_age=MIN_AGE, chunk_size=CHUNK_SIZE, concurrency=CONCURRENCY, dry_run=False):
+    """
+    Reconcile pending payments; returns (outcome counts, discrepancies)
+
+    Each discrepancy is a dict describing one transaction that needs a human.
+    """
+    now = timezone.now()
+    checked = 0
+    counts = Counter()
+    discrepancies = []
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+        for chunk in pending_transactions(providers, now - min_age, chunk_size):
+            checked += len(chunk)
+            results = []
+            for payment, (provider_payment, error) in zip(chunk, pool.map(lookup, chunk)):
+                if error:
+                    outcome, new_status, note = 'lookup_failed', None, error
+                else:
+                    outcome, new_status, note = decide(payment, provider_payment, now)
+                counts[outcome] += 1
+                if new_status:
+                    results.append((payment, provider_payment, new_status))
+                if note:
+                    discrepancies.append({
+                        'transaction_id': payment.pk,
+                        'booking_id': payment.booking_id,
+                        'provider': payment.payment_method,
+                        'provider_id': payment.payment_provider_id,
+                        'amount': str(payment.amount),
+                        'created_at': payment.created_at.isoformat(),
+                        'outcome': outcome,
+                        'note': note,
+                    })
+
+            if results and not dry_run:
+                changed = apply_chunk(results, now)
+                counts['changed_elsewhere'] += len(results) - len(changed)
+            logger.info(f"[RECONCILE] Checked {checked} transaction(s)")
+
+    return counts, discrepancies
@@ -0,0 +1,324 @@
+"""
+Stripe webhook inbox processing
+
+stripe_webhook only verifies an event and records it with record_event().
+process_due_events() applies recorded events in Stripe's order: right after
+the webhook responds (STRIPE_WEBHOOK_PROCESSING='background') and from the
+process_stripe_events worker. Failures are retried with backoff; in background
+mode each web process keeps a timer for its next due event, so retries and
+events left leased by a dead worker do not wait for another webhook.
+
+Each event is applied in one database transaction, and the handlers skip
+work that is already done, so a redelivered or retried event is a no-op.
+"""
+import json
+import logging
+import functools
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+from activity_logger import log_booking_activity
+from salon_booking.background import run_in_background
+from .models import Booking, Transaction, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# How long a worker may hold an event before another one takes it over
+LEASE_SECONDS = 300
+
+_timer = None
+_timer_due_at = None
+_timer_lock = threading.Lock()
+
+
+def record_event(payload):
+    """Store a verified event; False when Stripe already delivered it"""
+    created = payload.get('created')
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=payload['id'],
+                event_type=payload['type'],
+                payload=payload,
+                stripe_created_at=datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else timezone.now(),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def parse_payload(body):
+    return json.loads(body.decode('utf-8') if isinstance(body, bytes) else body)
+
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+
+def _session_booking(session):
+    booking_id = session.get('client_reference_id') or (session.get('metadata') or {}).get('booking_id')
+    if not booking_id:
+        return None
+    booking = Booking.objects.select_related('customer', 'salon__owner', 'service').filter(id=booking_id).first()
+    if booking is None:
+        logger.warning(f"[STRIPE EVENT] Booking {booking_id} not found")
+    return booking
+
+
+def handle_checkout_completed(event):
+    from notifications.models import Notification
+    from .views import send_booking_confirmation_email
+
+    session = event['data']['object']
+    booking = _session_booking(session)
+    if booking is None:
+        return
+
+    if booking.payment_status == 'completed' and booking.payment_id == session['payment_intent']:
+        logger.info(f"[STRIPE EVENT] Booking #{booking.id} already paid, nothing to do")
+        return
+
+    # Update booking payment status and confirm booking
+    booking.payment_status = 'completed'
+    booking.status = 'confirmed'  # Auto-confirm booking when payment is completed
+    booking.payment_id = session['payment_intent']
+    booking.payment_method = 'stripe'
+    booking.save()
+
+    logger.info(f"[STRIPE EVENT] Booking #{booking.id} updated to CONFIRMED and PAID")
+
+    # Log booking confirmation once the event commits: a failed attempt is rolled back and retried
+    transaction.on_commit(functools.partial(
+        log_booking_activity,
+        booking=booking,
+        user=booking.customer,
+        action="CONFIRMED",
+        details={
+            'payment_method': 'stripe',
+            'session_id': session['id'],
+            'payment_intent': session['payment_intent'],
+            'auto_confirmed': True,
+            'reason': 'Payment completed successfully via webhook'
+        },
+        request=None
+    ))
+
+    # Update transaction
+    try:
+        payment = Transaction.objects.get(
+            booking=booking,
+            payment_provider_id=session['id'],
+            status='pending'
+        )
+        payment.status = 'completed'
+        payment.payment_provider_transaction_id = session['payment_intent']
+        payment.processed_at = timezone.now()
+        payment.metadata.update({
+            'payment_completed_at': timezone.now().isoformat(),
+            'stripe_session_id': session['id'],
+            'stripe_payment_intent': session['payment_intent']
+        })
+        payment.save()
+    except Transaction.DoesNotExist:
+        # Create transaction if doesn't exist
+        payment = Transaction(
+            booking=booking,
+            customer=booking.customer,
+            salon=booking.salon,
+            transaction_type='payment',
+            amount=booking.price,
+            currency='PHP',
+            status='completed',
+            payment_method='stripe',
+            payment_provider_id=session['id'],
+            payment_provider_transaction_id=session['payment_intent'],
+            description=f"Stripe payment for {booking.service.name} at {booking.salon.name}",
+            processed_at=timezone.now()
+        )
+        payment.calculate_platform_fee(0.03)
+        payment.save()
+
+    # Send confirmation email once the event is committed, so a retried event does not send it twice
+    run_in_background(send_booking_confirmation_email, booking)
+
+    # Notify customer and salon owner about the confirmed booking (one INSERT)
+    Notification.notify_many([
+        dict(
+            user=booking.customer,
+            notification_type='booking_confirmed',
+            title='Booking Confirmed!',
+            message=f'Your booking for {booking.service.name} at {booking.salon.name} on {booking.booking_date} at {booking.booking_time} has been confirmed. Payment received successfully.',
+            action_url='/customer-bookings.html',
+            related_object=booking,
+            metadata={
+                'booking_id': booking.id,
+                'payment_method': 'stripe',
+                'payment_status': 'completed',
+                'booking_status': 'confirmed'
+            }
+        ),
+        dict(
+            user=booking.salon.owner,
+            notification_type='booking_confirmed',
+            title='Booking Payment Received',
+            message=f'Payment received for booking from {booking.customer_name} for {booking.service.name} on {booking.booking_date} at {booking.booking_time}. Booking is now confirmed.',
+            action_url='/salon-owner-dashboard.html',
+            related_object=booking,
+            metadata={
+                'booking_id': booking.id,
+                'customer_name': booking.customer_name,
+                'payment_method': 'stripe',
+                'amount': str(booking.price)
+            }
+        )
+    ])
+
+
+def handle_checkout_expired(event):
+    session = event['data']['object']
+    booking = _session_booking(session)
+    if booking is None:
+        return
+
+    # Only a still-pending transaction is failed, so a replay changes nothing
+    payment = Transaction.objects.filter(booking=booking, payment_provider_id=session['id'], status='pending').first()
+    if payment:
+        payment.status = 'failed'
+        payment.metadata.update({
+            'failure_reason': 'Checkout session expired',
+            'failed_at': timezone.now().isoformat()
+        })
+        payment.save()
+
+
+def handle_payment_failed(event):
+    payment_intent = event['data']['object']
+
+    booking = Booking.objects.filter(payment_id=payment_intent['id']).first()
+    if booking is None or booking.payment_status == 'failed':
+        return
+    booking.payment_status = 'failed'
+    booking.save()
+
+    payment = Transaction.objects.filter(booking=booking, payment_provider_transaction_id=payment_intent['id']).first()
+    if payment:
+        payment.status = 'failed'
+        payment.metadata.update({
+            'failure_reason': (payment_intent.get('last_payment_error') or {}).get('message', 'Payment failed'),
+            'failed_at': timezone.now().isoformat()
+        })
+        payment.save()
+
+
+HANDLERS = {
+    'checkout.session.completed': handle_checkout_completed,
+    'checkout.session.expired': handle_checkout_expired,
+    'payment_intent.payment_failed': handle_payment_failed,
+}
+
+
+# ----------------------------------------------------------------------
+# Processing
+# ----------------------------------------------------------------------
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    return timedelta(seconds=min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+
+def claim(stripe_event):
+    """
+    Take the lease on an event; False if another worker got it first
+
+    A worker that dies mid-event loses the lease after LEASE_SECONDS and the
+    event becomes due again.
+    """
+    now = timezone.now()
+    return StripeEvent.objects.filter(
+        pk=stripe_event.pk, status='pending', next_attempt_at__lte=now
+    ).update(
+        attempts=F('attempts') + 1,
+        next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+    ) == 1
+
+
+def process_event(stripe_event, max_attempts=MAX_ATTEMPTS):
+    """Apply one claimed event; returns its new status"""
+    attempts = stripe_event.attempts + 1
+    handler = HANDLERS.get(stripe_event.event_type)
+    try:
+        with transaction.atomic():
+            if handler:
+                handler(stripe_event.payload)
+            StripeEvent.objects.filter(pk=stripe_event.pk).update(
+                status='processed', processed_at=timezone.now(), last_error=''
+            )
+        return 'processed'
+    except Exception as e:
+        logger.error(f"[STRIPE EVENT] {stripe_event.event_id} ({stripe_event.event_type}) attempt {attempts} failed: {e}", exc_info=True)
+        status = 'failed' if attempts >= max_attempts else 'pending'
+        StripeEvent.objects.filter(pk=stripe_event.pk).update(
+            status=status,
+            last_error=str(e)[:2000],
+            next_attempt_at=timezone.now() + retry_delay(attempts)
+        )
+        return status
+
+
+def process_due_events(limit=100, max_attempts=MAX_ATTEMPTS):
+    """Apply due events oldest first; returns how many were processed, retried and given up"""
+    counts = {'processed': 0, 'retrying': 0, 'failed': 0}
+    due = StripeEvent.objects.filter(
+        status='pending', next_attempt_at__lte=timezone.now()
+    ).only('id', 'event_id', 'event_type', 'payload', 'attempts')[:limit]
+    for stripe_event in due:
+        if claim(stripe_event):
+            status = process_event(stripe_event, max_attempts)
+            counts['retrying' if status == 'pending' else status] += 1
+    return counts
+
+
+def next_due_in():
+    """Seconds until the next pending event is due; None when nothing is pending"""
+    next_attempt_at = StripeEvent.objects.filter(status='pending').aggregate(
+        next_attempt_at=Min('next_attempt_at')
+    )['next_attempt_at']
+    if next_attempt_at is None:
+        return None
+    return max(0.0, (next_attempt_at - timezone.now()).total_seconds())
+
+
+def schedule_background_pass(delay):
+    """Run process_events_in_background after delay seconds, unless an earlier pass is already set"""
+    global _timer, _timer_due_at
+    due_at = time.monotonic() + delay
+    with _timer_lock:
+        if _timer is not None and _timer.is_alive():
+            if _timer_due_at <= due_at:
+                return
+            _timer.cancel()
+        _timer = threading.Timer(delay, run_in_background, args=(process_events_in_background,))
+        _timer.daemon = True
+        _timer_due_at = due_at
+        _timer.start()
+
+
+def process_events_in_background():
+    """
+    Apply due events, then schedule the next pass while any are still pending
+
+    Covers retries, and events claimed by a worker that died: they are due
+    again once their lease runs out. Not rescheduled with
+    BACKGROUND_TASKS_EAGER, where nothing outlives the caller.
+    """
+    process_due_events()
+    delay = next_due_in()
+    if delay is not None and not settings.BACKGROUND_TASKS_EAGER:
+        schedule_background_pass(delay)
@@ -0,0 +1,454 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from accounts.models import User
+from salon_booking.media import stage_upload
+from salon_booking.storage import LocalMediaStorage, get_upload_temp_storage
+from salons.models import Salon, Service
+from notifications.models import Notification
+from . import payment_gateway, reconciliation, stripe_events
+from .image_pipeline import recover_chat_images
+from .models import Booking, Chat, Message, StripeEvent, Transaction
+from .payment_gateway import PaymentProviderUnavailable, ProviderPayment, use_gateways
+
+
+def create_salon(owner, name):
+    salon = Salon.objects.create(
+        owner=owner, name=name, email=f'{name.lower().replace(" ", "")}@example.com', phone='0917',
+        address='1 Main St', city='Manila', state='NCR', postal_code='1000', description=name
+    )
+    Service.objects.create(salon=salon, name='Haircut', description='Cut', price=Decimal('500.00'), duration=30)
+    return salon
+
+
+def create_booking(customer, salon, **fields):
+    service = salon.salon_services.first()
+    fields.setdefault('customer_name', 'Customer')
+    return Booking.objects.create(
+        customer=customer, salon=salon, service=service, booking_date=date(2025, 4, 1), booking_time=time(10),
+        duration=30, customer_email=customer.email, customer_phone='0917', price=service.price, **fields
+    )
+
+
+class SalonTransactionsSummaryTests(TestCase):
+    """The summary of get_salon_transactions covers the filtered set, whatever page is requested"""
+
+    STATUSES = ['completed', 'pending', 'failed', 'completed', 'refunded']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='x', user_type='salon_owner'
+        )
+        customer = User.objects.create_user(
+            username='customer', email='customer@example.com', password='x', user_type='customer'
+        )
+        other_owner = User.objects.create_user(
+            username='other', email='other@example.com', password='x', user_type='salon_owner'
+        )
+        salons = [create_salon(cls.owner, 'Salon A'), create_salon(cls.owner, 'Salon B')]
+        other_salon = create_salon(other_owner, 'Elsewhere')
+
+        cls.start = date(2025, 3, 1)
+        for i in range(23):
+            salon = salons[i % 2]
+            payment = cls.create_transaction(salon, customer, i)
+            payment.created_at = timezone.make_aware(datetime.combine(cls.start + timedelta(days=i), time(12)))
+            payment.save(update_fields=['created_at'])
+        # Another owner's transaction never counts
+        cls.create_transaction(other_salon, customer, 0)
+
+    @classmethod
+    def create_transaction(cls, salon, customer, i):
+        booking = create_booking(customer, salon)
+        payment = Transaction(
+            booking=booking, customer=customer, salon=salon, amount=Decimal(100 + i * 7),
+            status=cls.STATUSES[i % len(cls.STATUSES)], payment_method='stripe' if i % 3 else 'paypal'
+        )
+        # Only some transactions had their fees calculated
+        if i % 4:
+            payment.calculate_platform_fee(0.03)
+        payment.save()
+        return payment
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def expected_summary(self, params):
+        transactions = Transaction.objects.filter(salon__owner=self.owner)
+        if 'status' in params:
+            transactions = transactions.filter(status__in=params['status'].split(','))
+        if 'date_from' in params:
+            transactions = transactions.filter(created_at__date__gte=params['date_from'])
+        if 'date_to' in params:
+            transactions = transactions.filter(created_at__date__lte=params['date_to'])
+        completed = [t for t in transactions if t.status == 'completed']
+        return {
+            'total_revenue': float(sum(t.salon_payout if t.salon_payout > 0 else t.amount for t in completed)),
+            'pending_payments': float(sum(t.amount for t in transactions if t.status == 'pending')),
+            'total_platform_fees': float(sum(t.platform_fee for t in completed)),
+            'transaction_count': len(transactions),
+        }
+
+    def get_page(self, params, offset):
+        response = self.client.get(reverse('salon_transactions'), {**params, 'limit': 5, 'offset': offset})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def assert_summary_matches_on_every_page(self, params):
+        expected = self.expected_summary(params)
+        self.assertGreater(expected['transaction_count'], 5)
+        middle = (expected['transaction_count'] // 5 // 2) * 5
+        for offset in (0, middle, expected['transaction_count'] + 10):
+            with self.subTest(params=params, offset=offset):
+                data = self.get_page(params, offset)
+                for key, value in expected.items():
+                    self.assertAlmostEqual(data['summary'][key], value, places=2, msg=key)
+                self.assertEqual(data['pagination']['total_count'], expected['transaction_count'])
+        self.assertTrue(self.get_page(params, 0)['transactions'])
+        self.assertFalse(self.get_page(params, expected['transaction_count'] + 10)['transactions'])
+
+    def test_summary_without_filters(self):
+        self.assert_summary_matches_on_every_page({})
+
+    def test_summary_with_status_filter(self):
+        self.assert_summary_matches_on_every_page({'status': 'completed,pending'})
+
+    def test_summary_with_date_filter(self):
+        self.assert_summary_matches_on_every_page({
+            'date_from': (self.start + timedelta(days=3)).isoformat(),
+            'date_to': (self.start + timedelta(days=18)).isoformat(),
+        })
+
+    def test_summary_with_status_and_date_filters(self):
+        self.assert_summary_matches_on_every_page({
+            'status': 'completed,refunded',
+            'date_from': self.start.isoformat(),
+            'date_to': (self.start + timedelta(days=20)).isoformat(),
+        })
+
+
+class StubGateway:
+    """Answers lookup_payment from a table of provider id -> ProviderPayment or exception"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def lookup_payment(self, provider_id):
+        answer = self.answers.get(provider_id, ProviderPayment('missing'))
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class ReconcilePaymentsTests(TestCase):
+    """reconcile_payments against stub gateways, checked in the database"""
+
+    # provider id: (payment method, hours old, booking status, provider answer,
+    #               expected outcome, expected transaction status)
+    CASES = {
+        'cs_paid': ('stripe', 5, 'pending', ProviderPayment('paid', 'pi_paid', Decimal('500.00')), 'paid', 'completed'),
+        'cs_paid_no_amount': ('stripe', 5, 'pending', ProviderPayment('paid', 'pi_no_amount'), 'paid', 'completed'),
+        'cs_mismatch': ('stripe', 5, 'pending', ProviderPayment('paid', 'pi_mismatch', Decimal('50.00')), 'amount_mismatch', 'pending'),
+        'cs_cancelled': ('stripe', 5, 'cancelled', ProviderPayment('paid', 'pi_cancelled', Decimal('500.00')), 'paid_cancelled_booking', 'completed'),
+        'cs_expired': ('stripe', 5, 'pending', ProviderPayment('expired', amount=Decimal('500.00')), 'expired', 'failed'),
+        'cs_missing': ('stripe', 5, 'pending', ProviderPayment('missing'), 'missing', 'pending'),
+        'cs_open': ('stripe', 5, 'pending', ProviderPayment('open', amount=Decimal('500.00')), 'open', 'pending'),
+        'cs_down': ('stripe', 5, 'pending', PaymentProviderUnavailable('stripe circuit open'), 'lookup_failed', 'pending'),
+        'PAYID-PAID': ('paypal', 5, 'pending', ProviderPayment('paid', 'SALE-1', Decimal('500.00')), 'paid', 'completed'),
+        'PAYID-FAILED': ('paypal', 5, 'pending', ProviderPayment('failed', amount=Decimal('500.00')), 'failed', 'failed'),
+        'PAYID-ABANDONED': ('paypal', 5, 'pending', ProviderPayment('open', amount=Decimal('500.00')), 'abandoned', 'cancelled'),
+        'PAYID-RECENT': ('paypal', 2, 'pending', ProviderPayment('open', amount=Decimal('500.00')), 'open', 'pending'),
+    }
+    DISCREPANCIES = {'cs_mismatch', 'cs_cancelled', 'cs_missing', 'cs_down'}
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x', user_type='salon_owner')
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        salon = create_salon(owner, 'Salon A')
+        now = timezone.now()
+        for provider_id, (method, hours, booking_status, *_) in cls.CASES.items():
+            cls.create_payment(customer, salon, provider_id, method, now - timedelta(hours=hours), booking_status)
+        # Still in checkout: younger than the minimum age, never looked up
+        cls.create_payment(customer, salon, 'cs_young', 'stripe', now - timedelta(minutes=10), 'pending')
+
+    @classmethod
+    def create_payment(cls, customer, salon, provider_id, method, created_at, booking_status):
+        booking = create_booking(customer, salon, status=booking_status, payment_method=method)
+        payment = Transaction.objects.create(
+            booking=booking, customer=customer, salon=salon, amount=Decimal('500.00'),
+            status='pending', payment_method=method, payment_provider_id=provider_id
+        )
+        Transaction.objects.filter(pk=payment.pk).update(created_at=created_at)
+
+    def setUp(self):
+        answers = {provider_id: case[3] for provider_id, case in self.CASES.items()}
+        patcher = mock.patch.dict(payment_gateway._gateways)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        use_gateways(stripe=StubGateway(answers), paypal=StubGateway(answers))
+
+    def payment(self, provider_id):
+        return Transaction.objects.select_related('booking').get(payment_provider_id=provider_id)
+
+    def test_every_outcome_is_written(self):
+        counts, discrepancies = reconciliation.reconcile(chunk_size=5, concurrency=2)
+
+        expected_counts = {}
+        for provider_id, (*_, outcome, status) in self.CASES.items():
+            expected_counts[outcome] = expected_counts.get(outcome, 0) + 1
+            with self.subTest(provider_id=provider_id):
+                self.assertEqual(self.payment(provider_id).status, status)
+        self.assertEqual(dict(counts), {**expected_counts, 'changed_elsewhere': 0})
+        self.assertEqual(self.payment('cs_young').status, 'pending')
+
+        paid = self.payment('cs_paid')
+        self.assertEqual(paid.payment_provider_transaction_id, 'pi_paid')
+        self.assertIsNotNone(paid.processed_at)
+        self.assertEqual(paid.metadata['provider_state'], 'paid')
+        self.assertEqual(
+            (paid.booking.status, paid.booking.payment_status, paid.booking.payment_id),
+            ('confirmed', 'completed', 'pi_paid')
+        )
+        paypal = self.payment('PAYID-PAID').booking
+        self.assertEqual((paypal.status, paypal.payment_status, paypal.payment_id), ('confirmed', 'completed', None))
+        # Paid, but the booking stays cancelled for a person to refund or restore
+        cancelled = self.payment('cs_cancelled').booking
+        self.assertEqual((cancelled.status, cancelled.payment_status), ('cancelled', 'completed'))
+        self.assertIn('expired', self.payment('cs_expired').metadata['failure_reason'])
+        self.assertEqual(self.payment('cs_mismatch').booking.payment_status, 'pending')
+
+        self.assertEqual({item['provider_id'] for item in discrepancies}, self.DISCREPANCIES)
+        mismatch = next(item for item in discrepancies if item['provider_id'] == 'cs_mismatch')
+        self.assertEqual(mismatch['outcome'], 'amount_mismatch')
+        self.assertEqual(mismatch['note'], 'provider amount 50.00, recorded 500.00')
+        self.assertEqual(mismatch['booking_id'], self.payment('cs_mismatch').booking_id)
+        self.assertIn('stripe circuit open', next(item['note'] for item in discrepancies if item['provider_id'] == 'cs_down'))
+
+    def test_rows_settled_elsewhere_are_not_overwritten(self):
+        decide = reconciliation.decide
+
+        def settled_by_webhook(payment, provider_payment, now):
+            # The webhook completes this one between the lookup and the write
+            if payment.payment_provider_id == 'cs_expired':
+                Transaction.objects.filter(pk=payment.pk).update(status='completed')
+            return decide(payment, provider_payment, now)
+
+        with mock.patch.object(reconciliation, 'decide', settled_by_webhook):
+            counts, _ = reconciliation.reconcile()
+
+        self.assertEqual(counts['changed_elsewhere'], 1)
+        expired = self.payment('cs_expired')
+        self.assertEqual(expired.status, 'completed')
+        self.assertNotIn('reconciled_at', expired.metadata)
+        self.assertEqual(self.payment('PAYID-FAILED').status, 'failed')
+
+    def test_dry_run_writes_nothing(self):
+        before = list(Transaction.objects.order_by('pk').values())
+        bookings_before = list(Booking.objects.order_by('pk').values())
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, 'report.json')
+            call_command('reconcile_payments', '--dry-run', '--report', report_path, stdout=io.StringIO())
+            with open(report_path, encoding='utf-8') as f:
+                report = json.load(f)
+
+        self.assertEqual(list(Transaction.objects.order_by('pk').values()), before)
+        self.assertEqual(list(Booking.objects.order_by('pk').values()), bookings_before)
+        self.assertTrue(report['dry_run'])
+        self.assertEqual(report['counts']['paid'], 3)
+        self.assertEqual({item['provider_id'] for item in report['discrepancies']}, self.DISCREPANCIES)
+
+    @override_settings(PAYMENT_GATEWAY='fake')
+    def test_refuses_the_fake_gateway(self):
+        with self.assertRaises(CommandError):
+            call_command('reconcile_payments', stdout=io.StringIO())
+        self.assertEqual(self.payment('cs_paid').status, 'pending')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, CHAT_IMAGE_STALE_MINUTES=5, CHAT_IMAGE_MAX_ATTEMPTS=3)
+class ChatImageRecoveryTests(TestCase):
+    """Chat images lost with their worker are processed again from the staged upload"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        upload_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(upload_root.cleanup)
+        self.upload_root = upload_root.name
+        settings_override = override_settings(UPLOAD_TEMP_ROOT=upload_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_upload_temp_storage.cache_clear()
+        self.addCleanup(get_upload_temp_storage.cache_clear)
+        storage_patcher = mock.patch.object(default_storage, '_wrapped', LocalMediaStorage(location=media_root.name))
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x', user_type='salon_owner')
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        self.chat = Chat.objects.create(customer=customer, salon=create_salon(owner, 'Salon A'))
+        self.lost_at = timezone.now() - timedelta(minutes=30)
+
+    def stage(self, name='photo.png'):
+        content = io.BytesIO()
+        Image.new('RGB', (64, 48), 'red').save(content, format='PNG')
+        return stage_upload(SimpleUploadedFile(name, content.getvalue(), content_type='image/png'), 'chat_images')
+
+    def lost_message(self, staged_name, attempts=1, queued_at=None):
+        """A message whose worker died after staging its image"""
+        return Message.objects.create(
+            chat=self.chat, sender_type='customer', content='', message_type='image', image_status='processing',
+            image_staged_name=staged_name, image_queued_at=queued_at or self.lost_at, image_attempts=attempts
+        )
+
+    def staged_path(self, name):
+        return os.path.join(self.upload_root, name)
+
+    def test_stale_image_is_processed_again(self):
+        staged_name = self.stage()
+        message = self.lost_message(staged_name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recover_chat_images(), (1, 0, 0))
+
+        message.refresh_from_db()
+        self.assertEqual(message.image_status, 'ready')
+        self.assertTrue(message.image and message.image_thumbnail)
+        self.assertEqual((message.image_attempts, message.image_staged_name), (2, ''))
+        self.assertFalse(os.path.exists(self.staged_path(staged_name)))
+
+    def test_image_without_upload_or_attempts_left_fails(self):
+        gone = self.lost_message('chat_images/gone.png')
+        exhausted_name = self.stage()
+        exhausted = self.lost_message(exhausted_name, attempts=3)
+
+        self.assertEqual(recover_chat_images(), (0, 2, 0))
+
+        for message in (gone, exhausted):
+            message.refresh_from_db()
+            self.assertEqual((message.image_status, message.image_staged_name), ('failed', ''))
+        self.assertFalse(os.path.exists(self.staged_path(exhausted_name)))
+
+    def test_recent_image_and_its_upload_are_left_alone(self):
+        staged_name = self.stage()
+        message = self.lost_message(staged_name, queued_at=timezone.now())
+        # Left behind by a crashed worker, old enough to be sure no job needs it
+        orphan = self.stage('orphan.png')
+        old = (self.lost_at - timedelta(minutes=1)).timestamp()
+        for name in (staged_name, orphan):
+            os.utime(self.staged_path(name), (old, old))
+
+        self.assertEqual(recover_chat_images(), (0, 0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.image_status, 'processing')
+        self.assertTrue(os.path.exists(self.staged_path(staged_name)))
+        self.assertFalse(os.path.exists(self.staged_path(orphan)))
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class StripeEventRetryTests(TestCase):
+    """A checkout event that fails and is retried confirms, logs and emails once"""
+
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', email='owner@example.com', password='x', user_type='salon_owner')
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        self.booking = create_booking(customer, create_salon(owner, 'Salon A'))
+        stripe_events.record_event({
+            'id': 'evt_1', 'type': 'checkout.session.completed', 'created': 1700000000,
+            'data': {'object': {'id': 'cs_1', 'payment_intent': 'pi_1', 'client_reference_id': self.booking.id}},
+        })
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            stripe_events.process_due_events()
+        StripeEvent.objects.update(next_attempt_at=timezone.now())
+
+    def test_failed_attempt_leaves_no_log_or_email(self):
+        notify_many = Notification.notify_many
+        attempts = []
+
+        def fail_first(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError('notifications down')
+            return notify_many(*args, **kwargs)
+
+        with mock.patch.object(Notification, 'notify_many', side_effect=fail_first), \
+                mock.patch.object(stripe_events, 'log_booking_activity') as log, \
+                mock.patch('bookings.views.send_booking_confirmation_email') as send_email:
+            self.process()
+            self.assertEqual(StripeEvent.objects.get().status, 'pending')
+            self.booking.refresh_from_db()
+            self.assertEqual(self.booking.status, 'pending')
+            log.assert_not_called()
+            send_email.assert_not_called()
+
+            self.process()
+
+        self.assertEqual(StripeEvent.objects.get().status, 'processed')
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.payment_status), ('confirmed', 'completed'))
+        self.assertEqual(log.call_count, 1)
+        self.assertEqual(log.call_args.kwargs['action'], 'CONFIRMED')
+        self.assertEqual(send_email.call_count, 1)
+
+
+class ExportTests(TestCase):
+    """Export endpoints: salon_id validation and CSV formula quoting"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x', user_type='salon_owner')
+        customer = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        cls.salon = create_salon(cls.owner, 'Salon A')
+        cls.booking = create_booking(customer, cls.salon, customer_name='=HYPERLINK("http://evil.example","x")')
+        Transaction.objects.create(
+            booking=cls.booking, customer=customer, salon=cls.salon, amount=Decimal('-5.00'),
+            status='refunded', payment_method='stripe', transaction_type='refund'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_non_numeric_salon_id_is_rejected(self):
+        for name in ('export_transactions', 'export_bookings'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), {'salon_id': 'abc'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {'error': 'salon_id must be a number'})
+        self.assertIn('Salon A', self.export('export_transactions', salon_id=self.salon.id))
+
+    def test_csv_quotes_text_that_would_run_as_a_formula(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('export_transactions'))))
+        self.assertEqual(rows[0]['customer_name'], '\'=HYPERLINK("http://evil.example","x")')
+        # Numbers are not text and keep their sign
+        self.assertEqual(rows[0]['amount'], '-5.00')
+
+        rows = list(csv.DictReader(io.StringIO(self.export('export_bookings'))))
+        self.assertEqual(rows[0]['customer_name'], '\'=HYPERLINK("http://evil.example","x")')
+
+    def test_jsonl_keeps_values_as_entered(self):
+        row = json.loads(self.export('export_transactions', file_type='jsonl').splitlines()[0])
+        self.assertEqual(row['customer_name'], '=HYPERLINK("http://evil.example","x")')
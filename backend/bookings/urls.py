@@ -11,6 +11,8 @@ urlpatterns = [
     path('<int:booking_id>/update-status/', views.update_booking_status, name='update_booking_status'),
     path('<int:booking_id>/update-payment-status/', views.update_payment_status, name='update_payment_status'),
     path('salon-transactions/', views.get_salon_transactions, name='salon_transactions'),
+    path('export/transactions/', views.export_transactions, name='export_transactions'),
+    path('export/bookings/', views.export_bookings, name='export_bookings'),
     
     # Calendar integration
     path('<int:booking_id>/calendar-link/', views.get_calendar_link, name='get_calendar_link'),
@@ -5,14 +5,24 @@ from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.db import models
+from django.db.models import Case, Count, F, OuterRef, Prefetch, Subquery, Sum, When, Window
 from .models import Booking, Transaction, Chat, Message
 from salons.models import Salon, Service
+from .payment_gateway import PaymentProviderUnavailable, get_gateway
 from .payment_utils import create_payment, execute_payment, refund_payment
 from .calendar_service import GoogleCalendarService
+from .image_pipeline import ImageValidationError, validate_image_upload, queue_chat_image, chat_image_fields
 from activity_logger import log_user_activity, log_salon_activity, log_booking_activity, log_transaction_activity
 from notifications.utils import create_booking_notification
+from salon_booking.media import variant_url
+from salon_booking.background import run_in_background
+from salon_booking.query_budget import query_budget
+from .exports import FILTERS, FORMATS, export_filename, export_lines, filter_transactions
+from .stripe_events import parse_payload, process_events_in_background, record_event
 import logging
 
 # Import Brevo SDK if available
@@ -28,6 +38,7 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
+@query_budget(10)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_booking(request):
@@ -210,22 +221,26 @@ def create_booking(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_my_bookings(request):
     """Get all bookings for the logged-in user"""
     try:
-        bookings = Booking.objects.filter(customer=request.user)
+        bookings = Booking.objects.filter(customer=request.user).select_related(
+            'salon', 'service', 'review'
+        ).prefetch_related('service__images')
         
         bookings_data = []
         for booking in bookings:
-            # Check if booking has a review
-            from salons.models import Review
-            review = Review.objects.filter(booking=booking, customer=request.user).first()
+            # Check if booking has a review (by this customer)
+            review = getattr(booking, 'review', None)
+            if review is not None and review.customer_id != request.user.id:
+                review = None
             
-            # Get service images
+            # Get service images (thumbnails are enough for the bookings list)
             service_images = booking.service.images.all()
-            service_image_urls = [request.build_absolute_uri(img.image.url) for img in service_images]
+            service_image_urls = [request.build_absolute_uri(variant_url(img, 'image', 'thumb')) for img in service_images]
             
             bookings_data.append({
                 'id': booking.id,
@@ -263,6 +278,7 @@ def get_my_bookings(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(10)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cancel_booking(request, booking_id):
@@ -381,6 +397,7 @@ Reason: {request.data.get('reason', 'Not provided')}
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_available_slots(request, salon_id):
@@ -558,6 +575,7 @@ Please confirm or manage this booking in your dashboard.
         print(f"❌ Failed to send booking confirmation email: {e}")
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_salon_bookings(request):
@@ -572,7 +590,9 @@ def get_salon_bookings(request):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Get all bookings for this salon
-        bookings = Booking.objects.filter(salon=salon).select_related('customer', 'service')
+        bookings = Booking.objects.filter(salon=salon).select_related(
+            'customer', 'service', 'salon'
+        ).prefetch_related('service__images')
         
         bookings_data = []
         for booking in bookings:
@@ -614,6 +634,7 @@ def get_salon_bookings(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(10)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_booking_status(request, booking_id):
@@ -674,6 +695,7 @@ def update_booking_status(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(5)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_calendar_link(request, booking_id):
@@ -849,6 +871,7 @@ SalonBook Team
         traceback.print_exc()
 
 
+@query_budget(10)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_payment_for_booking(request):
@@ -939,6 +962,7 @@ def create_payment_for_booking(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(18)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def execute_booking_payment(request):
@@ -1037,38 +1061,38 @@ def execute_booking_payment(request):
             # Send confirmation email
             send_booking_confirmation_email(booking)
             
-            # Create notification for customer about confirmed booking
+            # Notify customer and salon owner about the confirmed booking (one INSERT)
             from notifications.models import Notification
-            Notification.create_notification(
-                user=booking.customer,
-                notification_type='booking_confirmed',
-                title='Booking Confirmed!',
-                message=f'Your booking for {booking.service.name} at {booking.salon.name} on {booking.booking_date} at {booking.booking_time} has been confirmed. Payment received successfully.',
-                action_url='/customer-bookings.html',
-                related_object=booking,
-                metadata={
-                    'booking_id': booking.id,
-                    'payment_method': 'paypal',
-                    'payment_status': 'completed',
-                    'booking_status': 'confirmed'
-                }
-            )
-            
-            # Create notification for salon owner
-            Notification.create_notification(
-                user=booking.salon.owner,
-                notification_type='booking_confirmed',
-                title='Booking Payment Received',
-                message=f'Payment received for booking from {booking.customer_name} for {booking.service.name} on {booking.booking_date} at {booking.booking_time}. Booking is now confirmed.',
-                action_url='/salon-owner-dashboard.html',
-                related_object=booking,
-                metadata={
-                    'booking_id': booking.id,
-                    'customer_name': booking.customer_name,
-                    'payment_method': 'paypal',
-                    'amount': str(booking.price)
-                }
-            )
+            Notification.notify_many([
+                dict(
+                    user=booking.customer,
+                    notification_type='booking_confirmed',
+                    title='Booking Confirmed!',
+                    message=f'Your booking for {booking.service.name} at {booking.salon.name} on {booking.booking_date} at {booking.booking_time} has been confirmed. Payment received successfully.',
+                    action_url='/customer-bookings.html',
+                    related_object=booking,
+                    metadata={
+                        'booking_id': booking.id,
+                        'payment_method': 'paypal',
+                        'payment_status': 'completed',
+                        'booking_status': 'confirmed'
+                    }
+                ),
+                dict(
+                    user=booking.salon.owner,
+                    notification_type='booking_confirmed',
+                    title='Booking Payment Received',
+                    message=f'Payment received for booking from {booking.customer_name} for {booking.service.name} on {booking.booking_date} at {booking.booking_time}. Booking is now confirmed.',
+                    action_url='/salon-owner-dashboard.html',
+                    related_object=booking,
+                    metadata={
+                        'booking_id': booking.id,
+                        'customer_name': booking.customer_name,
+                        'payment_method': 'paypal',
+                        'amount': str(booking.price)
+                    }
+                )
+            ])
             
             return Response({
                 'success': True,
@@ -1115,6 +1139,7 @@ def execute_booking_payment(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(10)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_payment_status(request, booking_id):
@@ -1196,6 +1221,7 @@ def update_payment_status(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(8)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def refund_booking_payment(request, booking_id):
@@ -1252,6 +1278,7 @@ def refund_booking_payment(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_transactions(request):
@@ -1307,10 +1334,17 @@ def get_user_transactions(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_salon_transactions(request):
-    """Get transactions for salon owner's salons"""
+    """
+    Get transactions for salon owner's salons
+
+    Optional filters: date_from / date_to (YYYY-MM-DD, inclusive, on created_at),
+    status and payment_method (comma-separated). The summary covers every
+    transaction matching the filters, not just the returned page.
+    """
     try:
         # Check if user is a salon owner
         if not hasattr(request.user, 'owned_salons') or not request.user.owned_salons.exists():
@@ -1320,20 +1354,50 @@ def get_salon_transactions(request):
         
         # Get transactions for user's salons
         salon_ids = request.user.owned_salons.values_list('id', flat=True)
-        transactions = Transaction.objects.filter(
-            salon_id__in=salon_ids
-        ).select_related('booking', 'customer', 'booking__service').order_by('-created_at')
+        transactions = Transaction.objects.filter(salon_id__in=salon_ids)
+        
+        try:
+            transactions = filter_transactions(transactions, request.GET)
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Summary over the whole filtered set. Salon revenue is the payout when fees were
+        # calculated, otherwise the full amount (assuming it all goes to the salon)
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        summary_expressions = {
+            'summary_count': Count('id'),
+            'summary_revenue': Sum(Case(
+                When(status='completed', salon_payout__gt=0, then=F('salon_payout')),
+                When(status='completed', then=F('amount')),
+                output_field=money
+            )),
+            'summary_pending': Sum(Case(When(status='pending', then=F('amount')), output_field=money)),
+            'summary_fees': Sum(Case(When(status='completed', then=F('platform_fee')), output_field=money)),
+        }
         
         # Paginate results
         limit = min(int(request.GET.get('limit', 20)), 100)
         offset = int(request.GET.get('offset', 0))
         
-        total_count = transactions.count()
-        transactions = transactions[offset:offset + limit]
+        # The summary rides along on every page row as window aggregates: one query for both
+        page = list(
+            transactions
+            .select_related('booking', 'customer', 'salon', 'booking__service')
+            .annotate(**{name: Window(expression) for name, expression in summary_expressions.items()})
+            .order_by('-created_at')[offset:offset + limit]
+        )
+        if page:
+            summary = {name: getattr(page[0], name) for name in summary_expressions}
+        else:
+            # Past the last page there are no rows to carry the window values
+            summary = transactions.aggregate(**summary_expressions)
+        total_count = summary['summary_count']
         
         # Serialize transaction data
         transactions_data = []
-        for transaction in transactions:
+        for transaction in page:
             transactions_data.append({
                 'id': transaction.id,
                 'transaction_id': f"TXN-{transaction.id:06d}",
@@ -1358,25 +1422,12 @@ def get_salon_transactions(request):
                 'payment_provider_id': transaction.payment_provider_id or '',
             })
         
-        # Calculate totals for salon owner
-        # Use salon_payout if available, otherwise use amount (assuming full amount goes to salon)
-        total_revenue = sum(
-            (t['salon_payout'] if t['salon_payout'] > 0 else t['amount'])
-            for t in transactions_data if t['status'].lower() == 'completed'
-        )
-        total_fees = sum(t['platform_fee'] for t in transactions_data if t['status'].lower() == 'completed')
-        
-        # Count pending payments
-        pending_payments = sum(
-            t['amount'] for t in transactions_data if t['status'].lower() == 'pending'
-        )
-        
         return Response({
             'transactions': transactions_data,
             'summary': {
-                'total_revenue': total_revenue,
-                'pending_payments': pending_payments,
-                'total_platform_fees': total_fees,
+                'total_revenue': float(summary['summary_revenue'] or 0),
+                'pending_payments': float(summary['summary_pending'] or 0),
+                'total_platform_fees': float(summary['summary_fees'] or 0),
                 'transaction_count': total_count
             },
             'pagination': {
@@ -1393,10 +1444,78 @@ def get_salon_transactions(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _export(request, kind):
+    """Stream the caller's transactions or bookings as CSV or JSONL"""
+    try:
+        file_format = request.GET.get('file_type', 'csv')
+        if file_format not in FORMATS:
+            return Response({
+                'error': f"file_type must be one of: {', '.join(FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        model = Transaction if kind == 'transactions' else Booking
+        if request.user.is_staff or request.user.is_superuser:
+            queryset = model.objects.all()
+        elif hasattr(request.user, 'owned_salons') and request.user.owned_salons.exists():
+            queryset = model.objects.filter(salon__owner=request.user)
+        else:
+            return Response({
+                'error': 'Access denied. User is not a salon owner.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if request.GET.get('salon_id'):
+            if not request.GET['salon_id'].isdigit():
+                return Response({
+                    'error': 'salon_id must be a number'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(salon_id=int(request.GET['salon_id']))
+        try:
+            queryset = FILTERS[kind](queryset, request.GET)
+        except ValueError:
+            return Response({
+                'error': 'Invalid date format. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(export_lines(kind, queryset, file_format), content_type=FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, file_format)}"'
+        return response
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@query_budget(2)  # Rows are read while streaming, after the view returns
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_transactions(request):
+    """
+    Export transactions (salon owner: own salons, admin: all)
+
+    file_type=csv (default) or jsonl; same filters as get_salon_transactions plus salon_id.
+    """
+    return _export(request, 'transactions')
+
+
+@query_budget(2)  # Rows are read while streaming, after the view returns
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_bookings(request):
+    """
+    Export bookings (salon owner: own salons, admin: all)
+
+    file_type=csv (default) or jsonl; date_from / date_to on the appointment date,
+    status, payment_status and salon_id.
+    """
+    return _export(request, 'bookings')
+
+
 # ========================
 # Chat API Endpoints
 # ========================
 
+@query_budget(7)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def chat_with_salon(request, salon_id):
@@ -1419,16 +1538,10 @@ def chat_with_salon(request, salon_id):
         if request.method == 'GET':
             # Get existing chat or return empty if none exists
             try:
-                chat = Chat.objects.get(customer=request.user, salon=salon)
-                print(f"DEBUG: Found chat ID: {chat.id}, customer: {chat.customer.email}, salon: {chat.salon.name}")
+                chat = Chat.objects.select_related('customer', 'salon__owner').get(customer=request.user, salon=salon)
                 
-                # Get messages for this chat
-                messages = Message.objects.filter(chat=chat).order_by('sent_at')
-                print(f"DEBUG: Total messages in DB for chat {chat.id}: {messages.count()}")
-                for msg in messages:
-                    print(f"  - Message {msg.id}: {msg.sender_type} - {msg.content[:30]}")
-                
-                messages = messages[:50]
+                # Get messages for this chat (read before they are marked as read below)
+                messages = list(Message.objects.filter(chat=chat).order_by('sent_at')[:50])
                 
                 # Mark salon messages as read by customer
                 Message.objects.filter(
@@ -1447,20 +1560,22 @@ def chat_with_salon(request, salon_id):
                         'sent_at': message.sent_at.isoformat(),
                         'is_read': message.is_read
                     }
-                    # Add image URL if message has an image
-                    if message.image:
-                        message_dict['image_url'] = message.image.url
+                    # Add image URLs if message has an image (thumbnail for the list view)
+                    if message.image_status != 'none' or message.image:
+                        image_fields = chat_image_fields(message)
+                        message_dict.update(image_fields)
+                        message_dict['image_url'] = image_fields['image']
                     
                     # Add sender profile picture
                     if message.sender_type == 'customer':
                         if chat.customer.profile_picture:
-                            message_dict['sender_profile_picture'] = chat.customer.profile_picture.url
+                            message_dict['sender_profile_picture'] = variant_url(chat.customer, 'profile_picture', 'thumb')
                         message_dict['sender_name'] = chat.customer.get_full_name() or 'Customer'
                     else:  # salon
                         # Get salon owner's profile picture
                         salon_owner = chat.salon.owner
                         if salon_owner.profile_picture:
-                            message_dict['sender_profile_picture'] = salon_owner.profile_picture.url
+                            message_dict['sender_profile_picture'] = variant_url(salon_owner, 'profile_picture', 'thumb')
                         message_dict['sender_name'] = chat.salon.name
                     
                     messages_data.append(message_dict)
@@ -1540,19 +1655,30 @@ def chat_with_salon(request, salon_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_chats(request):
     """Get all chats for the authenticated user"""
     try:
-        chats = Chat.objects.filter(
+        # Last message id and unread count per chat as subqueries, instead of two queries per chat
+        chat_messages = Message.objects.filter(chat=OuterRef('pk'))
+        chats = list(Chat.objects.filter(
             customer=request.user,
             is_active=True
-        ).select_related('salon').order_by('-updated_at')
+        ).select_related('salon').annotate(
+            last_message_id=Subquery(chat_messages.order_by('-sent_at').values('pk')[:1]),
+            unread_count=Subquery(
+                chat_messages.filter(sender_type='salon', is_read=False).order_by().values('chat')
+                .annotate(count=Count('pk')).values('count'),
+                output_field=models.IntegerField()
+            ),
+        ).order_by('-updated_at'))
+        last_messages = Message.objects.in_bulk([chat.last_message_id for chat in chats if chat.last_message_id])
         
         chats_data = []
         for chat in chats:
-            last_message = chat.last_message
+            last_message = last_messages.get(chat.last_message_id)
             chats_data.append({
                 'id': chat.id,
                 'salon': {
@@ -1565,7 +1691,7 @@ def get_user_chats(request):
                     'sender_type': last_message.sender_type if last_message else None,
                     'sent_at': last_message.sent_at.isoformat() if last_message else None
                 } if last_message else None,
-                'unread_count': chat.unread_count_for_customer,
+                'unread_count': chat.unread_count or 0,
                 'updated_at': chat.updated_at.isoformat()
             })
         
@@ -1579,6 +1705,7 @@ def get_user_chats(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(5)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_chat_messages(request, salon_id):
@@ -1603,7 +1730,7 @@ def get_chat_messages(request, salon_id):
             'sender_type': msg.sender_type,
             'sent_at': msg.sent_at.isoformat(),
             'is_read': msg.is_read,
-            'image': msg.image.url if msg.image else None
+            **chat_image_fields(msg)
         } for msg in messages]
         
         return Response({
@@ -1617,6 +1744,7 @@ def get_chat_messages(request, salon_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(8)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_message(request, salon_id):
@@ -1631,6 +1759,11 @@ def send_message(request, salon_id):
             return Response({'error': 'Salon owners cannot initiate chats. Customers must start the conversation first.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        # Validate the image before touching the chat
+        image = request.FILES.get('image')
+        if image:
+            validate_image_upload(image)
+        
         # Get or create chat (customer to salon)
         chat, created = Chat.objects.get_or_create(
             customer=request.user,
@@ -1638,31 +1771,37 @@ def send_message(request, salon_id):
             defaults={'is_active': True}
         )
         
-        # Create message
+        # Create message; the image itself is processed in the background
         message = Message.objects.create(
             chat=chat,
             sender_type='customer',
             content=request.data.get('content', ''),
             message_type=request.data.get('message_type', 'text'),
-            image=request.FILES.get('image') if 'image' in request.FILES else None
+            image_status='processing' if image else 'none'
         )
         
+        if image:
+            queue_chat_image(message, image)
+        
         return Response({
             'id': message.id,
             'content': message.content,
             'message_type': message.message_type,
             'sender_type': message.sender_type,
             'sent_at': message.sent_at.isoformat(),
-            'image': message.image.url if message.image else None,
+            **chat_image_fields(message),
             'chat_id': chat.id
         }, status=status.HTTP_201_CREATED)
         
+    except ImageValidationError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Salon.DoesNotExist:
         return Response({'error': 'Salon not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_message_as_read(request, message_id):
@@ -1686,6 +1825,7 @@ def mark_message_as_read(request, message_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_salon_chats(request):
@@ -1715,14 +1855,15 @@ def get_salon_chats(request):
         chats = Chat.objects.filter(
             salon=salon,
             is_active=True
-        ).select_related('customer').order_by('-updated_at')
+        ).select_related('customer', 'salon__owner').prefetch_related(
+            Prefetch('messages', queryset=Message.objects.order_by('sent_at'), to_attr='ordered_messages')
+        ).order_by('-updated_at')
         
         chats_data = []
         for chat in chats:
-            last_message = chat.last_message
-            
-            # Get all messages for this chat
-            messages = Message.objects.filter(chat=chat).order_by('sent_at')
+            # Get all messages for this chat (prefetched for every chat in one query)
+            messages = chat.ordered_messages
+            last_message = messages[-1] if messages else None
             messages_data = []
             for message in messages:
                 message_dict = {
@@ -1733,19 +1874,21 @@ def get_salon_chats(request):
                     'sent_at': message.sent_at.isoformat(),
                     'is_read': message.is_read
                 }
-                # Add image URL if message has an image
-                if message.image:
-                    message_dict['image_url'] = message.image.url
+                # Add image URLs if message has an image (thumbnail for the list view)
+                if message.image_status != 'none' or message.image:
+                    image_fields = chat_image_fields(message)
+                    message_dict.update(image_fields)
+                    message_dict['image_url'] = image_fields['image']
                 
                 # Add sender profile picture
                 if message.sender_type == 'customer':
                     if chat.customer.profile_picture:
-                        message_dict['sender_profile_picture'] = chat.customer.profile_picture.url
+                        message_dict['sender_profile_picture'] = variant_url(chat.customer, 'profile_picture', 'thumb')
                     message_dict['sender_name'] = chat.customer.get_full_name() or 'Customer'
                 else:  # salon
                     salon_owner = chat.salon.owner
                     if salon_owner.profile_picture:
-                        message_dict['sender_profile_picture'] = salon_owner.profile_picture.url
+                        message_dict['sender_profile_picture'] = variant_url(salon_owner, 'profile_picture', 'thumb')
                     message_dict['sender_name'] = chat.salon.name
                 
                 messages_data.append(message_dict)
@@ -1763,7 +1906,7 @@ def get_salon_chats(request):
                     'sent_at': last_message.sent_at.isoformat() if last_message else None
                 } if last_message else None,
                 'messages': messages_data,
-                'unread_count': chat.unread_count_for_salon,
+                'unread_count': sum(1 for message in messages if message.sender_type == 'customer' and not message.is_read),
                 'updated_at': chat.updated_at.isoformat()
             })
         
@@ -1791,6 +1934,7 @@ def get_salon_chats(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(7)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_salon_chat_messages(request, customer_id):
@@ -1827,7 +1971,7 @@ def get_salon_chat_messages(request, customer_id):
             'sender_type': msg.sender_type,
             'sent_at': msg.sent_at.isoformat(),
             'is_read': msg.is_read,
-            'image': msg.image.url if msg.image else None
+            **chat_image_fields(msg)
         } for msg in messages]
         
         return Response({
@@ -1844,6 +1988,7 @@ def get_salon_chat_messages(request, customer_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(9)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_salon_message(request, customer_id):
@@ -1879,15 +2024,26 @@ def send_salon_message(request, customer_id):
                 'error': 'Message content or image is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create message
+        if image:
+            try:
+                validate_image_upload(image)
+            except ImageValidationError as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Create message; the image itself is processed in the background
         message = Message.objects.create(
             chat=chat,
             sender_type='salon',
             message_type=message_type,
             content=content,
-            image=image
+            image_status='processing' if image else 'none'
         )
         
+        if image:
+            queue_chat_image(message, image)
+        
         # Update chat timestamp
         chat.updated_at = timezone.now()
         chat.save()
@@ -1916,10 +2072,12 @@ def send_salon_message(request, customer_id):
             }
         }
         
-        # Add image URL if message has an image
-        if message.image:
-            response_data['message']['image_url'] = message.image.url
-            response_data['image_url'] = message.image.url
+        # Add image URLs if message has an image (placeholder until processed)
+        if image:
+            image_fields = chat_image_fields(message)
+            response_data['message'].update(image_fields)
+            response_data['message']['image_url'] = image_fields['image']
+            response_data['image_url'] = image_fields['image']
         
         return Response(response_data, status=status.HTTP_201_CREATED)
         
@@ -1929,6 +2087,7 @@ def send_salon_message(request, customer_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def check_available_slots(request):
@@ -2022,6 +2181,7 @@ def check_available_slots(request):
 # STRIPE PAYMENT ENDPOINTS
 # ======================
 
+@query_budget(12)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_stripe_checkout_session(request, booking_id):
@@ -2030,13 +2190,7 @@ def create_stripe_checkout_session(request, booking_id):
         import stripe
         from django.conf import settings
         
-        # Configure Stripe
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        
-        # Debug logging
         print(f"[STRIPE] Creating checkout for booking {booking_id}")
-        print(f"[STRIPE] API key configured: {bool(stripe.api_key)}")
-        print(f"[STRIPE] API key starts with: {stripe.api_key[:15] if stripe.api_key else 'None'}")
         
         # Get booking
         try:
@@ -2057,7 +2211,7 @@ def create_stripe_checkout_session(request, booking_id):
             # Convert PHP to cents (Stripe uses smallest currency unit)
             amount_in_cents = int(float(booking.price) * 100)
             
-            checkout_session = stripe.checkout.Session.create(
+            checkout_session = get_gateway('stripe').create_checkout_session(
                 payment_method_types=['card'],
                 line_items=[{
                     'price_data': {
@@ -2131,6 +2285,10 @@ def create_stripe_checkout_session(request, booking_id):
                 'transaction_id': transaction.id
             }, status=status.HTTP_200_OK)
             
+        except PaymentProviderUnavailable as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except stripe.error.StripeError as e:
             print(f"[STRIPE ERROR] {str(e)}")
             import traceback
@@ -2149,25 +2307,21 @@ def create_stripe_checkout_session(request, booking_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Webhook doesn't use authentication
 def stripe_webhook(request):
-    """Handle Stripe webhook events"""
+    """Verify a Stripe webhook event and queue it for processing"""
     import logging
     logger = logging.getLogger(__name__)
     
     try:
-        import stripe
         from django.conf import settings
         from django.http import HttpResponse
         
         logger.info("[STRIPE WEBHOOK] Received webhook request")
         
-        # Configure Stripe
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        webhook_secret = settings.STRIPE_WEBHOOK_SECRET
-        
-        logger.info(f"[STRIPE WEBHOOK] Webhook secret configured: {bool(webhook_secret)}")
+        logger.info(f"[STRIPE WEBHOOK] Webhook secret configured: {bool(settings.STRIPE_WEBHOOK_SECRET)}")
         
         payload = request.body
         sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
@@ -2176,9 +2330,7 @@ def stripe_webhook(request):
         
         try:
             # Verify webhook signature
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, webhook_secret
-            )
+            event = get_gateway('stripe').construct_event(payload, sig_header)
             logger.info(f"[STRIPE WEBHOOK] Event verified: {event['type']}")
         except ValueError as e:
             # Invalid payload
@@ -2189,174 +2341,12 @@ def stripe_webhook(request):
             logger.error(f"[STRIPE WEBHOOK] Webhook verification error: {str(e)}")
             return HttpResponse(status=400)
         
-        # Handle the event
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            logger.info(f"[STRIPE WEBHOOK] Processing checkout.session.completed")
-            
-            # Get booking ID from metadata
-            booking_id = session.get('client_reference_id') or session['metadata'].get('booking_id')
-            logger.info(f"[STRIPE WEBHOOK] Booking ID from session: {booking_id}")
-            
-            if booking_id:
-                try:
-                    booking = Booking.objects.get(id=booking_id)
-                    logger.info(f"[STRIPE WEBHOOK] Found booking #{booking.id}, current status: {booking.status}, payment_status: {booking.payment_status}")
-                    
-                    # Update booking payment status and confirm booking
-                    booking.payment_status = 'completed'
-                    booking.status = 'confirmed'  # Auto-confirm booking when payment is completed
-                    booking.payment_id = session['payment_intent']
-                    booking.payment_method = 'stripe'
-                    booking.save()
-                    
-                    logger.info(f"[STRIPE WEBHOOK] ✅ Booking #{booking.id} updated to CONFIRMED and PAID")
-                    
-                    # Log booking confirmation
-                    log_booking_activity(
-                        booking=booking,
-                        user=booking.customer,
-                        action="CONFIRMED",
-                        details={
-                            'payment_method': 'stripe',
-                            'session_id': session['id'],
-                            'payment_intent': session['payment_intent'],
-                            'auto_confirmed': True,
-                            'reason': 'Payment completed successfully via webhook'
-                        },
-                        request=None
-                    )
-                    
-                    # Update transaction
-                    try:
-                        transaction = Transaction.objects.get(
-                            booking=booking,
-                            payment_provider_id=session['id'],
-                            status='pending'
-                        )
-                        transaction.status = 'completed'
-                        transaction.payment_provider_transaction_id = session['payment_intent']
-                        transaction.processed_at = timezone.now()
-                        transaction.metadata.update({
-                            'payment_completed_at': timezone.now().isoformat(),
-                            'stripe_session_id': session['id'],
-                            'stripe_payment_intent': session['payment_intent']
-                        })
-                        transaction.save()
-                        
-                        logger.info(f"[STRIPE WEBHOOK] Transaction updated to completed")
-                        
-                    except Transaction.DoesNotExist:
-                        # Create transaction if doesn't exist
-                        transaction = Transaction.objects.create(
-                            booking=booking,
-                            customer=booking.customer,
-                            salon=booking.salon,
-                            transaction_type='payment',
-                            amount=booking.price,
-                            currency='PHP',
-                            status='completed',
-                            payment_method='stripe',
-                            payment_provider_id=session['id'],
-                            payment_provider_transaction_id=session['payment_intent'],
-                            description=f"Stripe payment for {booking.service.name} at {booking.salon.name}",
-                            processed_at=timezone.now()
-                        )
-                        transaction.calculate_platform_fee(0.03)
-                        transaction.save()
-                    
-                    # Send confirmation email
-                    send_booking_confirmation_email(booking)
-                    
-                    # Create notification for customer about confirmed booking
-                    from notifications.models import Notification
-                    Notification.create_notification(
-                        user=booking.customer,
-                        notification_type='booking_confirmed',
-                        title='Booking Confirmed!',
-                        message=f'Your booking for {booking.service.name} at {booking.salon.name} on {booking.booking_date} at {booking.booking_time} has been confirmed. Payment received successfully.',
-                        action_url='/customer-bookings.html',
-                        related_object=booking,
-                        metadata={
-                            'booking_id': booking.id,
-                            'payment_method': 'stripe',
-                            'payment_status': 'completed',
-                            'booking_status': 'confirmed'
-                        }
-                    )
-                    
-                    # Create notification for salon owner
-                    Notification.create_notification(
-                        user=booking.salon.owner,
-                        notification_type='booking_confirmed',
-                        title='Booking Payment Received',
-                        message=f'Payment received for booking from {booking.customer_name} for {booking.service.name} on {booking.booking_date} at {booking.booking_time}. Booking is now confirmed.',
-                        action_url='/salon-owner-dashboard.html',
-                        related_object=booking,
-                        metadata={
-                            'booking_id': booking.id,
-                            'customer_name': booking.customer_name,
-                            'payment_method': 'stripe',
-                            'amount': str(booking.price)
-                        }
-                    )
-                    
-                except Booking.DoesNotExist:
-                    print(f"[STRIPE] Booking {booking_id} not found")
-        
-        elif event['type'] == 'checkout.session.expired':
-            session = event['data']['object']
-            booking_id = session.get('client_reference_id') or session['metadata'].get('booking_id')
-            
-            if booking_id:
-                try:
-                    booking = Booking.objects.get(id=booking_id)
-                    
-                    # Update transaction to failed
-                    try:
-                        transaction = Transaction.objects.get(
-                            booking=booking,
-                            payment_provider_id=session['id'],
-                            status='pending'
-                        )
-                        transaction.status = 'failed'
-                        transaction.metadata.update({
-                            'failure_reason': 'Checkout session expired',
-                            'failed_at': timezone.now().isoformat()
-                        })
-                        transaction.save()
-                    except Transaction.DoesNotExist:
-                        pass
-                        
-                except Booking.DoesNotExist:
-                    pass
-        
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            
-            # Try to find booking by payment intent
-            try:
-                booking = Booking.objects.get(payment_id=payment_intent['id'])
-                booking.payment_status = 'failed'
-                booking.save()
-                
-                # Update transaction
-                try:
-                    transaction = Transaction.objects.get(
-                        booking=booking,
-                        payment_provider_transaction_id=payment_intent['id']
-                    )
-                    transaction.status = 'failed'
-                    transaction.metadata.update({
-                        'failure_reason': payment_intent.get('last_payment_error', {}).get('message', 'Payment failed'),
-                        'failed_at': timezone.now().isoformat()
-                    })
-                    transaction.save()
-                except Transaction.DoesNotExist:
-                    pass
-                    
-            except Booking.DoesNotExist:
-                pass
+        # Record the event and answer right away; bookings.stripe_events applies it
+        if record_event(parse_payload(payload)):
+            if settings.STRIPE_WEBHOOK_PROCESSING == 'background':
+                run_in_background(process_events_in_background)
+        else:
+            logger.info(f"[STRIPE WEBHOOK] Event {event['id']} already received, ignoring")
         
         return HttpResponse(status=200)
         
@@ -2365,15 +2355,13 @@ def stripe_webhook(request):
         return HttpResponse(status=500)
 
 
+@query_budget(12)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def verify_stripe_payment(request, booking_id):
     """Verify Stripe payment after redirect (fallback if webhook fails)"""
     try:
         import stripe
-        from django.conf import settings
-        
-        stripe.api_key = settings.STRIPE_SECRET_KEY
         
         # Get booking
         try:
@@ -2391,7 +2379,7 @@ def verify_stripe_payment(request, booking_id):
         
         try:
             # Retrieve the session from Stripe
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = get_gateway('stripe').retrieve_checkout_session(session_id)
             
             if session.payment_status == 'paid':
                 # Update booking if not already updated
@@ -2443,6 +2431,10 @@ def verify_stripe_payment(request, booking_id):
                     'payment_status': session.payment_status
                 }, status=status.HTTP_200_OK)
                 
+        except PaymentProviderUnavailable as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except stripe.error.StripeError as e:
             return Response({
                 'error': 'Stripe error',
@@ -1,8 +1,55 @@
 """
 Gunicorn configuration with CORS headers injection
+
+GUNICORN_PROFILE selects the worker model:
+  sync     one request at a time per process
+  gthread  processes x threads; a request waiting on Brevo, Stripe, PayPal or
+           Google only holds its own thread (default)
+  gevent   cooperative greenlets, the most concurrency for I/O-bound traffic.
+           psycopg2 is made cooperative with psycogreen, and persistent DB
+           connections are off because every greenlet opens its own
+
+Every request thread or greenlet may hold a database connection, and so may
+each worker's background task pool and activity flusher. Worker counts follow
+the CPUs available to the container, capped so that all of them together stay
+within GUNICORN_DB_CONNECTIONS. WEB_CONCURRENCY, GUNICORN_THREADS and
+GUNICORN_WORKER_CONNECTIONS override them, and startup fails if that goes over
+the budget. gevent is refused unless DB_POOL_MODE=pgbouncer.
 """
 import logging
+import math
 import os
+import decouple
+
+
+def available_cpus():
+    """CPUs this process may use: the cgroup quota if set, else the affinity mask"""
+    quota_files = [
+        ('/sys/fs/cgroup/cpu.max', None),  # cgroup v2: "<quota> <period>"
+        ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us', '/sys/fs/cgroup/cpu/cpu.cfs_period_us'),  # cgroup v1
+    ]
+    for quota_path, period_path in quota_files:
+        try:
+            with open(quota_path) as f:
+                values = f.read().split()
+            if period_path:
+                with open(period_path) as f:
+                    values.append(f.read().strip())
+            quota, period = values[0], values[1]
+            if quota not in ('max', '-1'):
+                return max(1, math.ceil(int(quota) / int(period)))
+        except (OSError, ValueError, IndexError):
+            continue
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
 
 # Logging
 loglevel = 'info'
@@ -10,11 +57,63 @@ accesslog = '-'
 errorlog = '-'
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
 
-# Server mechanics - bind will be overridden by command line
-workers = 2
-worker_class = 'sync'
-timeout = 120
-keepalive = 2
+# Worker model - bind will be overridden by command line
+profile = os.environ.get('GUNICORN_PROFILE', 'gthread').lower()
+cpus = available_cpus()
+
+# Database connections (to the server, or to the pooler with DB_POOL_MODE=pgbouncer) one instance may hold.
+# Keep it under the database's max_connections, less what other instances and jobs use
+db_connections = decouple.config('GUNICORN_DB_CONNECTIONS', default=20, cast=int)
+# Per worker, besides its requests: the background task pool and the activity event flusher
+background_connections = decouple.config('BACKGROUND_TASK_WORKERS', default=2, cast=int) + 1
+
+
+def fit_workers(default, per_worker):
+    """WEB_CONCURRENCY, else `default` workers or as many as the connection budget allows (at least one)"""
+    return env_int('WEB_CONCURRENCY', max(1, min(default, db_connections // (per_worker + background_connections))))
+
+
+if profile == 'sync':
+    worker_class = 'sync'
+    concurrency = 1
+    workers = fit_workers(cpus * 2 + 1, concurrency)
+elif profile == 'gthread':
+    worker_class = 'gthread'
+    threads = concurrency = env_int('GUNICORN_THREADS', 4)
+    workers = fit_workers(cpus + 1, concurrency)
+elif profile == 'gevent':
+    if decouple.config('DB_POOL_MODE', default='direct') != 'pgbouncer':
+        raise RuntimeError(
+            "GUNICORN_PROFILE=gevent opens a database connection per greenlet; "
+            "put a transaction-mode pooler in front of the database and set DB_POOL_MODE=pgbouncer"
+        )
+    worker_class = 'gevent'
+    worker_connections = concurrency = env_int('GUNICORN_WORKER_CONNECTIONS', 100)
+    workers = fit_workers(cpus + 1, concurrency)
+    # Read by settings.py in the workers; a greenlet's connection is never reused by the next request
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+else:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE '{profile}' (expected sync, gthread or gevent)")
+
+max_db_connections = workers * (concurrency + background_connections)
+if max_db_connections > db_connections:
+    raise RuntimeError(
+        f"{workers} worker(s) x ({concurrency} concurrent requests + {background_connections} background) "
+        f"can open {max_db_connections} database connections, over GUNICORN_DB_CONNECTIONS={db_connections}. "
+        f"Lower WEB_CONCURRENCY, GUNICORN_THREADS or GUNICORN_WORKER_CONNECTIONS, or raise the budget"
+    )
+
+timeout = env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 2)
+
+# Recycle workers to bound slow leaks; the jitter keeps them from all restarting at once
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+# Heartbeat files in memory: a slow disk must not get healthy workers killed
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
 
 # Security
 forwarded_allow_ips = '*'
@@ -24,10 +123,38 @@ secure_scheme_headers = {
     'X-FORWARDED-SSL': 'on'
 }
 
+
+def when_ready(server):
+    server.log.info(
+        f"Profile {profile}: {workers} {worker_class} worker(s) on {cpus} CPU(s)"
+        + (f" x {threads} threads" if worker_class == 'gthread' else '')
+        + (f" x {worker_connections} connections" if worker_class == 'gevent' else '')
+        + f", up to {max_db_connections} of {db_connections} database connections"
+    )
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # libpq would otherwise block the whole worker while it waits on the database
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    """Resume Stripe events and chat images left behind, e.g. by the worker this one replaces"""
+    from django.conf import settings
+    from bookings.image_pipeline import recover_chat_images
+    from salon_booking.background import run_in_background
+    if settings.STRIPE_WEBHOOK_PROCESSING == 'background':
+        from bookings.stripe_events import process_events_in_background
+        run_in_background(process_events_in_background)
+    run_in_background(recover_chat_images)
+
+
 def post_request(worker, req, environ, resp):
     """Add CORS headers to every response"""
     origin = environ.get('HTTP_ORIGIN', '*')
-    
+
     # Add CORS headers to response (no COOP since same-origin now)
     cors_headers = [
         ('Access-Control-Allow-Origin', origin),
@@ -36,8 +163,8 @@ def post_request(worker, req, environ, resp):
         ('Access-Control-Allow-Headers', 'Content-Type, Authorization, Accept, X-CSRFToken'),
         ('Access-Control-Max-Age', '86400'),
     ]
-    
+
     for header, value in cors_headers:
         resp.headers.append((header, value))
-    
+
     logging.debug(f"Added CORS headers for origin: {origin}")
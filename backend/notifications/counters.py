@@ -0,0 +1,56 @@
+"""
+Per-user unread notification counter kept in the cache
+The counter is adjusted on create/read/delete so unread_count polls are a
+single cache hit. A missing key is rebuilt from the database on next read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+UNREAD_COUNT_KEY = 'notifications:unread:{user_id}'
+
+
+def _key(user_id):
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def get_unread_count(user_id):
+    """Return the cached unread count, computing it on a miss"""
+    cached = cache.get(_key(user_id))
+    if cached is not None and cached >= 0:
+        return cached
+
+    from .models import Notification
+    count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    if cached is None:
+        # add() keeps a concurrent increment that landed first
+        cache.add(_key(user_id), count, settings.NOTIFICATION_COUNT_CACHE_TIMEOUT)
+    else:
+        # Drifted below zero: overwrite
+        cache.set(_key(user_id), count, settings.NOTIFICATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def _adjust(user_id, delta):
+    try:
+        cache.incr(_key(user_id), delta)
+    except ValueError:
+        # Not cached: the next read recomputes it
+        pass
+
+
+def adjust_unread_count(user_id, delta):
+    """Add delta to the user's counter once the current transaction commits"""
+    if delta:
+        transaction.on_commit(lambda: _adjust(user_id, delta))
+
+
+def invalidate_unread_count(user_id):
+    """Drop the user's counter so the next read recomputes it"""
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
+
+
+def invalidate_unread_counts(user_ids):
+    """Drop several counters at once, e.g. after writes that bypass the model"""
+    keys = [_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
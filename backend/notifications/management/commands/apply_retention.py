@@ -0,0 +1,336 @@
+"""
+Management command to enforce data retention on notifications, chat messages and activity logs
+Run this daily (e.g., from cron) during off-peak hours
+
+Expired rows are archived to gzipped JSONL and deleted in small chunks, each in
+its own transaction, so the tables are never locked for long. Progress is saved
+after every chunk; an interrupted run picks up where it stopped with the same
+cutoff and archive file. Rotated activity log segments past their TTL are moved
+to the archive directory whole.
+"""
+import os
+import json
+import glob
+import gzip
+import time
+import shutil
+from collections import Counter
+from datetime import datetime, timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from notifications.counters import adjust_unread_count
+
+
+# Checked in order. A row matched by an earlier policy is gone before later ones run.
+DEFAULT_POLICIES = [
+    {
+        'name': 'read-info-notifications',
+        'model': 'notifications.Notification',
+        'filter': {'is_read': True, 'notification_type': 'info'},
+        'date_field': 'created_at',
+        'days': 30,
+        'action': 'archive',
+    },
+    {
+        'name': 'read-notifications',
+        'model': 'notifications.Notification',
+        'filter': {'is_read': True},
+        'date_field': 'created_at',
+        'days': 90,
+        'action': 'archive',
+    },
+    {
+        'name': 'stale-notifications',
+        'model': 'notifications.Notification',
+        'filter': {},
+        'date_field': 'created_at',
+        'days': 365,
+        'action': 'archive',
+    },
+    {
+        'name': 'chat-messages',
+        'model': 'bookings.Message',
+        'filter': {'is_read': True},
+        'date_field': 'sent_at',
+        'days': 730,
+        'action': 'archive',
+        'file_fields': ['image', 'image_thumbnail'],
+    },
+    {
+        'name': 'activity-events',
+        'model': 'activity.ActivityEvent',
+        'filter': {},
+        'date_field': 'created_at',
+        'days': 365,
+        'action': 'archive',
+    },
+    {
+        'name': 'activity-logs',
+        'log_files': ['user_activities.jsonl', 'salon_activities.jsonl'],
+        'days': 180,
+        'action': 'archive',
+    },
+]
+
+
+class Command(BaseCommand):
+    help = 'Archive and delete expired notifications, chat messages and activity log entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policy',
+            action='append',
+            dest='policies',
+            help='Only run the named policy (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between chunks to limit load (default: 0)'
+        )
+        parser.add_argument(
+            '--archive-dir',
+            default=None,
+            help='Where archives and resume state are written (default: RETENTION_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Delete without writing archives'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Discard saved progress and start with fresh cutoffs'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows each policy would remove'
+        )
+
+    def handle(self, *args, **options):
+        policies = getattr(settings, 'RETENTION_POLICIES', DEFAULT_POLICIES)
+        if options['policies']:
+            unknown = set(options['policies']) - {p['name'] for p in policies}
+            if unknown:
+                raise CommandError(f"Unknown policy: {', '.join(sorted(unknown))}")
+            policies = [p for p in policies if p['name'] in options['policies']]
+
+        self.chunk_size = options['chunk_size']
+        self.sleep = options['sleep']
+        self.no_archive = options['no_archive']
+        self.dry_run = options['dry_run']
+
+        self.archive_dir = options['archive_dir'] or settings.RETENTION_ARCHIVE_DIR
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.state_path = os.path.join(self.archive_dir, 'retention_state.json')
+        self.state = {} if options['restart'] else self.load_state()
+
+        for policy in policies:
+            if 'log_files' in policy:
+                self.run_log_policy(policy)
+            else:
+                self.run_model_policy(policy)
+
+    # ------------------------------------------------------------------
+    # Resume state
+    # ------------------------------------------------------------------
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_state(self):
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def start_run(self, policy, cutoff):
+        """Return saved progress for the policy, or begin a new run"""
+        run = self.state.get(policy['name'])
+        if run:
+            self.stdout.write(
+                self.style.WARNING(f"[{policy['name']}] Resuming run from {run['started_at']} (cutoff {run['cutoff']})")
+            )
+            return run
+
+        started_at = timezone.now()
+        archive_path = None
+        if policy.get('action') == 'archive' and not self.no_archive:
+            archive_path = os.path.join(
+                self.archive_dir,
+                policy['name'],
+                f"{started_at.strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+            )
+        run = {
+            'started_at': started_at.isoformat(),
+            'cutoff': cutoff.isoformat(),
+            'last_pk': 0,
+            'rows': 0,
+            'archive': archive_path,
+        }
+        self.state[policy['name']] = run
+        self.save_state()
+        return run
+
+    def finish_run(self, policy, run, elapsed):
+        del self.state[policy['name']]
+        self.save_state()
+
+        rate = run['rows'] / elapsed if elapsed else 0
+        archive_note = f" to {run['archive']}" if run['archive'] and run['rows'] else ''
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[{policy['name']}] Removed {run['rows']} row(s){archive_note} "
+                f"in {elapsed:.1f}s ({rate:.0f} rows/sec)"
+            )
+        )
+
+    def write_archive(self, run, records):
+        """Append records to the run's archive (gzip members concatenate cleanly)"""
+        if not run['archive'] or not records:
+            return
+        os.makedirs(os.path.dirname(run['archive']), exist_ok=True)
+        with gzip.open(run['archive'], 'at', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+
+    # ------------------------------------------------------------------
+    # Database tables
+    # ------------------------------------------------------------------
+
+    def run_model_policy(self, policy):
+        model = apps.get_model(policy['model'])
+        cutoff = timezone.now() - timedelta(days=policy['days'])
+
+        if self.dry_run:
+            count = model.objects.filter(
+                **policy['filter'], **{f"{policy['date_field']}__lt": cutoff}
+            ).count()
+            self.stdout.write(
+                self.style.WARNING(f"[DRY RUN] [{policy['name']}] Would remove {count} {model._meta.verbose_name_plural}")
+            )
+            return
+
+        run = self.start_run(policy, cutoff)
+        expired = model.objects.filter(
+            **policy['filter'],
+            **{f"{policy['date_field']}__lt": datetime.fromisoformat(run['cutoff'])}
+        )
+        started = time.monotonic()
+
+        while True:
+            # Walk the primary key so each chunk is a bounded range scan
+            pks = list(
+                expired.filter(pk__gt=run['last_pk']).order_by('pk').values_list('pk', flat=True)[:self.chunk_size]
+            )
+            if not pks:
+                break
+
+            rows = list(model.objects.filter(pk__in=pks).values())
+            # Archive first: a crash between the two steps can only duplicate archived rows
+            self.write_archive(run, rows)
+
+            with transaction.atomic():
+                deleted, _ = model.objects.filter(pk__in=pks).delete()
+                self.after_delete(policy, model, rows)
+
+            self.delete_files(policy, rows)
+
+            run['last_pk'] = pks[-1]
+            run['rows'] += deleted
+            self.save_state()
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"[{policy['name']}] {run['rows']} row(s) removed "
+                f"({run['rows'] / elapsed if elapsed else 0:.0f} rows/sec)"
+            )
+            if self.sleep:
+                time.sleep(self.sleep)
+
+        self.finish_run(policy, run, time.monotonic() - started)
+
+    def after_delete(self, policy, model, rows):
+        """Keep the cached unread counters in step with bulk deletes"""
+        if model._meta.label == 'notifications.Notification':
+            unread = Counter(row['user_id'] for row in rows if not row['is_read'])
+            for user_id, count in unread.items():
+                adjust_unread_count(user_id, -count)
+
+    def delete_files(self, policy, rows):
+        """Remove stored media of deleted rows, which would otherwise be orphaned"""
+        for field_name in policy.get('file_fields', []):
+            for row in rows:
+                if row.get(field_name):
+                    try:
+                        default_storage.delete(row[field_name])
+                    except Exception as e:
+                        self.stdout.write(self.style.WARNING(f"Could not delete {row[field_name]}: {e}"))
+
+    # ------------------------------------------------------------------
+    # Activity log segments
+    # ------------------------------------------------------------------
+
+    def expired_segments(self, policy, cutoff):
+        """Rotated, gzipped segments last written before the cutoff"""
+        segments = []
+        for file_name in policy['log_files']:
+            stem = os.path.splitext(file_name)[0]
+            pattern = os.path.join(settings.ACTIVITY_LOG_DIR, f'{stem}.*.jsonl.gz')
+            for path in sorted(glob.glob(pattern)):
+                # A segment is rotated after its last record, so its mtime bounds every line in it
+                if os.path.getmtime(path) < cutoff.timestamp():
+                    segments.append(path)
+        return segments
+
+    def run_log_policy(self, policy):
+        cutoff = timezone.now() - timedelta(days=policy['days'])
+
+        if self.dry_run:
+            segments = self.expired_segments(policy, cutoff)
+            self.stdout.write(
+                self.style.WARNING(f"[DRY RUN] [{policy['name']}] Would remove {len(segments)} log segment(s)")
+            )
+            return
+
+        run = self.start_run(policy, cutoff)
+        started = time.monotonic()
+        target_dir = os.path.dirname(run['archive']) if run['archive'] else None
+
+        # Segments are already gzipped JSONL: archiving is a move
+        for path in self.expired_segments(policy, datetime.fromisoformat(run['cutoff'])):
+            if target_dir:
+                os.makedirs(target_dir, exist_ok=True)
+                shutil.move(path, os.path.join(target_dir, os.path.basename(path)))
+            else:
+                os.remove(path)
+            # Sidecar index written by view_activities.py
+            if os.path.exists(f'{path}.idx'):
+                os.remove(f'{path}.idx')
+            run['rows'] += 1
+            self.save_state()
+
+        elapsed = time.monotonic() - started
+        self.state.pop(policy['name'], None)
+        self.save_state()
+        destination = f" to {target_dir}" if target_dir and run['rows'] else ''
+        self.stdout.write(
+            self.style.SUCCESS(f"[{policy['name']}] Removed {run['rows']} log segment(s){destination} in {elapsed:.1f}s")
+        )
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from collections import Counter
+from .counters import adjust_unread_count
 
 User = get_user_model()
 
@@ -63,6 +65,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read', '-created_at']),
             models.Index(fields=['user', 'notification_type', '-created_at']),
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -74,7 +77,44 @@ class Notification(models.Model):
             from django.utils import timezone
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
+            # Conditional update so concurrent reads only decrement the counter once
+            updated = Notification.objects.filter(pk=self.pk, is_read=False).update(
+                is_read=True,
+                read_at=self.read_at
+            )
+            adjust_unread_count(self.user_id, -updated)
+    
+    def delete(self, *args, **kwargs):
+        """Delete notification and keep the unread counter in step"""
+        was_unread = not self.is_read
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        if was_unread:
+            adjust_unread_count(user_id, -1)
+        return result
+    
+    @classmethod
+    def build_notification(cls, user, notification_type, title, message, action_url=None, related_object=None, metadata=None):
+        """
+        Build an unsaved notification (see create_notification for arguments)
+        
+        The related object's ContentType comes from the ContentType manager's
+        per-process cache, so no lookup query is made after the first use.
+        """
+        notification = cls(
+            user=user,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            action_url=action_url,
+            metadata=metadata or {}
+        )
+        
+        if related_object is not None:
+            notification.content_type_id = ContentType.objects.get_for_model(related_object).id
+            notification.object_id = related_object.pk
+        
+        return notification
     
     @classmethod
     def create_notification(cls, user, notification_type, title, message, action_url=None, related_object=None, metadata=None):
@@ -90,17 +130,36 @@ class Notification(models.Model):
             related_object: Optional related model instance
             metadata: Optional additional data
         """
-        notification = cls(
+        notification = cls.build_notification(
             user=user,
             notification_type=notification_type,
             title=title,
             message=message,
             action_url=action_url,
-            metadata=metadata or {}
+            related_object=related_object,
+            metadata=metadata
         )
-        
-        if related_object:
-            notification.related_object = related_object
-        
         notification.save()
+        adjust_unread_count(notification.user_id, 1)
         return notification
+    
+    @classmethod
+    def notify_many(cls, notifications, batch_size=500):
+        """
+        Create many notifications with bulk INSERTs
+        
+        Args:
+            notifications: Iterable of dicts with create_notification arguments.
+                For a fan-out, pass the same fields with a different user each.
+            batch_size: Rows per INSERT
+        
+        Returns:
+            list: Created notifications
+        """
+        built = [cls.build_notification(**fields) for fields in notifications]
+        created = cls.objects.bulk_create(built, batch_size=batch_size)
+        
+        for user_id, count in Counter(n.user_id for n in created).items():
+            adjust_unread_count(user_id, count)
+        
+        return created
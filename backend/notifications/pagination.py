@@ -0,0 +1,18 @@
+"""
+Keyset pagination for notification lists
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class NotificationCursorPagination(CursorPagination):
+    """
+    Cursor pagination on (-created_at, -id)
+
+    Pages are fetched with created_at < cursor position, so each page is an
+    index range scan instead of an OFFSET over the user's whole history.
+    `limit` sets the page size.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
@@ -22,6 +22,23 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'read_at']
 
 
+class NotificationCompactSerializer(serializers.ModelSerializer):
+    """Lightweight serializer for notification lists (no metadata)"""
+    
+    class Meta:
+        model = Notification
+        fields = [
+            'id',
+            'notification_type',
+            'title',
+            'message',
+            'is_read',
+            'read_at',
+            'action_url',
+            'created_at',
+        ]
+
+
 class NotificationCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating notifications (admin use)"""
     
@@ -3,16 +3,20 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import Notification
-from .serializers import NotificationSerializer, NotificationCreateSerializer
+from .pagination import NotificationCursorPagination
+from .serializers import NotificationSerializer, NotificationCreateSerializer, NotificationCompactSerializer
+from .counters import get_unread_count, adjust_unread_count, invalidate_unread_count
+from salon_booking.query_budget import QueryBudgetMixin
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing user notifications
     
     Endpoints:
-    - GET /api/notifications/ - List user's notifications
+    - GET /api/notifications/ - List user's notifications (cursor paginated)
     - GET /api/notifications/{id}/ - Get specific notification
     - POST /api/notifications/{id}/mark_read/ - Mark notification as read
     - POST /api/notifications/mark_all_read/ - Mark all notifications as read
@@ -22,6 +26,19 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
+    pagination_class = NotificationCursorPagination
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+        'create': 4,
+        'update': 4,
+        'partial_update': 4,
+        'destroy': 4,
+        'mark_read': 3,
+        'mark_all_read': 2,
+        'unread_count': 2,
+        'clear_read': 4,
+    }
     
     def get_queryset(self):
         """Return notifications for the current user only"""
@@ -31,15 +48,30 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Use different serializer for create action"""
         if self.action == 'create':
             return NotificationCreateSerializer
+        if self.action == 'list' and self.request.query_params.get('compact', '').lower() == 'true':
+            return NotificationCompactSerializer
         return NotificationSerializer
     
+    def perform_create(self, serializer):
+        """Create notification and drop the recipient's cached unread count"""
+        notification = serializer.save()
+        invalidate_unread_count(notification.user_id)
+    
+    def perform_update(self, serializer):
+        """Updates may flip is_read, so recompute the cached unread count"""
+        notification = serializer.save()
+        invalidate_unread_count(notification.user_id)
+    
     def list(self, request, *args, **kwargs):
         """
-        List notifications with optional filters
+        List notifications newest first, one cursor page at a time
         Query params:
         - is_read: Filter by read status (true/false)
         - notification_type: Filter by type
-        - limit: Limit number of results
+        - since: ISO timestamp, only return notifications created after it
+        - limit: Page size (default 20, max 100)
+        - cursor: Opaque cursor from the previous page's `next` link
+        - compact: true to omit metadata
         """
         queryset = self.get_queryset()
         
@@ -54,16 +86,19 @@ class NotificationViewSet(viewsets.ModelViewSet):
         if notification_type:
             queryset = queryset.filter(notification_type=notification_type)
         
-        # Limit results
-        limit = request.query_params.get('limit', None)
-        if limit:
-            try:
-                queryset = queryset[:int(limit)]
-            except ValueError:
-                pass
+        # Incremental fetch: only what arrived after the client's newest item
+        since = request.query_params.get('since', None)
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                return Response({'error': 'Invalid since timestamp, use ISO 8601'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            queryset = queryset.filter(created_at__gt=since_dt)
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -83,6 +118,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             is_read=True,
             read_at=timezone.now()
         )
+        adjust_unread_count(request.user.id, -updated_count)
         
         return Response({
             'success': True,
@@ -92,11 +128,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Get count of unread notifications"""
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
+        """Get count of unread notifications (served from the per-user cache)"""
+        count = get_unread_count(request.user.id)
         
         return Response({
             'unread_count': count
@@ -104,7 +137,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['delete'])
     def clear_read(self, request):
-        """Delete all read notifications"""
+        """Delete all read notifications (unread counter is unaffected)"""
         deleted_count, _ = Notification.objects.filter(
             user=request.user,
             is_read=True
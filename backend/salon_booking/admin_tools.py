@@ -0,0 +1,110 @@
+"""
+Django admin building blocks for tables with millions of rows
+
+LargeTableAdmin changelists skip the unfiltered COUNT(*) Django runs next to
+the filtered one, and take page counts from the PostgreSQL planner once a
+table is big enough for an exact count to hurt. AutocompleteFilter replaces
+the foreign key dropdown filter, which renders every related row into the
+sidebar, with the admin's search-as-you-type widget.
+"""
+import json
+import logging
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows an exact COUNT(*) is cheap enough, and exact page numbers are nicer
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_row_count(queryset):
+    """
+    Planner estimate of the queryset's row count (PostgreSQL only; None elsewhere or when unknown)
+
+    Unfiltered: the table's reltuples from the last ANALYZE. Filtered: the
+    row estimate of the query plan, which costs no more than planning.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)]
+                )
+                row = cursor.fetchone()
+                # -1 until the table is first analyzed
+                return row[0] if row and row[0] >= 0 else None
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        # psycopg decodes the json column; other drivers may hand back text
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning(f"[ADMIN] Row estimate failed for {queryset.model._meta.label}: {e}")
+        return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the planner's estimate instead of COUNT(*) above EXACT_COUNT_LIMIT rows"""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_row_count(self.object_list)
+        if estimate is not None and estimate >= EXACT_COUNT_LIMIT:
+            return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Foreign key list filter with the admin autocomplete widget
+
+    list_filter = [('salon', AutocompleteFilter)]. The related model's admin
+    needs search_fields, like for autocomplete_fields.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.lookup_val = self.used_parameters.get(self.lookup_kwarg)
+        self.admin_site = model_admin.admin_site
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is not None,
+            'reset_query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+        }
+
+    def rendered_widget(self):
+        """The select, holding only the selected row; options are fetched as the admin types"""
+        field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site, attrs={'style': 'width: 100%'}),
+            required=False,
+        )
+        return field.widget.render(self.lookup_kwarg, self.lookup_val)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin with estimated changelist counts and the media AutocompleteFilter needs"""
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @property
+    def media(self):
+        # Same select2 assets as autocomplete_fields; the field is not needed for them
+        return super().media + AutocompleteSelect(None, self.admin_site).media
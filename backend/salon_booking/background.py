@@ -0,0 +1,53 @@
+"""
+Background task runner
+Moves slow side effects (image processing, emails) off the request thread
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_TASK_WORKERS,
+                    thread_name_prefix='background-task'
+                )
+    return _executor
+
+
+def _run_task(func, args, kwargs):
+    """Run a task with its own database connection"""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background task {func.__name__} failed: {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Schedule func(*args, **kwargs) once the current transaction commits
+
+    Tasks run inline when BACKGROUND_TASKS_EAGER is set (tests, management commands).
+    """
+    def submit():
+        if settings.BACKGROUND_TASKS_EAGER:
+            _run_task(func, args, kwargs)
+        else:
+            get_executor().submit(_run_task, func, args, kwargs)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,553 @@
+"""
+Load benchmark harness for the booking flows
+
+Replays a weighted mix of customer and salon owner requests against a running
+server, using the data set written by salon_booking.datagen, and summarizes
+latency per endpoint as JSON so runs can be compared across commits. Driven
+by `manage.py benchmark`.
+
+Stripe, PayPal, Brevo and Google are replaced by in-process fakes with
+install_stubs(). The benchmark command does this for the server it starts
+itself; a separately started server must serve salon_booking.benchmark_wsgi
+(e.g. `gunicorn salon_booking.benchmark_wsgi`), never the production wsgi module.
+"""
+import json
+import math
+import time
+import types
+import uuid
+import random
+import logging
+import threading
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from salon_booking.datagen import BENCH_EMAIL_DOMAIN, SLOT_TIMES
+from salon_booking.instrumentation import external_call
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TERMS = ['hair', 'salon', 'spa', 'nail', 'facial', 'massage', 'color', 'bench']
+
+
+# ----------------------------------------------------------------------
+# External provider stubs
+# ----------------------------------------------------------------------
+
+def _simulated_call(service):
+    """Stand-in for a provider round trip, counted as external time by the instrumentation"""
+    with external_call(service):
+        if settings.BENCHMARK_STUB_LATENCY_MS:
+            time.sleep(settings.BENCHMARK_STUB_LATENCY_MS / 1000)
+
+
+class StubEmailBackend(BaseEmailBackend):
+    """Accepts every message without a network round trip (SMTP fallback path)"""
+
+    def send_messages(self, email_messages):
+        _simulated_call('smtp')
+        return len(email_messages)
+
+
+class _FakeCalendarRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        _simulated_call('google')
+        return self.result
+
+
+class _FakeCalendarEvents:
+    def insert(self, calendarId=None, body=None, **kwargs):
+        event_id = uuid.uuid4().hex
+        return _FakeCalendarRequest({**(body or {}), 'id': event_id, 'htmlLink': f'https://calendar.google.com/event?eid={event_id}'})
+
+    def update(self, calendarId=None, eventId=None, body=None, **kwargs):
+        return _FakeCalendarRequest({**(body or {}), 'id': eventId})
+
+    def get(self, calendarId=None, eventId=None, **kwargs):
+        return _FakeCalendarRequest({'id': eventId})
+
+    def delete(self, calendarId=None, eventId=None, **kwargs):
+        return _FakeCalendarRequest('')
+
+
+class _FakeCalendarService:
+    def events(self):
+        return _FakeCalendarEvents()
+
+
+class FakeStripeGateway:
+    """Stand-in for bookings.payment_gateway.StripeGateway: sessions are created and paid instantly"""
+
+    def create_checkout_session(self, **params):
+        _simulated_call('stripe')
+        session_id = f'cs_bench_{uuid.uuid4().hex}'
+        return types.SimpleNamespace(
+            id=session_id,
+            url=f'https://checkout.stripe.com/c/pay/{session_id}',
+            payment_status='unpaid',
+            metadata=params.get('metadata', {}),
+        )
+
+    def retrieve_checkout_session(self, session_id):
+        _simulated_call('stripe')
+        return types.SimpleNamespace(
+            id=session_id,
+            payment_status='paid',
+            payment_intent=f'pi_bench_{uuid.uuid4().hex[:24]}',
+            metadata={},
+        )
+
+    def lookup_payment(self, session_id):
+        # The fakes keep no record of the payments they made
+        from bookings.payment_gateway import ProviderPayment
+        _simulated_call('stripe')
+        return ProviderPayment('missing')
+
+    def construct_event(self, payload, sig_header):
+        # No signature check
+        if isinstance(payload, bytes):
+            payload = payload.decode('utf-8')
+        return json.loads(payload)
+
+
+class FakePayPalGateway:
+    """Stand-in for bookings.payment_gateway.PayPalGateway: every payment is approved"""
+
+    def create_payment(self, amount, currency='USD', description='Salon Booking'):
+        _simulated_call('paypal')
+        payment_id = f'PAYID-BENCH{uuid.uuid4().hex[:16].upper()}'
+        return {
+            'success': True,
+            'payment_id': payment_id,
+            'approval_url': f'https://www.sandbox.paypal.com/checkoutnow?token={payment_id}',
+        }
+
+    def execute_payment(self, payment_id, payer_id):
+        _simulated_call('paypal')
+        return {'success': True, 'payment': types.SimpleNamespace(id=payment_id, state='approved')}
+
+    def lookup_payment(self, payment_id):
+        from bookings.payment_gateway import ProviderPayment
+        _simulated_call('paypal')
+        return ProviderPayment('missing')
+
+    def refund_payment(self, sale_id, amount=None):
+        _simulated_call('paypal')
+        return {'success': True, 'refund_id': f'REFUND-BENCH{uuid.uuid4().hex[:12].upper()}'}
+
+
+_stubs_installed = False
+
+
+def install_stubs():
+    """
+    Replace every external provider with a fake that always succeeds
+
+    Patches the call sites the views use, so the request path is otherwise
+    unchanged. Irreversible for the life of the process: never call this in
+    a server that handles real traffic.
+    """
+    global _stubs_installed
+    if _stubs_installed:
+        return
+    _stubs_installed = True
+
+    # Django mail (SMTP fallback when BREVO_API_KEY is unset)
+    settings.EMAIL_BACKEND = 'salon_booking.benchmark.StubEmailBackend'
+
+    # Brevo transactional email API
+    try:
+        import sib_api_v3_sdk
+
+        def send_transac_email(self, send_smtp_email, **kwargs):
+            _simulated_call('brevo')
+            return types.SimpleNamespace(message_id=f'<{uuid.uuid4().hex}@{BENCH_EMAIL_DOMAIN}>')
+
+        sib_api_v3_sdk.TransactionalEmailsApi.send_transac_email = send_transac_email
+    except ImportError:
+        pass
+
+    # Stripe and PayPal
+    from bookings.payment_gateway import use_gateways
+    use_gateways(stripe=FakeStripeGateway(), paypal=FakePayPalGateway())
+
+    # Google Calendar and Google sign-in
+    from bookings import calendar_service
+    calendar_service.build = lambda *args, **kwargs: _FakeCalendarService()
+
+    from google.oauth2 import id_token
+
+    def verify_oauth2_token(token, request=None, audience=None, *args, **kwargs):
+        # The "token" is the email address of the user signing in
+        _simulated_call('google')
+        return {
+            'iss': 'accounts.google.com',
+            'aud': audience,
+            'sub': token,
+            'email': token,
+            'email_verified': True,
+            'given_name': 'Bench',
+            'family_name': 'User',
+        }
+
+    id_token.verify_oauth2_token = verify_oauth2_token
+
+    logger.warning("Benchmark stubs installed: Stripe, PayPal, Brevo and Google calls are faked")
+
+
+# ----------------------------------------------------------------------
+# Data set
+# ----------------------------------------------------------------------
+
+class BenchmarkData:
+    """Ids and access tokens the scenarios pick from"""
+
+    def __init__(self, sample_size=200, seed=42):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from accounts.models import User
+        from salons.models import Salon, Service
+
+        rng = random.Random(seed)
+        owner_salons = list(
+            Salon.objects.filter(owner__email__endswith=f'@{BENCH_EMAIL_DOMAIN}').values_list('id', 'owner_id', 'city')
+        )
+        if not owner_salons:
+            raise ValueError('No benchmark data found; run without --skip-seed first')
+
+        services = {}
+        for service_id, salon_id in Service.objects.filter(salon_id__in=[s[0] for s in owner_salons]).values_list('id', 'salon_id'):
+            services.setdefault(salon_id, []).append(service_id)
+        self.salons = [
+            {'id': salon_id, 'city': city, 'service_ids': services[salon_id]}
+            for salon_id, _, city in owner_salons if salon_id in services
+        ]
+        self.cities = sorted({salon['city'] for salon in self.salons})
+
+        customers = list(User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}', user_type='customer'))
+        owners = {user.id: user for user in User.objects.filter(id__in=[s[1] for s in owner_salons])}
+
+        def token(user):
+            return str(RefreshToken.for_user(user).access_token)
+
+        self.customer_tokens = [token(user) for user in rng.sample(customers, min(sample_size, len(customers)))]
+        self.owner_tokens = [
+            token(owners[owner_id])
+            for _, owner_id, _ in rng.sample(owner_salons, min(sample_size, len(owner_salons)))
+        ]
+
+
+# ----------------------------------------------------------------------
+# Request mix
+# ----------------------------------------------------------------------
+
+def _future_date(rng):
+    return (date.today() + timedelta(days=rng.randint(1, 30))).isoformat()
+
+
+def browse(client, data, rng):
+    """Salon list, then one salon's services and reviews"""
+    salon = rng.choice(data.salons)
+    client.get('list_salons', '/api/salons/')
+    client.get('salon_services', f"/api/salons/{salon['id']}/services/")
+    client.get('salon_reviews', f"/api/salons/{salon['id']}/reviews/")
+
+
+def search(client, data, rng):
+    if rng.random() < 0.6:
+        client.get('search_salons', f'/api/salons/search/?q={rng.choice(SEARCH_TERMS)}')
+    else:
+        client.get('filter_salons', f'/api/salons/filter/?city={rng.choice(data.cities)}&sort=rating')
+
+
+def availability(client, data, rng):
+    salon = rng.choice(data.salons)
+    booking_date = _future_date(rng)
+    client.get('available_slots', f"/api/bookings/available-slots/{salon['id']}/?date={booking_date}")
+    client.get(
+        'check_available_slots',
+        f"/api/bookings/check-available-slots/?salon_id={salon['id']}&date={booking_date}"
+        f"&service_id={rng.choice(salon['service_ids'])}"
+    )
+
+
+def _create_booking(client, data, rng, token, payment_method):
+    salon = rng.choice(data.salons)
+    booking_date = _future_date(rng)
+    client.get('available_slots', f"/api/bookings/available-slots/{salon['id']}/?date={booking_date}")
+    response = client.post('create_booking', '/api/bookings/create/', token=token, json={
+        'salon_id': salon['id'],
+        'service_id': rng.choice(salon['service_ids']),
+        'booking_date': booking_date,
+        'booking_time': rng.choice(SLOT_TIMES),
+        'customer_name': 'Bench Customer',
+        'customer_email': f'bench-walkin@{BENCH_EMAIL_DOMAIN}',
+        'customer_phone': '09170000000',
+        'payment_method': payment_method,
+    })
+    if response is not None and response.status_code == 201:
+        return response.json()['booking']['id']
+    return None
+
+
+def book(client, data, rng):
+    """Pay-later booking after an availability check (409 on a taken slot is expected)"""
+    _create_booking(client, data, rng, rng.choice(data.customer_tokens), 'pay_later')
+
+
+def checkout(client, data, rng):
+    """Stripe booking: create, open checkout, then Stripe's completion webhook"""
+    token = rng.choice(data.customer_tokens)
+    booking_id = _create_booking(client, data, rng, token, 'stripe')
+    if booking_id is None:
+        return
+    response = client.post('stripe_checkout', f'/api/bookings/{booking_id}/stripe/create-checkout/', token=token)
+    if response is None or response.status_code != 200:
+        return
+    session_id = response.json()['session_id']
+    event = {
+        'id': f'evt_bench_{uuid.uuid4().hex}',
+        'type': 'checkout.session.completed',
+        'data': {'object': {
+            'id': session_id,
+            'client_reference_id': str(booking_id),
+            'payment_intent': f'pi_bench_{uuid.uuid4().hex[:24]}',
+            'metadata': {'booking_id': str(booking_id)},
+        }},
+    }
+    client.post('stripe_webhook', '/api/bookings/stripe/webhook/', data=json.dumps(event), headers={
+        'Content-Type': 'application/json',
+        'Stripe-Signature': f't={int(time.time())},v1=benchmark',
+    })
+
+
+def my_bookings(client, data, rng):
+    client.get('my_bookings', '/api/bookings/my-bookings/', token=rng.choice(data.customer_tokens))
+
+
+def chat(client, data, rng):
+    token = rng.choice(data.customer_tokens)
+    salon = rng.choice(data.salons)
+    client.post('send_message', f"/api/bookings/chat/{salon['id']}/send/", token=token, json={
+        'content': 'Hi, is this slot still available?',
+        'message_type': 'text',
+    })
+    client.get('chat_messages', f"/api/bookings/chat/{salon['id']}/", token=token)
+    client.get('user_chats', '/api/bookings/chats/', token=token)
+
+
+def notifications(client, data, rng):
+    token = rng.choice(data.customer_tokens)
+    client.get('notifications', '/api/notifications/?compact=true', token=token)
+    client.get('unread_count', '/api/notifications/unread_count/', token=token)
+
+
+def salon_dashboard(client, data, rng):
+    token = rng.choice(data.owner_tokens)
+    client.get('salon_bookings', '/api/bookings/salon-bookings/', token=token)
+    client.get('salon_chats', '/api/bookings/salon/chats/', token=token)
+    client.get('salon_transactions', '/api/bookings/salon-transactions/', token=token)
+
+
+# Scenario name -> (relative weight, function). Weights approximate production traffic:
+# mostly anonymous browsing, a steady trickle of bookings and payments.
+SCENARIOS = {
+    'browse': (30, browse),
+    'search': (15, search),
+    'availability': (15, availability),
+    'book': (6, book),
+    'checkout': (4, checkout),
+    'my_bookings': (6, my_bookings),
+    'chat': (8, chat),
+    'notifications': (10, notifications),
+    'salon_dashboard': (6, salon_dashboard),
+}
+
+# Scenario name -> weight for comparing server profiles: mostly requests that wait on
+# Stripe, Brevo or SMTP, with some reads so the database stays in the picture
+IO_HEAVY_MIX = {
+    'checkout': 30,
+    'book': 25,
+    'chat': 15,
+    'browse': 20,
+    'notifications': 10,
+}
+
+MIXES = {
+    'default': {name: weight for name, (weight, _) in SCENARIOS.items()},
+    'io': IO_HEAVY_MIX,
+}
+
+
+# ----------------------------------------------------------------------
+# Load generation
+# ----------------------------------------------------------------------
+
+class BenchmarkClient:
+    """requests.Session wrapper recording (endpoint, status, seconds, finished_at) per call"""
+
+    def __init__(self, base_url, timeout):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.samples = []
+
+    def request(self, name, method, path, token=None, headers=None, **kwargs):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except Exception as e:
+            logger.debug(f"Benchmark request {method} {path} failed: {e}")
+            response = None
+            status = 0
+        finished = time.perf_counter()
+        self.samples.append((name, status, finished - started, finished))
+        return response
+
+    def get(self, name, path, **kwargs):
+        return self.request(name, 'GET', path, **kwargs)
+
+    def post(self, name, path, **kwargs):
+        return self.request(name, 'POST', path, **kwargs)
+
+
+def run_load(base_url, data, mix, concurrency=8, duration=30.0, warmup=5.0, seed=42, timeout=30.0):
+    """
+    Replay the scenario mix from `concurrency` threads and return the raw samples
+
+    `mix` maps scenario names to relative weights. Each thread loops over
+    weighted-random scenarios until the deadline. Samples finished during
+    the warmup are discarded.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    clients = []
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = BenchmarkClient(base_url, timeout)
+        clients.append(client)
+        while time.perf_counter() < deadline:
+            SCENARIOS[rng.choices(names, weights=weights)[0]][1](client, data, rng)
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f'benchmark-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = [s for client in clients for s in client.samples if measure_from <= s[3] <= deadline]
+    return samples, duration
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall latency (ms), throughput (req/s) and status counts"""
+    def stats(rows):
+        latencies = sorted(row[2] * 1000 for row in rows)
+        statuses = {}
+        for row in rows:
+            statuses[str(row[1])] = statuses.get(str(row[1]), 0) + 1
+        return {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / elapsed, 2) if elapsed else 0,
+            'errors': sum(1 for row in rows if row[1] == 0 or row[1] >= 500),
+            'status': dict(sorted(statuses.items())),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'p50': round(percentile(latencies, 50), 2) if latencies else None,
+                'p95': round(percentile(latencies, 95), 2) if latencies else None,
+                'p99': round(percentile(latencies, 99), 2) if latencies else None,
+                'max': round(latencies[-1], 2) if latencies else None,
+            },
+        }
+
+    by_endpoint = {}
+    for row in samples:
+        by_endpoint.setdefault(row[0], []).append(row)
+    return {
+        'endpoints': {name: stats(rows) for name, rows in sorted(by_endpoint.items())},
+        'total': stats(samples),
+    }
+
+
+def start_server(host='127.0.0.1', port=0):
+    """Serve the project's WSGI app from a background thread; returns the server"""
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        # Headers and body go out in separate writes; with Nagle on, each response waits on a delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+    if host not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, host]
+    server = ThreadedWSGIServer((host, port), QuietRequestHandler)
+    server.set_app(get_internal_wsgi_application())
+    threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+    return server
+
+
+def start_gunicorn(profile, port, log_file, extra_env=None):
+    """
+    Start gunicorn with gunicorn.conf.py and the given GUNICORN_PROFILE, providers stubbed
+
+    Returns the Popen handle; the caller terminates it. Output goes to log_file.
+    """
+    import os
+    import subprocess
+    import sys
+
+    env = {
+        **os.environ,
+        'GUNICORN_PROFILE': profile,
+        'BENCHMARK_STUB_LATENCY_MS': str(settings.BENCHMARK_STUB_LATENCY_MS),
+        **(extra_env or {}),
+    }
+    if '127.0.0.1' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+        env['ALLOWED_HOSTS'] = ','.join([*settings.ALLOWED_HOSTS, '127.0.0.1'])
+    return subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'salon_booking.benchmark_wsgi',
+            '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}',
+            '--access-logfile', os.devnull,
+        ],
+        cwd=settings.BASE_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_ready(base_url, process, timeout=60.0):
+    """Poll the salon list until the server answers; False if it exits or times out"""
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f'{base_url}/api/salons/', timeout=5).status_code < 500:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
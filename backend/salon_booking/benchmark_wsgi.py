@@ -0,0 +1,19 @@
+"""
+WSGI entry point for load benchmarks only
+
+Same application as salon_booking.wsgi, with Stripe, PayPal, Brevo and Google
+replaced by the fakes from salon_booking.benchmark.install_stubs(). Started by
+`manage.py benchmark_profiles`; never point a deployment at this module.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon_booking.settings')
+
+application = get_wsgi_application()
+
+from salon_booking.benchmark import install_stubs
+
+install_stubs()
@@ -0,0 +1,664 @@
+"""
+Synthetic data generator for scale testing
+
+Writes a deterministic, realistically skewed data set straight into the
+tables. Bookings and chats per salon follow a Zipf distribution, so a few
+salons are very busy and most see little traffic. Rows are streamed in
+batches with explicit primary keys, through COPY on PostgreSQL and
+bulk_create elsewhere, so memory stays flat whatever the volume.
+
+Every generated user has an address in BENCH_EMAIL_DOMAIN. purge() removes
+them and everything that hangs off them before a new data set is written.
+"""
+import io
+import csv
+import json
+import time
+import bisect
+import random
+import itertools
+from array import array
+from datetime import date, datetime, time as dtime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max, Q
+from accounts.models import User
+from activity.models import ActivityEvent
+from analytics.models import DailySalonStats
+from analytics.rollup import reset_watermark
+from bookings.models import Booking, Chat, Message, Transaction
+from notifications.counters import invalidate_unread_counts
+from notifications.models import Notification
+from salons.models import Review, Salon, SalonApplication, Service, ServiceImage
+
+BENCH_EMAIL_DOMAIN = 'bench.example.com'
+BENCH_PASSWORD = 'benchmark'
+
+CITIES = ['Manila', 'Quezon City', 'Makati', 'Pasig', 'Taguig', 'Cebu City', 'Davao City', 'Baguio']
+SERVICE_NAMES = [
+    'Haircut', 'Hair Color', 'Hair Spa', 'Rebond', 'Manicure', 'Pedicure',
+    'Facial', 'Massage', 'Eyelash Extensions', 'Waxing', 'Keratin Treatment', 'Makeup',
+]
+SLOT_TIMES = [f'{hour:02d}:{minute:02d}' for hour in range(9, 18) for minute in (0, 30)]
+CHAT_LINES = [
+    'Hi, do you have a slot this weekend?',
+    'Yes, we have openings on Saturday afternoon.',
+    'How long does the treatment take?',
+    'About an hour. See you then!',
+    'Can I move my booking to a later time?',
+    'Thank you!',
+]
+REVIEW_COMMENTS = [
+    'Great service, friendly staff.',
+    'Clean place and on time.',
+    'A bit pricey but worth it.',
+    'Waited longer than expected.',
+    'Will definitely come back.',
+]
+NOTIFICATION_TYPES = ['booking_confirmed', 'booking_reminder', 'booking_completed', 'message_received', 'payment_success', 'info']
+
+# Generated tables, parents before children
+MODELS = [
+    User, SalonApplication, Salon, Service, ServiceImage, Booking, Transaction,
+    Review, ActivityEvent, Chat, Message, Notification,
+]
+
+
+# ----------------------------------------------------------------------
+# Table writers
+# ----------------------------------------------------------------------
+
+class TableWriter:
+    """
+    Buffers rows (dicts keyed by field attname) for one model
+
+    Flushing writes the parents first, so a batch never references rows
+    that are still buffered.
+    """
+
+    def __init__(self, model, batch_size, parents=()):
+        self.model = model
+        self.batch_size = batch_size
+        self.parents = parents
+        self.rows = []
+        self.written = 0
+
+    def add(self, **values):
+        self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for parent in self.parents:
+            parent.flush()
+        if self.rows:
+            self.write(self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+    def write(self, rows):
+        raise NotImplementedError
+
+
+class BulkCreateWriter(TableWriter):
+    """bulk_create, keeping the generated timestamps that auto_now/auto_now_add would overwrite"""
+
+    def __init__(self, model, batch_size, parents=()):
+        super().__init__(model, batch_size, parents)
+        self.auto_fields = [
+            field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+
+    def write(self, rows):
+        saved = [(field, field.auto_now, field.auto_now_add) for field in self.auto_fields]
+        for field in self.auto_fields:
+            field.auto_now = field.auto_now_add = False
+        try:
+            self.model.objects.bulk_create([self.model(**row) for row in rows])
+        finally:
+            for field, auto_now, auto_now_add in saved:
+                field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class CopyWriter(TableWriter):
+    """PostgreSQL COPY FROM STDIN in CSV format, several times faster than INSERT"""
+
+    def __init__(self, model, batch_size, parents=()):
+        super().__init__(model, batch_size, parents)
+        self.fields = model._meta.concrete_fields
+        self.defaults = {field.attname: field.get_default() for field in self.fields}
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in self.fields)
+        self.sql = (
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        )
+
+    @staticmethod
+    def value(value):
+        if value is None:
+            return '\\N'
+        if value is True:
+            return 't'
+        if value is False:
+            return 'f'
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, (datetime, date, dtime)):
+            return value.isoformat()
+        return value
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        attnames = [field.attname for field in self.fields]
+        for row in rows:
+            writer.writerow([self.value(row[name] if name in row else self.defaults[name]) for name in attnames])
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(self.sql, buffer)
+
+
+# ----------------------------------------------------------------------
+# Generator
+# ----------------------------------------------------------------------
+
+class DataGenerator:
+    """
+    Deterministic data set generator
+
+    The same arguments (including `today`) always produce the same rows.
+
+    Args:
+        salons: Salons, each with its own owner and approved application
+        services_per_salon: Average services per salon (each salon gets 50%-150%)
+        customers: Customer accounts
+        bookings: Bookings, spread over `history_days` back and 30 days ahead
+        zipf_s: Zipf exponent for bookings and chats per salon (0 = uniform)
+        review_ratio: Share of completed bookings that get a review
+        chats_per_customer: Average conversations per customer
+        messages_per_chat: Average messages per conversation
+        notifications_per_user: Average notifications per user
+        activity_ratio: Share of bookings with an ActivityEvent row
+        method: 'copy' (PostgreSQL only), 'bulk', or 'auto' to pick COPY when available
+    """
+
+    def __init__(self, salons=1000, services_per_salon=10, customers=5000, bookings=100000, seed=42,
+                 zipf_s=1.1, review_ratio=0.3, chats_per_customer=1.0, messages_per_chat=6,
+                 notifications_per_user=5, activity_ratio=0.5, history_days=365, today=None,
+                 batch_size=5000, method='auto', log=print):
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise ValueError('COPY is only available on PostgreSQL')
+
+        self.salons = salons
+        self.services_per_salon = services_per_salon
+        self.customers = customers
+        self.bookings = bookings
+        self.seed = seed
+        self.zipf_s = zipf_s
+        self.review_ratio = review_ratio
+        self.chats_per_customer = chats_per_customer
+        self.messages_per_chat = messages_per_chat
+        self.notifications_per_user = notifications_per_user
+        self.activity_ratio = activity_ratio
+        self.history_days = history_days
+        self.today = today or date.today()
+        self.now = datetime.combine(self.today, dtime(12), tzinfo=dt_timezone.utc)
+        self.batch_size = batch_size
+        self.writer_class = CopyWriter if method == 'copy' else BulkCreateWriter
+        self.method = method
+        self.log = log
+        self.counts = {}
+
+    # Helpers -----------------------------------------------------------
+
+    def writer(self, model, parents=()):
+        return self.writer_class(model, self.batch_size, parents)
+
+    def finish(self, step_started, *writers):
+        for writer in writers:
+            writer.flush()
+        elapsed = time.monotonic() - step_started
+        for writer in writers:
+            self.counts[writer.model._meta.label] = writer.written
+        rows = sum(writer.written for writer in writers)
+        names = ', '.join(f'{writer.written} {writer.model._meta.verbose_name_plural}' for writer in writers)
+        self.log(f"Wrote {names} in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/sec)")
+
+    def rng(self, step):
+        """Independent stream per step, so changing one volume leaves the others' rows unchanged"""
+        return random.Random(f'{self.seed}:{step}')
+
+    def zipf_sampler(self, rng, n):
+        """Return a function drawing indexes in range(n), rank k having weight 1/k^s"""
+        order = list(range(n))
+        rng.shuffle(order)  # popularity independent of id order
+        cumulative = list(itertools.accumulate(1 / (k ** self.zipf_s) for k in range(1, n + 1)))
+        total = cumulative[-1]
+        return lambda: order[min(bisect.bisect(cumulative, rng.random() * total), n - 1)]
+
+    def timestamp(self, rng, day, earliest_hour=8, latest_hour=21):
+        seconds = rng.randrange(earliest_hour * 3600, latest_hour * 3600)
+        return datetime.combine(day, dtime(), tzinfo=dt_timezone.utc) + timedelta(seconds=seconds)
+
+    def owner_id(self, index):
+        return self.first_id[User] + index
+
+    def customer_id(self, index):
+        return self.first_id[User] + self.salons + index
+
+    # Steps -------------------------------------------------------------
+
+    def run(self):
+        started = time.monotonic()
+        self.purge()
+        self.first_id = {
+            model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1 for model in MODELS
+        }
+        self.write_users()
+        self.write_salons()
+        self.write_services()
+        self.write_bookings()
+        self.write_chats()
+        self.write_notifications()
+        self.update_salon_ratings()
+        self.reset_sequences()
+        invalidate_unread_counts(range(self.first_id[User], self.customer_id(self.customers)))
+        # Generated rows carry historical updated_at values an incremental rollup would skip
+        reset_watermark()
+        self.log(f"Generated {sum(self.counts.values())} rows in {time.monotonic() - started:.1f}s using {self.method}")
+        return self.counts
+
+    def purge(self):
+        """
+        Delete every generated user and the rows that hang off them
+
+        Single DELETE statements, children first: the ORM's cascade collector
+        would load millions of rows into memory.
+        """
+        bench_users = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').values('id')
+        bench_salons = Salon.objects.filter(owner__in=bench_users).values('id')
+        by_customer_or_salon = Q(customer__in=bench_users) | Q(salon__in=bench_salons)
+        steps = [
+            ActivityEvent.objects.filter(Q(actor__in=bench_users) | Q(salon__in=bench_salons)),
+            DailySalonStats.objects.filter(salon__in=bench_salons),
+            Notification.objects.filter(user__in=bench_users),
+            Message.objects.filter(chat__in=Chat.objects.filter(by_customer_or_salon).values('id')),
+            Chat.objects.filter(by_customer_or_salon),
+            Review.objects.filter(by_customer_or_salon),
+            Transaction.objects.filter(by_customer_or_salon),
+            Booking.objects.filter(by_customer_or_salon),
+            ServiceImage.objects.filter(service__salon__in=bench_salons),
+            Service.objects.filter(salon__in=bench_salons),
+            Salon.objects.filter(owner__in=bench_users),
+            SalonApplication.objects.filter(user__in=bench_users),
+            User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}'),
+        ]
+        removed = sum(queryset._raw_delete(queryset.db) for queryset in steps)
+        if removed:
+            self.log(f"Removed {removed} row(s) of previously generated data")
+
+    def write_users(self):
+        step_started = time.monotonic()
+        rng = self.rng('users')
+        # Hashing is slow by design; every generated user shares one hash
+        password = make_password(BENCH_PASSWORD)
+        users = self.writer(User)
+
+        def add(user_id, kind, index):
+            email = f'bench-{kind}-{index}@{BENCH_EMAIL_DOMAIN}'
+            joined = self.timestamp(rng, self.today - timedelta(days=rng.randint(self.history_days, self.history_days * 2)))
+            users.add(
+                id=user_id,
+                password=password,
+                is_superuser=False,
+                username=email,
+                first_name='Bench',
+                last_name=f'{kind.title()} {index}',
+                email=email,
+                is_staff=False,
+                is_active=True,
+                date_joined=joined,
+                user_type='salon_owner' if kind == 'owner' else 'customer',
+                phone=f'0917{rng.randrange(10 ** 7):07d}',
+                profile_picture_variants={},
+                is_email_verified=True,
+                created_at=joined,
+                updated_at=joined,
+            )
+
+        for i in range(self.salons):
+            add(self.owner_id(i), 'owner', i)
+        for i in range(self.customers):
+            add(self.customer_id(i), 'customer', i)
+        self.finish(step_started, users)
+
+    def write_salons(self):
+        step_started = time.monotonic()
+        rng = self.rng('salons')
+        applications = self.writer(SalonApplication)
+        salons = self.writer(Salon, parents=[applications])
+        self.salon_cities = []
+
+        for i in range(self.salons):
+            city = rng.choice(CITIES)
+            name = f'Bench {rng.choice(["Hair", "Beauty", "Nail", "Spa"])} Salon {i}'
+            email = f'bench-owner-{i}@{BENCH_EMAIL_DOMAIN}'
+            applied = self.timestamp(rng, self.today - timedelta(days=rng.randint(self.history_days, self.history_days * 2)))
+            approved = applied + timedelta(days=rng.randint(1, 5))
+            common = {
+                'business_email': email,
+                'phone': f'0917{i % 10 ** 7:07d}',
+                'address': f'{i + 1} Benchmark Street',
+                'city': city,
+                'state': 'Metro Manila',
+                'postal_code': f'{1000 + i % 9000}',
+                'description': f'{name} in {city}, generated for scale testing',
+                'years_in_business': rng.randint(0, 30),
+                'staff_count': rng.randint(1, 25),
+            }
+            applications.add(
+                id=self.first_id[SalonApplication] + i,
+                user_id=self.owner_id(i),
+                salon_name=name,
+                services=[],
+                status='approved',
+                reviewed_at=approved,
+                created_at=applied,
+                updated_at=approved,
+                **common,
+            )
+            salons.add(
+                id=self.first_id[Salon] + i,
+                owner_id=self.owner_id(i),
+                application_id=self.first_id[SalonApplication] + i,
+                name=name,
+                email=common['business_email'],
+                phone=common['phone'],
+                address=common['address'],
+                city=city,
+                state=common['state'],
+                postal_code=common['postal_code'],
+                latitude=Decimal(f'{14.5 + rng.uniform(-0.3, 0.3):.6f}'),
+                longitude=Decimal(f'{121.0 + rng.uniform(-0.3, 0.3):.6f}'),
+                description=common['description'],
+                services=[],
+                logo_variants={},
+                cover_image_variants={},
+                rating=Decimal('0.00'),
+                total_reviews=0,
+                years_in_business=common['years_in_business'],
+                staff_count=common['staff_count'],
+                is_active=rng.random() < 0.97,
+                is_featured=rng.random() < 0.02,
+                is_verified=rng.random() < 0.5,
+                created_at=approved,
+                updated_at=approved,
+            )
+        self.finish(step_started, applications, salons)
+
+    def write_services(self):
+        step_started = time.monotonic()
+        rng = self.rng('services')
+        services = self.writer(Service)
+        images = self.writer(ServiceImage, parents=[services])
+        image_ids = itertools.count(self.first_id[ServiceImage])
+        # Per salon: index of its first service and how many it has. Per service: price and duration
+        self.service_first = array('l')
+        self.service_count = array('l')
+        self.service_price = array('l')
+        self.service_duration = array('l')
+
+        low = max(1, self.services_per_salon // 2)
+        high = max(low, self.services_per_salon + self.services_per_salon // 2)
+        for salon_index in range(self.salons):
+            self.service_first.append(len(self.service_price))
+            count = rng.randint(low, high)
+            names = rng.sample(SERVICE_NAMES, min(count, len(SERVICE_NAMES)))
+            # Salons with more services than names get numbered variants
+            names += [f'{rng.choice(SERVICE_NAMES)} {n}' for n in range(len(names), count)]
+            self.service_count.append(len(names))
+            created = self.now - timedelta(days=rng.randint(self.history_days, self.history_days * 2))
+            for name in names:
+                service_id = self.first_id[Service] + len(self.service_price)
+                price = rng.randrange(200, 3000, 50)
+                duration = rng.choice([30, 45, 60, 90, 120])
+                self.service_price.append(price)
+                self.service_duration.append(duration)
+                services.add(
+                    id=service_id,
+                    salon_id=self.first_id[Salon] + salon_index,
+                    name=name,
+                    description=f'{name} by our trained stylists',
+                    price=Decimal(price),
+                    duration=duration,
+                    is_active=rng.random() < 0.95,
+                    created_at=created,
+                    updated_at=created,
+                )
+                if rng.random() < 0.3:
+                    images.add(
+                        id=next(image_ids),
+                        service_id=service_id,
+                        image='service_images/bench-placeholder.jpg',
+                        image_variants={},
+                        is_primary=True,
+                        created_at=created,
+                    )
+        self.finish(step_started, services, images)
+
+    def write_bookings(self):
+        """Bookings with their payment transactions, reviews and activity events"""
+        step_started = time.monotonic()
+        rng = self.rng('bookings')
+        pick_salon = self.zipf_sampler(rng, self.salons)
+        bookings = self.writer(Booking)
+        transactions = self.writer(Transaction, parents=[bookings])
+        reviews = self.writer(Review, parents=[bookings])
+        events = self.writer(ActivityEvent)
+        transaction_ids = itertools.count(self.first_id[Transaction])
+        review_ids = itertools.count(self.first_id[Review])
+        event_ids = itertools.count(self.first_id[ActivityEvent])
+        slot_times = [dtime.fromisoformat(slot) for slot in SLOT_TIMES]
+
+        for n in range(self.bookings):
+            booking_id = self.first_id[Booking] + n
+            salon_index = pick_salon()
+            salon_id = self.first_id[Salon] + salon_index
+            service_index = self.service_first[salon_index] + rng.randrange(self.service_count[salon_index])
+            customer_index = rng.randrange(self.customers)
+            customer_id = self.customer_id(customer_index)
+            price = Decimal(self.service_price[service_index])
+
+            day = rng.randint(-self.history_days, 30)
+            booking_date = self.today + timedelta(days=day)
+            if day < 0:
+                booking_status = rng.choices(['completed', 'cancelled'], weights=[85, 15])[0]
+            else:
+                booking_status = rng.choices(['confirmed', 'pending', 'cancelled'], weights=[70, 20, 10])[0]
+            payment_method = rng.choices(['stripe', 'paypal', 'pay_later'], weights=[45, 25, 30])[0]
+            if booking_status == 'completed' or (booking_status == 'confirmed' and payment_method != 'pay_later'):
+                payment_status = 'completed'
+            elif booking_status == 'cancelled' and payment_method != 'pay_later' and rng.random() < 0.5:
+                payment_status = 'refunded'
+            else:
+                payment_status = 'pending'
+            created_at = self.timestamp(rng, min(booking_date, self.today) - timedelta(days=rng.randint(0, 21)))
+            updated_at = max(created_at, self.timestamp(rng, min(booking_date, self.today)))
+
+            bookings.add(
+                id=booking_id,
+                customer_id=customer_id,
+                salon_id=salon_id,
+                service_id=self.first_id[Service] + service_index,
+                booking_date=booking_date,
+                booking_time=rng.choice(slot_times),
+                duration=self.service_duration[service_index],
+                customer_name=f'Bench Customer {customer_index}',
+                customer_email=f'bench-customer-{customer_index}@{BENCH_EMAIL_DOMAIN}',
+                customer_phone='09170000000',
+                status=booking_status,
+                price=price,
+                payment_status=payment_status,
+                payment_method=payment_method,
+                payment_id=f'pi_bench_{booking_id}' if payment_status != 'pending' and payment_method == 'stripe' else None,
+                created_at=created_at,
+                updated_at=updated_at,
+            )
+
+            fee = (price * Decimal('0.03')).quantize(Decimal('0.01'))
+            paid = payment_status in ('completed', 'refunded')
+            transactions.add(
+                id=next(transaction_ids),
+                booking_id=booking_id,
+                customer_id=customer_id,
+                salon_id=salon_id,
+                transaction_type='payment',
+                amount=price,
+                currency='PHP',
+                status='completed' if paid else ('cancelled' if booking_status == 'cancelled' else 'pending'),
+                payment_method='cash' if payment_method == 'pay_later' and paid else payment_method,
+                payment_provider_id=f'bench-{payment_method}-{booking_id}' if payment_method != 'pay_later' else None,
+                description=f'Payment for booking #{booking_id}',
+                platform_fee=fee,
+                salon_payout=price - fee,
+                metadata={},
+                created_at=created_at,
+                updated_at=updated_at,
+                processed_at=updated_at if paid else None,
+            )
+            if payment_status == 'refunded':
+                transactions.add(
+                    id=next(transaction_ids),
+                    booking_id=booking_id,
+                    customer_id=customer_id,
+                    salon_id=salon_id,
+                    transaction_type='refund',
+                    amount=price,
+                    currency='PHP',
+                    status='refunded',
+                    payment_method=payment_method,
+                    description=f'Refund for booking #{booking_id}',
+                    platform_fee=Decimal('0.00'),
+                    salon_payout=Decimal('0.00'),
+                    metadata={},
+                    created_at=updated_at,
+                    updated_at=updated_at,
+                    processed_at=updated_at,
+                )
+
+            if booking_status == 'completed' and rng.random() < self.review_ratio:
+                reviewed_at = min(self.now, self.timestamp(rng, booking_date + timedelta(days=rng.randint(0, 7))))
+                reviews.add(
+                    id=next(review_ids),
+                    salon_id=salon_id,
+                    customer_id=customer_id,
+                    booking_id=booking_id,
+                    rating=rng.choices([1, 2, 3, 4, 5], weights=[3, 5, 12, 35, 45])[0],
+                    title='',
+                    comment=rng.choice(REVIEW_COMMENTS),
+                    status=rng.choices(['approved', 'pending', 'rejected'], weights=[90, 8, 2])[0],
+                    is_verified_booking=True,
+                    helpful_count=rng.randint(0, 5),
+                    created_at=reviewed_at,
+                    updated_at=reviewed_at,
+                )
+
+            if rng.random() < self.activity_ratio:
+                events.add(
+                    id=next(event_ids),
+                    action='BOOKING CREATED',
+                    actor_id=customer_id,
+                    actor_email=f'bench-customer-{customer_index}@{BENCH_EMAIL_DOMAIN}',
+                    entity_type='booking',
+                    entity_id=booking_id,
+                    salon_id=salon_id,
+                    details={'payment_method': payment_method},
+                    created_at=created_at,
+                )
+        self.finish(step_started, bookings, transactions, reviews, events)
+
+    def write_chats(self):
+        step_started = time.monotonic()
+        rng = self.rng('chats')
+        pick_salon = self.zipf_sampler(rng, self.salons)
+        chats = self.writer(Chat)
+        messages = self.writer(Message, parents=[chats])
+        chat_ids = itertools.count(self.first_id[Chat])
+        message_ids = itertools.count(self.first_id[Message])
+
+        for customer_index in range(self.customers):
+            count = min(self.salons, int(rng.expovariate(1 / self.chats_per_customer))) if self.chats_per_customer else 0
+            salon_indexes = set()
+            while len(salon_indexes) < count:
+                salon_indexes.add(pick_salon())
+            for salon_index in sorted(salon_indexes):
+                chat_id = next(chat_ids)
+                first_sent = self.timestamp(rng, self.today - timedelta(days=rng.randint(0, self.history_days)))
+                message_count = 1 + int(rng.expovariate(1 / max(self.messages_per_chat - 1, 0.1)))
+                sent_times = [first_sent]
+                for _ in range(message_count - 1):
+                    sent_times.append(sent_times[-1] + timedelta(minutes=rng.randint(1, 240)))
+                chats.add(
+                    id=chat_id,
+                    customer_id=self.customer_id(customer_index),
+                    salon_id=self.first_id[Salon] + salon_index,
+                    created_at=first_sent,
+                    updated_at=sent_times[-1],
+                    is_active=True,
+                )
+                for n, sent_at in enumerate(sent_times):
+                    read = n < message_count - 1 or rng.random() < 0.6
+                    messages.add(
+                        id=next(message_ids),
+                        chat_id=chat_id,
+                        sender_type='customer' if n % 2 == 0 else 'salon',
+                        message_type='text',
+                        content=CHAT_LINES[n % len(CHAT_LINES)],
+                        image_status='none',
+                        sent_at=sent_at,
+                        is_read=read,
+                        read_at=sent_at + timedelta(minutes=5) if read else None,
+                        metadata={},
+                    )
+        self.finish(step_started, chats, messages)
+
+    def write_notifications(self):
+        step_started = time.monotonic()
+        rng = self.rng('notifications')
+        notifications = self.writer(Notification)
+        notification_ids = itertools.count(self.first_id[Notification])
+
+        for user_index in range(self.salons + self.customers):
+            count = int(rng.expovariate(1 / self.notifications_per_user)) if self.notifications_per_user else 0
+            for _ in range(count):
+                created_at = self.timestamp(rng, self.today - timedelta(days=rng.randint(0, self.history_days)))
+                read = rng.random() < 0.6
+                notification_type = rng.choice(NOTIFICATION_TYPES)
+                notifications.add(
+                    id=next(notification_ids),
+                    user_id=self.first_id[User] + user_index,
+                    notification_type=notification_type,
+                    title=notification_type.replace('_', ' ').capitalize(),
+                    message='Generated notification for scale testing',
+                    is_read=read,
+                    read_at=created_at + timedelta(hours=1) if read else None,
+                    metadata={},
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+        self.finish(step_started, notifications)
+
+    def update_salon_ratings(self):
+        Review.update_salon_ratings(Salon.objects.filter(pk__gte=self.first_id[Salon]).values('pk'))
+
+    def reset_sequences(self):
+        """Move id sequences past the explicitly assigned keys"""
+        statements = connection.ops.sequence_reset_sql(no_style(), MODELS)
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,104 @@
+"""
+Database connection pool statistics
+
+Reports how this worker's connection is configured and, on PostgreSQL, how
+many server connections are in use against max_connections, so running out
+of connections under many workers shows up before requests start failing.
+With DB_POOL_MODE=pgbouncer and PGBOUNCER_ADMIN_URL set, PgBouncer's own
+SHOW POOLS output is included.
+"""
+import os
+import time
+import logging
+from django.conf import settings
+from django.db import connection
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from salon_booking.query_budget import query_budget
+
+logger = logging.getLogger(__name__)
+
+
+def worker_connection_stats():
+    """This process's connection to the default database"""
+    db = connection.settings_dict
+    close_at = connection.close_at
+    return {
+        'pid': os.getpid(),
+        'vendor': connection.vendor,
+        'pool_mode': settings.DB_POOL_MODE,
+        'conn_max_age': db['CONN_MAX_AGE'],
+        'conn_health_checks': db['CONN_HEALTH_CHECKS'],
+        'server_side_cursors': not db.get('DISABLE_SERVER_SIDE_CURSORS', False),
+        'open': connection.connection is not None,
+        'closes_in': round(close_at - time.monotonic(), 1) if close_at is not None and connection.connection is not None else None,
+    }
+
+
+def server_connection_stats():
+    """Connections on the PostgreSQL server, by application and state"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT current_setting('max_connections')::int, current_setting('superuser_reserved_connections')::int")
+        max_connections, reserved = cursor.fetchone()
+        cursor.execute(
+            "SELECT COALESCE(NULLIF(application_name, ''), '(none)'), COALESCE(state, '(background)'), COUNT(*) "
+            "FROM pg_stat_activity WHERE datname = current_database() GROUP BY 1, 2 ORDER BY 1, 2"
+        )
+        rows = cursor.fetchall()
+
+    by_application = {}
+    for application, state, count in rows:
+        by_application.setdefault(application, {})[state] = count
+    in_use = sum(count for _, _, count in rows)
+    available = max_connections - reserved
+    return {
+        'max_connections': max_connections,
+        'superuser_reserved': reserved,
+        'in_use': in_use,
+        'utilization': round(in_use / available, 3) if available else None,
+        'by_application': by_application,
+    }
+
+
+def pgbouncer_pool_stats():
+    """SHOW POOLS from the PgBouncer admin console (one row per database/user pair)"""
+    import psycopg2
+
+    admin = psycopg2.connect(settings.PGBOUNCER_ADMIN_URL, connect_timeout=settings.DB_CONNECT_TIMEOUT)
+    try:
+        # The admin console does not support transactions
+        admin.autocommit = True
+        with admin.cursor() as cursor:
+            cursor.execute('SHOW POOLS')
+            columns = [column.name for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        admin.close()
+
+
+@query_budget(3)
+@api_view(['GET'])
+def db_pool_stats(request):
+    """Database connection pool statistics (admin only)"""
+    try:
+        if not request.user.is_staff and not request.user.is_superuser:
+            return Response({
+                'error': 'Admin privileges required'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        stats = {'worker': worker_connection_stats()}
+        if connection.vendor == 'postgresql':
+            stats['server'] = server_connection_stats()
+        if settings.PGBOUNCER_ADMIN_URL:
+            try:
+                stats['pgbouncer'] = pgbouncer_pool_stats()
+            except Exception as e:
+                logger.warning(f"PgBouncer stats unavailable: {e}")
+                stats['pgbouncer'] = {'error': str(e)}
+
+        return Response(stats)
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
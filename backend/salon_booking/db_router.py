@@ -0,0 +1,101 @@
+"""
+Read-replica routing for public read-only endpoints
+
+With DATABASE_REPLICA_URL set, views marked @replica_reads send their reads to
+the 'replica' database; everything else keeps using the primary:
+
+    @query_budget(6)
+    @api_view(['GET'])
+    @permission_classes([AllowAny])
+    @replica_reads
+    def get_all_salons(request):
+
+A request switches back to the primary for the rest of its reads as soon as
+it writes, and ReplicaPinningMiddleware keeps the client on the primary for
+DATABASE_REPLICA_PIN_SECONDS afterwards, so nobody reads past their own
+write while the replica catches up.
+
+The pins live in the cache, so settings refuse a replica without REDIS_URL.
+To try it locally, run a Redis, point DATABASE_REPLICA_URL at a copy of the
+SQLite file (or a second PostgreSQL database) and watch which alias the
+queries use; salon_booking/tests.py covers the routing without either.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """Per-request routing flags"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica_allowed = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def routing_state(pinned=False):
+    """Track reads and writes of one request; contextvars keep threads and greenlets apart"""
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def _replica_allowed(state):
+    previous = state.replica_allowed
+    state.replica_allowed = True
+    try:
+        yield
+    finally:
+        state.replica_allowed = previous
+
+
+def replica_reads(view):
+    """Let a view's safe-method reads go to the replica until it writes"""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        state = _state.get()
+        if state is None:
+            # Called without ReplicaPinningMiddleware: route this call on its own
+            with routing_state() as state, _replica_allowed(state):
+                return view(request, *args, **kwargs)
+        with _replica_allowed(state):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Installed by settings when DATABASE_REPLICA_URL is set"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica_allowed and not state.pinned:
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = True
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
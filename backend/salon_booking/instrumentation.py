@@ -0,0 +1,313 @@
+"""
+Request performance instrumentation
+Per-request wall time, DB query count/time, external API time and response
+size, aggregated into per-view histograms and exposed in Prometheus text format
+
+Each worker process aggregates in memory and snapshots its totals to
+METRICS_DIR every few seconds; the /metrics endpoint merges all snapshots so a
+scrape sees every gunicorn worker, not just the one that answered it.
+"""
+import os
+import json
+import time
+import glob
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds for the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Host suffix -> service label for outbound HTTP calls
+EXTERNAL_SERVICES = (
+    ('stripe.com', 'stripe'),
+    ('paypal.com', 'paypal'),
+    ('brevo.com', 'brevo'),
+    ('sendinblue.com', 'brevo'),
+    ('googleapis.com', 'google'),
+    ('google.com', 'google'),
+)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.external = {}
+
+    def add_external(self, service, seconds):
+        self.external[service] = self.external.get(service, 0.0) + seconds
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def external_call(service):
+    """Time a block as an outbound call to `service` (no-op outside a request)"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_external(service, time.perf_counter() - started)
+
+
+def db_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper hook counting queries and their time"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def service_for_host(host):
+    host = (host or '').lower()
+    for suffix, service in EXTERNAL_SERVICES:
+        if host == suffix or host.endswith(f'.{suffix}'):
+            return service
+    return 'other'
+
+
+_hooks_installed = False
+
+
+def install_http_hooks():
+    """
+    Time outbound HTTP at the transport layer
+
+    urllib3 carries requests (Stripe, PayPal, google-auth) and the Brevo SDK;
+    httplib2 carries googleapiclient (Calendar); SMTP covers Django mail.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    try:
+        from urllib3.connectionpool import HTTPConnectionPool
+        original_urlopen = HTTPConnectionPool.urlopen
+
+        def timed_urlopen(self, method, url, *args, **kwargs):
+            with external_call(service_for_host(self.host)):
+                return original_urlopen(self, method, url, *args, **kwargs)
+
+        HTTPConnectionPool.urlopen = timed_urlopen
+    except ImportError:
+        pass
+
+    try:
+        import httplib2
+        original_request = httplib2.Http.request
+
+        def timed_request(self, uri, *args, **kwargs):
+            with external_call(service_for_host(urlsplit(uri).hostname)):
+                return original_request(self, uri, *args, **kwargs)
+
+        httplib2.Http.request = timed_request
+    except ImportError:
+        pass
+
+    from django.core.mail.backends.smtp import EmailBackend
+    original_send = EmailBackend.send_messages
+
+    def timed_send_messages(self, email_messages):
+        with external_call('smtp'):
+            return original_send(self, email_messages)
+
+    EmailBackend.send_messages = timed_send_messages
+
+
+class MetricsRegistry:
+    """Cumulative per-view metrics for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._writer_pid = None
+
+    def observe(self, view, method, status, metrics, duration, response_bytes):
+        key = f'{view}|{method}'
+        status_class = f'{status // 100}xx'
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'count': 0,
+                    'duration_sum': 0.0,
+                    'buckets': [0] * len(DURATION_BUCKETS),
+                    'db_queries': 0,
+                    'db_seconds': 0.0,
+                    'external_seconds': {},
+                    'response_bytes': 0,
+                    'status': {},
+                }
+            series['count'] += 1
+            series['duration_sum'] += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    series['buckets'][i] += 1
+            series['db_queries'] += metrics.db_queries
+            series['db_seconds'] += metrics.db_time
+            for service, seconds in metrics.external.items():
+                series['external_seconds'][service] = series['external_seconds'].get(service, 0.0) + seconds
+            series['response_bytes'] += response_bytes
+            series['status'][status_class] = series['status'].get(status_class, 0) + 1
+        self._ensure_writer()
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._series))
+
+    # Snapshot files ---------------------------------------------------
+
+    def _ensure_writer(self):
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+
+    def _write_loop(self):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.snapshot(), f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def collect(self):
+        """Merge this process's live series with the snapshots of other workers"""
+        merged = self.snapshot()
+        own = f'metrics-{os.getpid()}.json'
+        stale_before = time.time() - settings.METRICS_STALE_AFTER
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+            if os.path.basename(path) == own:
+                continue
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    os.remove(path)  # worker gone (restart, max_requests)
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for key, series in other.items():
+                target = merged.setdefault(key, series)
+                if target is series:
+                    continue
+                for field in ('count', 'duration_sum', 'db_queries', 'db_seconds', 'response_bytes'):
+                    target[field] += series[field]
+                target['buckets'] = [a + b for a, b in zip(target['buckets'], series['buckets'])]
+                for field in ('external_seconds', 'status'):
+                    for name, value in series[field].items():
+                        target[field][name] = target[field].get(name, 0) + value
+        return merged
+
+
+registry = MetricsRegistry()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_prometheus(series_by_key):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+
+    def header(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    items = []
+    for key, series in sorted(series_by_key.items()):
+        view, method = key.rsplit('|', 1)
+        items.append((f'view="{_label(view)}",method="{method}"', series))
+
+    header('http_request_duration_seconds', 'histogram', 'Wall time spent handling a request')
+    for labels, series in items:
+        for bound, count in zip(DURATION_BUCKETS, series['buckets']):
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {series["duration_sum"]:.6f}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {series["count"]}')
+
+    header('http_responses_total', 'counter', 'Responses by status class')
+    for labels, series in items:
+        for status_class, count in sorted(series['status'].items()):
+            lines.append(f'http_responses_total{{{labels},status="{status_class}"}} {count}')
+
+    header('http_db_queries_total', 'counter', 'Database queries executed while handling requests')
+    for labels, series in items:
+        lines.append(f'http_db_queries_total{{{labels}}} {series["db_queries"]}')
+
+    header('http_db_query_seconds_total', 'counter', 'Time spent in database queries')
+    for labels, series in items:
+        lines.append(f'http_db_query_seconds_total{{{labels}}} {series["db_seconds"]:.6f}')
+
+    header('http_external_call_seconds_total', 'counter', 'Time spent waiting on external services')
+    for labels, series in items:
+        for service, seconds in sorted(series['external_seconds'].items()):
+            lines.append(f'http_external_call_seconds_total{{{labels},service="{service}"}} {seconds:.6f}')
+
+    header('http_response_bytes_total', 'counter', 'Response body bytes sent')
+    for labels, series in items:
+        lines.append(f'http_response_bytes_total{{{labels}}} {series["response_bytes"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+
+    Requires `Authorization: Bearer <METRICS_TOKEN>`. Without a token
+    configured it is only served when DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden('Forbidden')
+    elif not settings.DEBUG:
+        return HttpResponseForbidden('Forbidden')
+
+    return HttpResponse(
+        render_prometheus(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,172 @@
+"""
+Logging handlers for the activity log
+A non-blocking queue handler for request threads and a rotating file handler
+that several gunicorn workers can share
+"""
+import os
+import gzip
+import json
+import queue
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of waiting when the queue is full
+
+    Request threads only pay for a put_nowait(); a stalled disk costs log lines,
+    never latency.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JSONLineFormatter(logging.Formatter):
+    """Serialize record.activity (a dict) as one JSON line"""
+
+    def format(self, record):
+        payload = getattr(record, 'activity', None)
+        if payload is None:
+            payload = {'message': record.getMessage()}
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class ConcurrentRotatingFileHandler(logging.Handler):
+    """
+    Append-only file handler with size and time based rotation
+
+    Every write happens under an exclusive flock on `<file>.lock`, so workers
+    never interleave partial lines or rotate the same file twice. A worker that
+    finds the file was rotated by another process reopens it before writing.
+    Rotated segments are gzipped as `<name>.<YYYYmmdd-HHMMSS>.jsonl.gz`.
+
+    Args:
+        filename: Live log file, e.g. logs/user_activities.jsonl
+        max_bytes: Rotate once the live file reaches this size (0 disables)
+        when: 'H' or 'D' to also rotate when the hour or day changes
+    """
+
+    TIME_FORMATS = {'H': '%Y%m%d%H', 'D': '%Y%m%d'}
+
+    def __init__(self, filename, max_bytes=0, when='D'):
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.period_format = self.TIME_FORMATS.get(when.upper()) if when else None
+        self.lock_path = f'{self.filename}.lock'
+        self.stream = None
+        self.lock_file = None
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+
+    def _open(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = open(self.filename, 'a', encoding='utf-8')
+
+    def _acquire_file_lock(self):
+        if fcntl is None:
+            return
+        if self.lock_file is None:
+            self.lock_file = open(self.lock_path, 'a')
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+
+    def _release_file_lock(self):
+        if fcntl is not None and self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def _stream_is_current(self):
+        """False if another process rotated the file out from under us"""
+        try:
+            current = os.stat(self.filename)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(self.stream.fileno())
+        return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+    def _should_rollover(self, pending_bytes):
+        stat = os.fstat(self.stream.fileno())
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size + pending_bytes > self.max_bytes:
+            return True
+        if self.period_format:
+            last_write = datetime.fromtimestamp(stat.st_mtime).strftime(self.period_format)
+            return last_write != datetime.now().strftime(self.period_format)
+        return False
+
+    def _rotated_name(self):
+        base, ext = os.path.splitext(self.filename)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        name = f'{base}.{stamp}{ext}'
+        counter = 1
+        while os.path.exists(name) or os.path.exists(f'{name}.gz'):
+            name = f'{base}.{stamp}-{counter}{ext}'
+            counter += 1
+        return name
+
+    def _rollover(self):
+        rotated = self._rotated_name()
+        self.stream.close()
+        self.stream = None
+        os.rename(self.filename, rotated)
+        self._open()
+        return rotated
+
+    def _compress(self, path):
+        """Gzip a rotated segment (runs outside the file lock)"""
+        try:
+            with open(path, 'rb') as source, gzip.open(f'{path}.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+        except OSError as e:
+            logging.getLogger(__name__).error(f"Could not compress rotated log {path}: {e}")
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + '\n'
+            rotated = None
+
+            self._acquire_file_lock()
+            try:
+                if self.stream is None or not self._stream_is_current():
+                    self._open()
+                if self._should_rollover(len(line.encode('utf-8'))):
+                    rotated = self._rollover()
+                self.stream.write(line)
+                self.stream.flush()
+            finally:
+                self._release_file_lock()
+
+            if rotated:
+                self._compress(rotated)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            if self.lock_file:
+                self.lock_file.close()
+                self.lock_file = None
+        finally:
+            self.release()
+        super().close()
@@ -0,0 +1,212 @@
+"""
+Shared media helpers
+Upload validation, local staging and fixed-size image variants
+(thumb, card, hero) generated in the background worker
+"""
+import os
+import uuid
+import logging
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .background import run_in_background
+from .storage import get_upload_temp_storage
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_IMAGE_TYPES = ['image/jpeg', 'image/png', 'image/jpg', 'image/gif', 'image/webp']
+
+# Longest edge in pixels and encoder quality for each named variant
+VARIANT_SPECS = {
+    'thumb': (160, 75),
+    'card': (480, 80),
+    'hero': (1600, 82),
+}
+
+# Variants built for each image field, smallest first
+FIELD_VARIANTS = {
+    'logo': ['thumb', 'card'],
+    'cover_image': ['card', 'hero'],
+    'profile_picture': ['thumb'],
+    'image': ['thumb', 'card'],
+}
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+
+class ImageValidationError(ValueError):
+    """Raised when an uploaded file is not an acceptable image"""
+
+
+def validate_image_upload(upload, max_size, allowed_types=ALLOWED_IMAGE_TYPES):
+    """
+    Check size, declared type and that Pillow can actually parse the file
+
+    Args:
+        upload: UploadedFile from request.FILES
+        max_size: Maximum file size in bytes
+        allowed_types: Accepted content types
+    """
+    if upload.size > max_size:
+        raise ImageValidationError(f'Image file size must be less than {max_size // (1024 * 1024)}MB')
+
+    if upload.content_type not in allowed_types:
+        raise ImageValidationError('Only JPEG, PNG, GIF, and WebP images are allowed')
+
+    try:
+        Image.open(upload).verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ImageValidationError('Uploaded file is not a valid image')
+    finally:
+        upload.seek(0)
+
+
+def stage_upload(upload, folder):
+    """Stream an upload to local temp storage chunk by chunk and return its name"""
+    extension = os.path.splitext(upload.name)[1].lower() or '.img'
+    name = f'{folder}/{uuid.uuid4().hex}{extension}'
+    return get_upload_temp_storage().save(name, upload)
+
+
+def delete_stale_staged_uploads(older_than, keep=()):
+    """
+    Delete staged uploads last modified before `older_than`, except the names in `keep`
+
+    A worker that dies mid-job leaves its staged upload behind. Returns how many were deleted.
+    """
+    temp_storage = get_upload_temp_storage()
+    if not os.path.isdir(temp_storage.location):
+        return 0
+
+    deleted = 0
+    pending_dirs = ['']
+    while pending_dirs:
+        directory = pending_dirs.pop()
+        dirs, files = temp_storage.listdir(directory)
+        pending_dirs.extend(f'{directory}{name}/' for name in dirs)
+        for file_name in files:
+            name = f'{directory}{file_name}'
+            try:
+                if name in keep or temp_storage.get_modified_time(name) >= older_than:
+                    continue
+                temp_storage.delete(name)
+                deleted += 1
+            except FileNotFoundError:
+                # Finished and deleted by its worker meanwhile
+                continue
+    return deleted
+
+
+def open_staged_image(staged_name):
+    """Load a staged upload with its EXIF orientation applied"""
+    with get_upload_temp_storage().open(staged_name, 'rb') as staged_file:
+        image = Image.open(staged_file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image
+
+
+def render_variant(image, max_edge, quality, image_format='JPEG'):
+    """Downscale an image to fit max_edge and encode it"""
+    variant = image.copy()
+    variant.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        variant.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        variant.save(buffer, format=image_format, quality=quality, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_image_variants(model_label, pk, field_name, source_name, staged_name):
+    """
+    Render and store the variants for one image field (runs in the worker)
+
+    The result is only written if the field still holds source_name, so a
+    slow job never overwrites the variants of a newer upload.
+    """
+    model = apps.get_model(model_label)
+    image_format = settings.MEDIA_VARIANT_FORMAT
+
+    try:
+        image = open_staged_image(staged_name)
+        upload_to = model._meta.get_field(field_name).upload_to
+        base_name = uuid.uuid4().hex
+
+        variants = {}
+        for variant_name in FIELD_VARIANTS[field_name]:
+            max_edge, quality = VARIANT_SPECS[variant_name]
+            content = render_variant(image, max_edge, quality, image_format)
+            path = default_storage.save(
+                f'{upload_to}variants/{base_name}_{variant_name}.{FORMAT_EXTENSIONS[image_format]}',
+                content
+            )
+            variants[variant_name] = default_storage.url(path)
+
+        updated = model.objects.filter(pk=pk, **{field_name: source_name}).update(
+            **{f'{field_name}_variants': variants}
+        )
+        if updated:
+            logger.info(f"Image variants built for {model_label} #{pk} {field_name}")
+        else:
+            logger.info(f"Image variants for {model_label} #{pk} {field_name} superseded, discarded")
+
+    except Exception as e:
+        logger.error(f"Image variant generation failed for {model_label} #{pk} {field_name}: {e}", exc_info=True)
+
+    finally:
+        get_upload_temp_storage().delete(staged_name)
+
+
+def queue_image_variants(instance, field_name, upload):
+    """
+    Stage an upload that was just saved to instance.<field_name> and
+    build its variants in the background
+
+    Clears the stale variants of the previous image right away.
+    """
+    setattr(instance, f'{field_name}_variants', {})
+    instance.save(update_fields=[f'{field_name}_variants'])
+
+    staged_name = stage_upload(upload, instance._meta.model_name)
+    run_in_background(
+        generate_image_variants,
+        instance._meta.label,
+        instance.pk,
+        field_name,
+        getattr(instance, field_name).name,
+        staged_name
+    )
+
+
+def variant_url(instance, field_name, variant_name):
+    """
+    Smallest suitable URL for an image field
+
+    Returns the requested variant when it has been built, otherwise the original.
+    """
+    variants = getattr(instance, f'{field_name}_variants', None) or {}
+    if variants.get(variant_name):
+        return variants[variant_name]
+
+    field_file = getattr(instance, field_name)
+    return field_file.url if field_file else None
+
+
+def absolute_media_url(request, url):
+    """Cloudinary URLs are already absolute, local filesystem URLs start with /"""
+    if url and url.startswith('/') and request is not None:
+        return request.build_absolute_uri(url)
+    return url
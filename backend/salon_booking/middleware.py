@@ -1,8 +1,20 @@
 """
-Custom middleware for handling security headers and CORS
+Custom middleware for handling security headers, CORS, request instrumentation
+and read-replica pinning
 """
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.http import HttpResponse
+import time
 import logging
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .db_router import PIN_COOKIE, REPLICA_ALIAS, SAFE_METHODS, routing_state
+from .instrumentation import db_timer, install_http_hooks, registry, track_request
 
 logger = logging.getLogger(__name__)
 
@@ -15,14 +27,14 @@ class SecurityHeadersMiddleware:
         logger.info("SecurityHeadersMiddleware initialized")
 
     def __call__(self, request):
-        logger.info(f"SecurityHeadersMiddleware called: {request.method} {request.path}")
+        logger.debug(f"SecurityHeadersMiddleware called: {request.method} {request.path}")
         
         # Handle OPTIONS (preflight) requests immediately
         if request.method == 'OPTIONS':
-            logger.info(f"Handling OPTIONS preflight for {request.path}")
+            logger.debug(f"Handling OPTIONS preflight for {request.path}")
             response = HttpResponse()
             origin = request.headers.get('Origin', '*')
-            logger.info(f"Origin: {origin}")
+            logger.debug(f"Origin: {origin}")
             
             response['Access-Control-Allow-Origin'] = origin
             response['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
@@ -30,7 +42,7 @@ class SecurityHeadersMiddleware:
             response['Access-Control-Allow-Credentials'] = 'true'
             response['Access-Control-Max-Age'] = '86400'
             response.status_code = 200
-            logger.info("Returning OPTIONS response with CORS headers")
+            logger.debug("Returning OPTIONS response with CORS headers")
             return response
         
         # Process normal requests
@@ -50,3 +62,116 @@ class SecurityHeadersMiddleware:
             del response['Cross-Origin-Embedder-Policy']
         
         return response
+
+
+class InstrumentationMiddleware:
+    """
+    Measure every request: wall time, DB queries and their time, time spent on
+    external services and response size
+
+    Results feed the /metrics histograms and, when SERVER_TIMING_ENABLED is on,
+    a Server-Timing header that browser dev tools show per request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_http_hooks()
+
+    def __call__(self, request):
+        with track_request() as metrics, ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(db_timer))
+            response = self.get_response(request)
+
+        duration = time.perf_counter() - metrics.started
+        view = self.view_label(request)
+
+        if response.streaming:
+            response_bytes = 0  # size unknown until the body has been sent
+        else:
+            response_bytes = len(response.content)
+        registry.observe(view, request.method, response.status_code, metrics, duration, response_bytes)
+
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = self.server_timing(metrics, duration)
+
+        if duration >= settings.SLOW_REQUEST_THRESHOLD:
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({view}): {duration * 1000:.0f}ms, "
+                f"{metrics.db_queries} queries in {metrics.db_time * 1000:.0f}ms"
+            )
+        return response
+
+    def view_label(self, request):
+        """URL name of the matched view, so /bookings/12/ and /bookings/13/ share a series"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        if match.view_name:
+            return match.view_name
+        view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+        if view_class is not None:
+            return f'{view_class.__module__}.{view_class.__name__}'
+        return match._func_path
+
+    def server_timing(self, metrics, duration):
+        entries = [
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+        ]
+        for service, seconds in sorted(metrics.external.items()):
+            entries.append(f'{service};dur={seconds * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keep a client on the primary database for a while after it writes
+
+    Writing requests and pinned clients never read from the replica. A request
+    that wrote pins its user in the cache for DATABASE_REPLICA_PIN_SECONDS,
+    which should be longer than the replication lag; the frontend calls the API
+    cross-site, where a Lax cookie is not sent. Anonymous clients are pinned
+    with a cookie instead. Settings require REDIS_URL with a replica, so every
+    worker sees the pins. Not used without a replica.
+    """
+    def __init__(self, get_response):
+        if REPLICA_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = self.token_user_id(request)
+        pin_key = f'replica-pin:{user_id}'
+        if user_id is not None:
+            pinned = cache.get(pin_key) is not None
+        else:
+            pinned = PIN_COOKIE in request.COOKIES
+        with routing_state(pinned=pinned or request.method not in SAFE_METHODS) as state:
+            response = self.get_response(request)
+
+        if state.wrote:
+            if user_id is not None:
+                cache.set(pin_key, 1, settings.DATABASE_REPLICA_PIN_SECONDS)
+            else:
+                response.set_cookie(
+                    PIN_COOKIE,
+                    '1',
+                    max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                    secure=request.is_secure(),
+                )
+        return response
+
+    def token_user_id(self, request):
+        """User id from a valid JWT access token, without loading the user"""
+        authenticator = JWTAuthentication()
+        header = authenticator.get_header(request)
+        raw_token = authenticator.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            token = authenticator.get_validated_token(raw_token)
+        except InvalidToken:
+            return None
+        return token.get(jwt_settings.USER_ID_CLAIM)
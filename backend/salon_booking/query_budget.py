@@ -0,0 +1,106 @@
+"""
+Query-count budgets for API endpoints
+
+Declare the most queries a view may run next to its @api_view:
+
+    @query_budget(4)
+    @api_view(['GET'])
+    @permission_classes([IsAuthenticated])
+    def get_my_bookings(request):
+
+The count covers the whole DRF view, authentication and permission checks
+included. What happens when a view goes over depends on QUERY_BUDGET_MODE:
+'warn' logs the count with the SQL that was repeated (usually an N+1 loop),
+'raise' fails the request with QueryBudgetExceeded (the default under
+`manage.py test`, so the suite breaks), 'off' skips counting.
+"""
+import functools
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+REPORTED_STATEMENTS = 5
+SQL_PREVIEW_LENGTH = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in 'raise' mode when a view runs more queries than its budget"""
+
+
+@contextmanager
+def capture_queries():
+    """Collect the SQL of every query run inside the block, on all connections"""
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(record))
+        yield statements
+
+
+def check_budget(label, budget, statements):
+    """Warn or raise if the captured statements go over budget"""
+    if len(statements) <= budget:
+        return
+
+    repeated = [
+        f"  {count}x {sql[:SQL_PREVIEW_LENGTH]}"
+        for sql, count in Counter(statements).most_common(REPORTED_STATEMENTS)
+        if count > 1
+    ]
+    message = f"Query budget exceeded for {label}: {len(statements)} queries (budget {budget})"
+    if repeated:
+        message += "\nRepeated queries:\n" + "\n".join(repeated)
+
+    if settings.QUERY_BUDGET_MODE == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def query_budget(max_queries):
+    """Decorator declaring the maximum number of queries a view may run"""
+    def decorator(view):
+        # @api_view returns a generic `view` closure; the wrapped class carries the function's name
+        label = f"{view.__module__}.{getattr(view, 'cls', view).__name__}"
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if settings.QUERY_BUDGET_MODE == 'off':
+                return view(*args, **kwargs)
+            with capture_queries() as statements:
+                response = view(*args, **kwargs)
+            check_budget(label, max_queries, statements)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMixin:
+    """
+    Per-action budgets for DRF viewsets
+
+    Set `query_budgets = {'list': 3, 'retrieve': 2, ...}` on the viewset;
+    actions without an entry are not checked.
+    """
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return super().dispatch(request, *args, **kwargs)
+        with capture_queries() as statements:
+            response = super().dispatch(request, *args, **kwargs)
+        # self.action is only known once dispatch has routed the request
+        budget = self.query_budgets.get(getattr(self, 'action', None))
+        if budget is not None:
+            check_budget(f'{type(self).__module__}.{type(self).__name__}.{self.action}', budget, statements)
+        return response
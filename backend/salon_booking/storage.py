@@ -0,0 +1,24 @@
+"""
+Storage backends for media uploads
+"""
+from functools import lru_cache
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class LocalMediaStorage(FileSystemStorage):
+    """
+    Filesystem stand-in for Cloudinary media storage
+    Used in development and tests (MEDIA_STORAGE=local) so uploads never leave the machine
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('location', settings.MEDIA_ROOT)
+        kwargs.setdefault('base_url', settings.MEDIA_URL)
+        super().__init__(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_upload_temp_storage():
+    """Local staging area for raw uploads waiting to be processed"""
+    return FileSystemStorage(location=settings.UPLOAD_TEMP_ROOT)
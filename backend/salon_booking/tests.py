@@ -0,0 +1,191 @@
+import json
+import time
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework import viewsets
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import User
+from salons.models import Salon
+from .db_router import PIN_COOKIE, REPLICA_ALIAS, replica_reads
+from .middleware import ReplicaPinningMiddleware
+from .query_budget import QueryBudgetExceeded, QueryBudgetMixin, query_budget
+
+
+@replica_reads
+def read_view(request):
+    """Reports where a read would go"""
+    return JsonResponse({'alias': Salon.objects.all().db})
+
+
+@replica_reads
+def write_then_read_view(request):
+    router.db_for_write(Salon)
+    return JsonResponse({'alias': Salon.objects.all().db})
+
+
+@override_settings(
+    DATABASE_ROUTERS=['salon_booking.db_router.ReplicaRouter'],
+    DATABASE_REPLICA_PIN_SECONDS=10,
+)
+class ReplicaPinningTests(TestCase):
+    """Reads go to the replica, except for a while after the same client wrote"""
+
+    def setUp(self):
+        # A second alias for the router; nothing here queries it
+        databases = mock.patch.dict(settings.DATABASES, {REPLICA_ALIAS: settings.DATABASES['default']})
+        databases.start()
+        self.addCleanup(databases.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User.objects.create_user(username='customer', email='customer@example.com', password='x')
+        self.factory = RequestFactory()
+        self.middleware = ReplicaPinningMiddleware(self.dispatch)
+
+    def dispatch(self, request):
+        return write_then_read_view(request) if request.method == 'POST' else read_view(request)
+
+    def request(self, method, user=None, cookies=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        request = getattr(self.factory, method)('/api/salons/', **headers)
+        request.COOKIES.update(cookies or {})
+        response = self.middleware(request)
+        return response, json.loads(response.content)['alias']
+
+    def test_replica_reads_go_to_the_replica(self):
+        self.assertEqual(self.request('get', self.user)[1], REPLICA_ALIAS)
+        self.assertEqual(self.request('get')[1], REPLICA_ALIAS)
+        # Outside a marked view, reads stay on the primary
+        self.assertEqual(Salon.objects.all().db, 'default')
+
+    def test_write_pins_the_user_to_the_primary(self):
+        response, alias = self.request('post', self.user)
+        self.assertEqual(alias, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        self.assertEqual(self.request('get', self.user)[1], 'default')
+        # Another user, and anonymous clients, still read from the replica
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        self.assertEqual(self.request('get', other)[1], REPLICA_ALIAS)
+        self.assertEqual(self.request('get')[1], REPLICA_ALIAS)
+
+    def test_pin_expires(self):
+        self.request('post', self.user)
+        later = time.time() + settings.DATABASE_REPLICA_PIN_SECONDS + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(self.request('get', self.user)[1], REPLICA_ALIAS)
+
+    def test_anonymous_clients_are_pinned_by_cookie(self):
+        response, _ = self.request('post')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.DATABASE_REPLICA_PIN_SECONDS)
+
+        self.assertEqual(self.request('get', cookies={PIN_COOKIE: '1'})[1], 'default')
+        # Authenticated requests rely on the user pin only
+        self.assertEqual(self.request('get', self.user, cookies={PIN_COOKIE: '1'})[1], REPLICA_ALIAS)
+
+
+def run_queries(count):
+    for _ in range(count):
+        User.objects.count()
+
+
+@query_budget(2)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def budgeted_view(request):
+    run_queries(int(request.GET['queries']))
+    return Response({})
+
+
+@query_budget(2)
+def inner_task(queries):
+    run_queries(queries)
+
+
+@query_budget(3)
+def outer_task(inner_queries, own_queries):
+    inner_task(inner_queries)
+    run_queries(own_queries)
+
+
+class BudgetedViewSet(QueryBudgetMixin, viewsets.ViewSet):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    query_budgets = {'list': 1}
+
+    def list(self, request):
+        run_queries(2)
+        return Response([])
+
+    def retrieve(self, request, pk=None):
+        run_queries(5)
+        return Response({})
+
+
+class QueryBudgetTests(TestCase):
+    """query_budget and QueryBudgetMixin in each QUERY_BUDGET_MODE"""
+
+    logger_name = 'salon_booking.query_budget'
+
+    def get(self, queries):
+        request = APIRequestFactory().get('/budgeted/', {'queries': queries})
+        return budgeted_view(request)
+
+    def test_within_budget_passes_in_every_mode(self):
+        for mode in ('off', 'warn', 'raise'):
+            with self.subTest(mode=mode), override_settings(QUERY_BUDGET_MODE=mode), self.assertNoLogs(self.logger_name):
+                self.assertEqual(self.get(2).status_code, 200)
+        self.assertEqual(budgeted_view.query_budget, 2)
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_warn_names_the_view_and_the_repeated_query(self):
+        with self.assertLogs(self.logger_name, 'WARNING') as logs:
+            self.assertEqual(self.get(3).status_code, 200)
+
+        message = logs.output[0]
+        self.assertIn('salon_booking.tests.budgeted_view: 3 queries (budget 2)', message)
+        self.assertIn('Repeated queries:\n  3x SELECT COUNT(*)', message)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_raise_fails_the_request(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'salon_booking.tests.budgeted_view: 3 queries (budget 2)'):
+            self.get(3)
+
+    @override_settings(QUERY_BUDGET_MODE='off')
+    def test_off_does_not_count(self):
+        with self.assertNoLogs(self.logger_name), self.assertNumQueries(10):
+            self.get(10)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_nested_budgets_both_apply(self):
+        # The outer budget counts the inner call's queries too
+        outer_task(2, 1)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'salon_booking.tests.outer_task: 4 queries (budget 3)'):
+            outer_task(2, 2)
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'salon_booking.tests.inner_task: 3 queries (budget 2)'):
+            outer_task(3, 0)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_mixin_checks_actions_with_a_budget(self):
+        list_view = BudgetedViewSet.as_view({'get': 'list'})
+        retrieve_view = BudgetedViewSet.as_view({'get': 'retrieve'})
+        request = APIRequestFactory().get('/budgeted/')
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'salon_booking.tests.BudgetedViewSet.list: 2 queries (budget 1)'):
+            list_view(request)
+        self.assertEqual(retrieve_view(request, pk=1).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_mixin_warns(self):
+        with self.assertLogs(self.logger_name, 'WARNING') as logs:
+            BudgetedViewSet.as_view({'get': 'list'})(APIRequestFactory().get('/budgeted/'))
+        self.assertIn('BudgetedViewSet.list: 2 queries (budget 1)', logs.output[0])
@@ -8,6 +8,8 @@ from django.conf.urls.static import static
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView, RedirectView
+from .instrumentation import metrics_view
+from .db_pool import db_pool_stats
 
 def api_root(request):
     """API root endpoint with information about available endpoints"""
@@ -20,6 +22,7 @@ def api_root(request):
             'salons': '/api/salons/',
             'bookings': '/api/bookings/',
             'notifications': '/api/notifications/',
+            'analytics': '/api/analytics/',
         },
         'status': 'running'
     })
@@ -47,6 +50,11 @@ urlpatterns = [
     path('api/salons/', include('salons.urls')),
     path('api/bookings/', include('bookings.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/analytics/', include('analytics.urls')),
+    path('api/admin/db-pool/', db_pool_stats, name='db_pool_stats'),
+    
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
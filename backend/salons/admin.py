@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from .models import SalonApplication, Salon, Service, ServiceImage, Review
 
 
@@ -132,12 +134,20 @@ class ReviewAdmin(admin.ModelAdmin):
     
     actions = ['approve_reviews', 'reject_reviews']
     
+    def moderate(self, request, queryset, new_status):
+        """Set the status in one UPDATE, then recompute each affected salon's rating once"""
+        with transaction.atomic():
+            salon_ids = list(queryset.order_by().values_list('salon_id', flat=True).distinct())
+            updated = queryset.update(status=new_status, moderated_by=request.user, updated_at=timezone.now())
+            Review.update_salon_ratings(salon_ids)
+        return updated
+    
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(status='approved', moderated_by=request.user)
+        updated = self.moderate(request, queryset, 'approved')
         self.message_user(request, f'{updated} review(s) approved successfully.')
     approve_reviews.short_description = 'Approve selected reviews'
     
     def reject_reviews(self, request, queryset):
-        updated = queryset.update(status='rejected', moderated_by=request.user)
+        updated = self.moderate(request, queryset, 'rejected')
         self.message_user(request, f'{updated} review(s) rejected.')
     reject_reviews.short_description = 'Reject selected reviews'
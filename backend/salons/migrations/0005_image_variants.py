@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salons', '0004_serviceimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized cover URLs keyed by variant (card, hero)'),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized logo URLs keyed by variant (thumb, card)'),
+        ),
+        migrations.AddField(
+            model_name='serviceimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized image URLs keyed by variant (thumb, card)'),
+        ),
+    ]
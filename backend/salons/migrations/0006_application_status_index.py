@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salons', '0005_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salonapplication',
+            index=models.Index(fields=['status', '-created_at'], name='salons_salo_status_e96100_idx'),
+        ),
+    ]
@@ -60,6 +60,9 @@ class SalonApplication(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Salon Application'
         verbose_name_plural = 'Salon Applications'
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.salon_name} - {self.status}"
@@ -91,6 +94,8 @@ class Salon(models.Model):
     # Media
     logo = models.ImageField(upload_to='salon_logos/', blank=True, null=True)
     cover_image = models.ImageField(upload_to='salon_covers/', blank=True, null=True)
+    logo_variants = models.JSONField(default=dict, blank=True, help_text='Resized logo URLs keyed by variant (thumb, card)')
+    cover_image_variants = models.JSONField(default=dict, blank=True, help_text='Resized cover URLs keyed by variant (card, hero)')
     
     # Ratings and stats
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
@@ -146,6 +151,7 @@ class ServiceImage(models.Model):
     """Model for service images"""
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='service_images/')
+    image_variants = models.JSONField(default=dict, blank=True, help_text='Resized image URLs keyed by variant (thumb, card)')
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -260,6 +266,27 @@ class Review(models.Model):
         self.salon.total_reviews = stats['total_reviews'] or 0
         self.salon.save(update_fields=['rating', 'total_reviews'])
     
+    @staticmethod
+    def update_salon_ratings(salons):
+        """Same figures as update_salon_rating for many salons (ids or a queryset), in one UPDATE"""
+        from decimal import Decimal
+        from django.db.models import Avg, Count, DecimalField, IntegerField, OuterRef, Subquery, Value
+        from django.db.models.functions import Coalesce
+        
+        approved = Review.objects.filter(salon=OuterRef('pk'), status='approved').order_by().values('salon')
+        return Salon.objects.filter(pk__in=salons).update(
+            rating=Coalesce(
+                Subquery(approved.annotate(avg=Avg('rating')).values('avg')),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+            total_reviews=Coalesce(
+                Subquery(approved.annotate(total=Count('id')).values('total')),
+                Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+    
     def send_review_notification(self):
         """Send email notification to salon owner about new review"""
         from django.core.mail import send_mail
@@ -39,7 +39,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return obj.customer == request.user
+        return obj.customer_id == request.user.id
     
     def get_can_respond(self, obj):
         """Check if current user can respond to this review"""
@@ -47,7 +47,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return False
         # Salon owner can respond
-        return obj.salon.owner == request.user or request.user.is_staff
+        return obj.salon.owner_id == request.user.id or request.user.is_staff
 
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
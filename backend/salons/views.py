@@ -6,12 +6,16 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db import models
-from django.db.models import Avg, Q
+from django.db import models, transaction
+from django.db.models import Avg, Count, Q
 from .models import SalonApplication, Salon, Service, ServiceImage, Review
 from .serializers import ReviewSerializer, ReviewCreateSerializer, SalonResponseSerializer
 from activity_logger import log_user_activity, log_salon_activity
 from notifications.utils import create_application_notification
+from salon_booking.media import queue_image_variants, variant_url, absolute_media_url
+from salon_booking.db_router import replica_reads
+from salon_booking.query_budget import query_budget
+from salon_booking.background import run_in_background
 import logging
 
 # Import Brevo SDK if available
@@ -27,6 +31,12 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
+def active_services_prefetch():
+    """Prefetch each salon's active services into salon.active_services (one query for all salons)"""
+    return models.Prefetch('salon_services', queryset=Service.objects.filter(is_active=True), to_attr='active_services')
+
+
+@query_budget(5)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_salon_application(request):
@@ -88,6 +98,7 @@ def submit_salon_application(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_my_application(request):
@@ -132,10 +143,16 @@ def get_my_application(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_applications(request):
-    """Get all salon applications (Admin only)"""
+    """
+    Get salon applications a page at a time, newest first (Admin only)
+
+    ?status= limits the page to pending, approved or rejected; counts always
+    holds the per-status totals for the tabs.
+    """
     try:
         # Check if user is admin
         if not request.user.is_staff and not request.user.is_superuser:
@@ -143,10 +160,24 @@ def get_all_applications(request):
                 'error': 'Admin privileges required'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        applications = SalonApplication.objects.all().select_related('user', 'reviewed_by')
+        status_filter = request.GET.get('status', 'all')
+        limit = min(int(request.GET.get('limit', 20)), 100)  # Max 100 per request
+        offset = int(request.GET.get('offset', 0))
+        
+        # Per-status totals in one grouped query; they double as the page total
+        counts = {value: 0 for value, _ in SalonApplication.STATUS_CHOICES}
+        counts.update(
+            SalonApplication.objects.order_by().values_list('status').annotate(count=Count('id'))
+        )
+        counts['total'] = sum(counts.values())
+        
+        applications = SalonApplication.objects.select_related('user', 'reviewed_by').order_by('-created_at')
+        if status_filter != 'all':
+            applications = applications.filter(status=status_filter)
+        total_count = counts.get(status_filter, 0) if status_filter != 'all' else counts['total']
         
         applications_data = []
-        for app in applications:
+        for app in applications[offset:offset + limit]:
             applications_data.append({
                 'id': app.id,
                 'salon_name': app.salon_name,
@@ -178,7 +209,16 @@ def get_all_applications(request):
                 'updated_at': app.updated_at
             })
         
-        return Response(applications_data, status=status.HTTP_200_OK)
+        return Response({
+            'applications': applications_data,
+            'counts': counts,
+            'pagination': {
+                'total_count': total_count,
+                'limit': limit,
+                'offset': offset,
+                'has_more': offset + limit < total_count
+            }
+        }, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
@@ -186,10 +226,11 @@ def get_all_applications(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(8)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def approve_application(request, application_id):
-    """Approve a salon application (Admin only)"""
+    """Approve a salon application (Admin only); the applicant is emailed and notified in the background"""
     try:
         # Check if user is admin
         if not request.user.is_staff and not request.user.is_superuser:
@@ -197,55 +238,52 @@ def approve_application(request, application_id):
                 'error': 'Admin privileges required'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Get application
-        try:
-            application = SalonApplication.objects.get(id=application_id)
-        except SalonApplication.DoesNotExist:
-            return Response({
-                'error': 'Application not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if already processed
-        if application.status != 'pending':
-            return Response({
-                'error': f'Application already {application.status}'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update application status
-        application.status = 'approved'
-        application.reviewed_by = request.user
-        application.reviewed_at = timezone.now()
-        application.admin_notes = request.data.get('notes', '')
-        application.save()
-        
-        # Create salon from application
-        salon = Salon.objects.create(
-            owner=application.user,
-            application=application,
-            name=application.salon_name,
-            email=application.business_email,
-            phone=application.phone,
-            website=application.website,
-            address=application.address,
-            city=application.city,
-            state=application.state,
-            postal_code=application.postal_code,
-            description=application.description,
-            services=application.services,
-            years_in_business=application.years_in_business,
-            staff_count=application.staff_count,
-            is_verified=True
-        )
-        
-        # Update user type to salon_owner
-        application.user.user_type = 'salon_owner'
-        application.user.save()
-        
-        # Send approval email to applicant
-        send_approval_email(application, salon)
-        
-        # Create notification for applicant
-        create_application_notification(application)
+        with transaction.atomic():
+            # Lock the application so two admins cannot both approve it
+            try:
+                application = SalonApplication.objects.select_for_update().get(id=application_id)
+            except SalonApplication.DoesNotExist:
+                return Response({
+                    'error': 'Application not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            # Check if already processed
+            if application.status != 'pending':
+                return Response({
+                    'error': f'Application already {application.status}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Update application status
+            application.status = 'approved'
+            application.reviewed_by = request.user
+            application.reviewed_at = timezone.now()
+            application.admin_notes = request.data.get('notes', '')
+            application.save(update_fields=['status', 'reviewed_by', 'reviewed_at', 'admin_notes', 'updated_at'])
+            
+            # Create salon from application
+            salon = Salon.objects.create(
+                owner_id=application.user_id,
+                application=application,
+                name=application.salon_name,
+                email=application.business_email,
+                phone=application.phone,
+                website=application.website,
+                address=application.address,
+                city=application.city,
+                state=application.state,
+                postal_code=application.postal_code,
+                description=application.description,
+                services=application.services,
+                years_in_business=application.years_in_business,
+                staff_count=application.staff_count,
+                is_verified=True
+            )
+            
+            # Update user type to salon_owner
+            User.objects.filter(id=application.user_id).update(user_type='salon_owner')
+            
+            # Approval email and notification, once the approval is committed
+            run_in_background(notify_application_decision, application.id)
         
         return Response({
             'message': 'Application approved successfully',
@@ -258,10 +296,11 @@ def approve_application(request, application_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(4)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def reject_application(request, application_id):
-    """Reject a salon application (Admin only)"""
+    """Reject a salon application (Admin only); the applicant is emailed and notified in the background"""
     try:
         # Check if user is admin
         if not request.user.is_staff and not request.user.is_superuser:
@@ -269,32 +308,28 @@ def reject_application(request, application_id):
                 'error': 'Admin privileges required'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Get application
-        try:
-            application = SalonApplication.objects.get(id=application_id)
-        except SalonApplication.DoesNotExist:
-            return Response({
-                'error': 'Application not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+        # Only a still-pending application changes, so a concurrent approval wins cleanly
+        now = timezone.now()
+        updated = SalonApplication.objects.filter(id=application_id, status='pending').update(
+            status='rejected',
+            reviewed_by=request.user,
+            reviewed_at=now,
+            admin_notes=request.data.get('notes', ''),
+            updated_at=now
+        )
         
-        # Check if already processed
-        if application.status != 'pending':
+        if not updated:
+            current_status = SalonApplication.objects.filter(id=application_id).values_list('status', flat=True).first()
+            if current_status is None:
+                return Response({
+                    'error': 'Application not found'
+                }, status=status.HTTP_404_NOT_FOUND)
             return Response({
-                'error': f'Application already {application.status}'
+                'error': f'Application already {current_status}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update application status
-        application.status = 'rejected'
-        application.reviewed_by = request.user
-        application.reviewed_at = timezone.now()
-        application.admin_notes = request.data.get('notes', '')
-        application.save()
-        
-        # Send rejection email to applicant
-        send_rejection_email(application)
-        
-        # Create notification for applicant
-        create_application_notification(application)
+        # Rejection email and notification
+        run_in_background(notify_application_decision, application_id)
         
         return Response({
             'message': 'Application rejected'
@@ -306,6 +341,16 @@ def reject_application(request, application_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def notify_application_decision(application_id):
+    """Email the applicant about the review and create their notification (background task)"""
+    application = SalonApplication.objects.select_related('user', 'salon').get(id=application_id)
+    if application.status == 'approved':
+        send_approval_email(application, application.salon)
+    elif application.status == 'rejected':
+        send_rejection_email(application)
+    create_application_notification(application)
+
+
 # Email notification functions
 def send_application_notification_to_admin(application):
     """Send email to admin when new application is submitted"""
@@ -575,17 +620,19 @@ SalonBook Team
         return False
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
 def get_all_salons(request):
     """Get all active salons"""
     try:
-        salons = Salon.objects.filter(is_active=True).select_related('owner')
+        salons = Salon.objects.filter(is_active=True).prefetch_related(active_services_prefetch())
         
         salons_data = []
         for salon in salons:
             # Get actual services from Service model
-            services = salon.salon_services.filter(is_active=True)
+            services = salon.active_services
             services_list = [service.name for service in services]
             
             # If no services in Service model, use the JSON field as fallback
@@ -602,18 +649,16 @@ def get_all_salons(request):
                 }
             
             # Get image URLs (Cloudinary returns full URLs, filesystem returns relative)
-            logo_url = salon.logo.url if salon.logo else None
-            cover_url = salon.cover_image.url if salon.cover_image else None
+            logo_url = absolute_media_url(request, salon.logo.url if salon.logo else None)
+            cover_url = absolute_media_url(request, salon.cover_image.url if salon.cover_image else None)
             
-            # Only use build_absolute_uri for local filesystem URLs (start with /)
-            if logo_url and logo_url.startswith('/'):
-                logo_url = request.build_absolute_uri(logo_url)
-            if cover_url and cover_url.startswith('/'):
-                cover_url = request.build_absolute_uri(cover_url)
+            # Listings get the smallest suitable variant (falls back to the original)
+            logo_thumb_url = absolute_media_url(request, variant_url(salon, 'logo', 'thumb'))
+            cover_card_url = absolute_media_url(request, variant_url(salon, 'cover_image', 'card'))
             
             salons_data.append({
                 'id': salon.id,
-                'owner_id': salon.owner.id,
+                'owner_id': salon.owner_id,
                 'name': salon.name,
                 'email': salon.email,
                 'phone': salon.phone,
@@ -623,12 +668,18 @@ def get_all_salons(request):
                 'state': salon.state,
                 'postal_code': salon.postal_code,
                 'description': salon.description,
-                # For backward compatibility, keep both fields
+                # For backward compatibility, keep both fields (originals)
                 'logo': logo_url,
                 'cover_image': cover_url,
-                # Absolute URLs (same as above for Cloudinary)
-                'logo_url': logo_url,
-                'cover_image_url': cover_url,
+                # Listing-sized variants
+                'logo_url': logo_thumb_url,
+                'cover_image_url': cover_card_url,
+                'logo_variants': {
+                    name: absolute_media_url(request, url) for name, url in salon.logo_variants.items()
+                },
+                'cover_image_variants': {
+                    name: absolute_media_url(request, url) for name, url in salon.cover_image_variants.items()
+                },
                 'services': services_list,
                 'services_detailed': [
                     {
@@ -658,6 +709,7 @@ def get_all_salons(request):
 
 
 # Service Management Views
+@query_budget(8)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def manage_services(request):
@@ -673,13 +725,13 @@ def manage_services(request):
         
         if request.method == 'GET':
             # Get all services for this salon
-            services = Service.objects.filter(salon=salon)
+            services = Service.objects.filter(salon=salon).prefetch_related('images')
             
             services_data = []
             for service in services:
-                # Get service images
+                # Get service images (card-sized variants)
                 images = service.images.all()
-                image_urls = [request.build_absolute_uri(img.image.url) for img in images]
+                image_urls = [request.build_absolute_uri(variant_url(img, 'image', 'card')) for img in images]
                 
                 services_data.append({
                     'id': service.id,
@@ -725,6 +777,7 @@ def manage_services(request):
                     image=image,
                     is_primary=(idx == 0)  # First image is primary
                 )
+                queue_image_variants(service_image, 'image', image)
                 image_urls.append(request.build_absolute_uri(service_image.image.url))
             
             # Log activity
@@ -754,6 +807,7 @@ def manage_services(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(13)
 @api_view(['PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def manage_service(request, service_id):
@@ -794,11 +848,12 @@ def manage_service(request, service_id):
                 
                 # Add new images
                 for idx, image in enumerate(new_images):
-                    ServiceImage.objects.create(
+                    service_image = ServiceImage.objects.create(
                         service=service,
                         image=image,
                         is_primary=(idx == 0 and not service.images.exists())
                     )
+                    queue_image_variants(service_image, 'image', image)
             
             # Get updated images
             images = service.images.all()
@@ -847,8 +902,10 @@ def manage_service(request, service_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
 def get_salon_services(request, salon_id):
     """Get all services for a specific salon (public)"""
     try:
@@ -861,13 +918,13 @@ def get_salon_services(request, salon_id):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Get all active services for this salon
-        services = Service.objects.filter(salon=salon, is_active=True)
+        services = Service.objects.filter(salon=salon, is_active=True).prefetch_related('images')
         
         services_data = []
         for service in services:
-            # Get service images
+            # Get service images (card-sized variants)
             images = service.images.all()
-            image_urls = [request.build_absolute_uri(img.image.url) for img in images]
+            image_urls = [request.build_absolute_uri(variant_url(img, 'image', 'card')) for img in images]
             
             services_data.append({
                 'id': service.id,
@@ -886,6 +943,7 @@ def get_salon_services(request, salon_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(13)
 @api_view(['PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def manage_service(request, service_id):
@@ -946,8 +1004,10 @@ def manage_service(request, service_id):
 
 # Search and Filtering Views
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
 def search_salons(request):
     """Search salons by name, city, or services"""
     try:
@@ -966,7 +1026,7 @@ def search_salons(request):
             models.Q(city__icontains=query) |
             models.Q(description__icontains=query) |
             models.Q(salon_services__name__icontains=query)
-        ).distinct()
+        ).distinct().prefetch_related(active_services_prefetch())
         
         # Also search for individual services that match
         services = Service.objects.filter(
@@ -980,7 +1040,7 @@ def search_salons(request):
         # Serialize salon data
         salons_data = []
         for salon in salons:
-            services_for_salon = salon.salon_services.filter(is_active=True)
+            services_for_salon = salon.active_services
             salons_data.append({
                 'id': salon.id,
                 'name': salon.name,
@@ -1036,8 +1096,10 @@ def search_salons(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(4)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
 def filter_salons(request):
     """Filter salons by various criteria"""
     try:
@@ -1096,11 +1158,12 @@ def filter_salons(request):
         
         # Serialize salon data
         salons_data = []
-        for salon in salons:
-            services = salon.salon_services.filter(is_active=True)
+        for salon in salons.prefetch_related(active_services_prefetch()):
+            services = salon.active_services
+            prices = [float(service.price) for service in services]
             price_range = {
-                'min': float(services.aggregate(models.Min('price'))['price__min'] or 0),
-                'max': float(services.aggregate(models.Max('price'))['price__max'] or 0)
+                'min': min(prices, default=0),
+                'max': max(prices, default=0)
             }
             
             salons_data.append({
@@ -1114,7 +1177,7 @@ def filter_salons(request):
                 'description': salon.description,
                 'is_verified': salon.is_verified,
                 'price_range': price_range,
-                'services_count': services.count(),
+                'services_count': len(services),
                 'services': [
                     {
                         'id': service.id,
@@ -1154,8 +1217,10 @@ def filter_salons(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
 def nearby_salons(request):
     """Find salons near a given location"""
     try:
@@ -1186,41 +1251,46 @@ def nearby_salons(request):
         )
         
         # Calculate distance and filter
-        nearby_salons = []
+        in_radius = []
         for salon in salons:
-            salon_lat = float(salon.latitude)
-            salon_lng = float(salon.longitude)
-            
             # Calculate distance using Haversine formula (simplified)
-            distance = calculate_distance(lat, lng, salon_lat, salon_lng)
-            
+            distance = calculate_distance(lat, lng, float(salon.latitude), float(salon.longitude))
             if distance <= radius:
-                services = salon.salon_services.filter(is_active=True)
-                nearby_salons.append({
-                    'id': salon.id,
-                    'name': salon.name,
-                    'city': salon.city,
-                    'address': salon.address,
-                    'phone': salon.phone,
-                    'rating': float(salon.rating),
-                    'total_reviews': salon.total_reviews,
-                    'description': salon.description,
-                    'is_verified': salon.is_verified,
-                    'distance': round(distance, 2),
-                    'coordinates': {
-                        'lat': salon_lat,
-                        'lng': salon_lng
-                    },
-                    'services_count': services.count(),
-                    'services': [
-                        {
-                            'id': service.id,
-                            'name': service.name,
-                            'price': float(service.price),
-                            'duration': service.duration
-                        } for service in services[:3]
-                    ]
-                })
+                in_radius.append((salon, distance))
+        
+        # Services of the salons in range only, in one query
+        models.prefetch_related_objects([salon for salon, _ in in_radius], active_services_prefetch())
+        
+        nearby_salons = []
+        for salon, distance in in_radius:
+            salon_lat = float(salon.latitude)
+            salon_lng = float(salon.longitude)
+            services = salon.active_services
+            nearby_salons.append({
+                'id': salon.id,
+                'name': salon.name,
+                'city': salon.city,
+                'address': salon.address,
+                'phone': salon.phone,
+                'rating': float(salon.rating),
+                'total_reviews': salon.total_reviews,
+                'description': salon.description,
+                'is_verified': salon.is_verified,
+                'distance': round(distance, 2),
+                'coordinates': {
+                    'lat': salon_lat,
+                    'lng': salon_lng
+                },
+                'services_count': len(services),
+                'services': [
+                    {
+                        'id': service.id,
+                        'name': service.name,
+                        'price': float(service.price),
+                        'duration': service.duration
+                    } for service in services[:3]
+                ]
+            })
         
         # Sort by distance
         nearby_salons.sort(key=lambda x: x['distance'])
@@ -1264,8 +1334,10 @@ def calculate_distance(lat1, lng1, lat2, lng2):
 # REVIEW API ENDPOINTS
 # ============================================
 
+@query_budget(14)
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
+@replica_reads
 def salon_reviews(request, salon_id):
     """Get all reviews for a salon or create a new review"""
     try:
@@ -1276,30 +1348,19 @@ def salon_reviews(request, salon_id):
     # GET: List reviews for the salon
     if request.method == 'GET':
         # Salon owners see all reviews (including pending), public sees only approved
-        is_salon_owner = request.user.is_authenticated and salon.owner == request.user
-        
-        print(f"DEBUG: Fetching reviews for salon_id={salon_id}, salon={salon.name}")
-        print(f"DEBUG: User authenticated={request.user.is_authenticated}, is_salon_owner={is_salon_owner}")
+        is_salon_owner = request.user.is_authenticated and salon.owner_id == request.user.id
         
         if is_salon_owner:
             # Salon owner sees all reviews
             reviews = Review.objects.filter(
                 salon=salon
-            ).select_related('customer', 'booking').order_by('-created_at')
-            print(f"DEBUG: Salon owner - found {reviews.count()} reviews")
+            ).select_related('customer', 'salon').order_by('-created_at')
         else:
             # Public sees only approved reviews
             reviews = Review.objects.filter(
                 salon=salon,
                 status='approved'
-            ).select_related('customer', 'booking').order_by('-created_at')
-            print(f"DEBUG: Public - found {reviews.count()} approved reviews")
-        
-        # Debug: Show all reviews in database for this salon
-        all_reviews = Review.objects.filter(salon=salon)
-        print(f"DEBUG: Total reviews in DB for this salon: {all_reviews.count()}")
-        for r in all_reviews:
-            print(f"  - Review ID={r.id}, Customer={r.customer.email}, Rating={r.rating}, Status={r.status}")
+            ).select_related('customer', 'salon').order_by('-created_at')
         
         # Filter by rating if provided
         rating_filter = request.GET.get('rating')
@@ -1317,14 +1378,10 @@ def salon_reviews(request, salon_id):
         
         serializer = ReviewSerializer(reviews_page, many=True, context={'request': request})
         
-        # Get rating breakdown
-        rating_breakdown = {
-            '5': reviews.filter(rating=5).count(),
-            '4': reviews.filter(rating=4).count(),
-            '3': reviews.filter(rating=3).count(),
-            '2': reviews.filter(rating=2).count(),
-            '1': reviews.filter(rating=1).count(),
-        }
+        # Get rating breakdown (one grouped query)
+        rating_breakdown = {str(rating): 0 for rating in range(5, 0, -1)}
+        for rating, count in reviews.order_by().values_list('rating').annotate(count=models.Count('id')):
+            rating_breakdown[str(rating)] = count
         
         return Response({
             'reviews': serializer.data,
@@ -1357,6 +1414,7 @@ def salon_reviews(request, salon_id):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(8)
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def review_detail(request, review_id):
@@ -1423,6 +1481,7 @@ def review_detail(request, review_id):
         }, status=status.HTTP_200_OK)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def respond_to_review(request, review_id):
@@ -1452,6 +1511,7 @@ def respond_to_review(request, review_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(4)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_review_helpful(request, review_id):
@@ -1470,6 +1530,7 @@ def mark_review_helpful(request, review_id):
     }, status=status.HTTP_200_OK)
 
 
+@query_budget(5)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_reviews(request):
@@ -1484,6 +1545,7 @@ def my_reviews(request):
     }, status=status.HTTP_200_OK)
 
 
+@query_budget(3)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def pending_reviews(request):
@@ -1491,16 +1553,17 @@ def pending_reviews(request):
     if not (request.user.is_staff or request.user.is_superuser):
         return Response({'error': 'Admin privileges required'}, status=status.HTTP_403_FORBIDDEN)
     
-    reviews = Review.objects.filter(status='pending').select_related('customer', 'salon', 'booking')
+    reviews = Review.objects.filter(status='pending').select_related('customer', 'salon')
     
     serializer = ReviewSerializer(reviews, many=True, context={'request': request})
     
     return Response({
         'reviews': serializer.data,
-        'total': reviews.count()
+        'total': len(serializer.data)
     }, status=status.HTTP_200_OK)
 
 
+@query_budget(9)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def moderate_review(request, review_id):
@@ -1530,6 +1593,7 @@ def moderate_review(request, review_id):
     }, status=status.HTTP_200_OK)
 
 
+@query_budget(4)
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def update_salon_profile(request):
@@ -1596,6 +1660,7 @@ def update_salon_profile(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_salon_logo(request):
@@ -1629,9 +1694,10 @@ def upload_salon_logo(request):
                 'error': 'Only JPEG, PNG, GIF, and WebP images are allowed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save logo
+        # Save logo; thumb/card variants are built in the background
         salon.logo = logo
         salon.save()
+        queue_image_variants(salon, 'logo', logo)
         
         # Get logo URL (Cloudinary returns full URL, no need for build_absolute_uri)
         logo_url = salon.logo.url if salon.logo else None
@@ -1658,6 +1724,7 @@ def upload_salon_logo(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@query_budget(6)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def upload_salon_cover(request):
@@ -1691,9 +1758,10 @@ def upload_salon_cover(request):
                 'error': 'Only JPEG, PNG, GIF, and WebP images are allowed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save cover image
+        # Save cover image; card/hero variants are built in the background
         salon.cover_image = cover_image
         salon.save()
+        queue_image_variants(salon, 'cover_image', cover_image)
         
         # Get cover URL (Cloudinary returns full URL, no need for build_absolute_uri)
         cover_url = salon.cover_image.url if salon.cover_image else None
@@ -4,8 +4,11 @@ if (typeof window.API_BASE_URL === 'undefined') {
     console.warn('⚠️ API_BASE_URL was undefined in admin-applications.js, using fallback:', window.API_BASE_URL);
 }
 
+// Applications loaded so far for the current tab; more are fetched a page at a time
 let allApplications = [];
 let currentFilter = 'all';
+let hasMoreApplications = false;
+const applicationsPerPage = 20;
 
 // Load applications on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -20,7 +23,7 @@ function loadAdminData() {
     }
 }
 
-async function loadApplications() {
+async function loadApplications(append = false) {
     try {
         const accessToken = localStorage.getItem('access_token');
         
@@ -29,16 +32,24 @@ async function loadApplications() {
             return;
         }
         
-        const response = await fetch(`${window.API_BASE_URL}/api/salons/applications/`, {
+        const params = new URLSearchParams({
+            status: currentFilter,
+            limit: applicationsPerPage,
+            offset: append ? allApplications.length : 0
+        });
+        
+        const response = await fetch(`${window.API_BASE_URL}/api/salons/applications/?${params}`, {
             headers: {
                 'Authorization': `Bearer ${accessToken}`
             }
         });
         
         if (response.ok) {
-            allApplications = await response.json();
-            updateStats();
-            filterApplications(currentFilter);
+            const data = await response.json();
+            allApplications = append ? allApplications.concat(data.applications) : data.applications;
+            hasMoreApplications = data.pagination.has_more;
+            updateStats(data.counts);
+            displayApplications(allApplications);
         } else {
             const error = await response.json();
             console.error('API Error:', error);
@@ -86,15 +97,15 @@ async function loadApplications() {
     }
 }
 
-function updateStats() {
-    const pending = allApplications.filter(app => app.status === 'pending').length;
-    const approved = allApplications.filter(app => app.status === 'approved').length;
-    const rejected = allApplications.filter(app => app.status === 'rejected').length;
+function updateStats(counts) {
+    const pending = counts.pending;
+    const approved = counts.approved;
+    const rejected = counts.rejected;
     
     document.getElementById('pendingStats').textContent = pending;
     document.getElementById('approvedStats').textContent = approved;
     document.getElementById('rejectedStats').textContent = rejected;
-    document.getElementById('totalStats').textContent = allApplications.length;
+    document.getElementById('totalStats').textContent = counts.total;
     
     document.getElementById('pendingCount').textContent = pending;
     document.getElementById('tabPending').textContent = pending;
@@ -113,12 +124,12 @@ function filterApplications(status) {
         }
     });
     
-    // Filter applications
-    const filtered = status === 'all' 
-        ? allApplications 
-        : allApplications.filter(app => app.status === status);
-    
-    displayApplications(filtered);
+    // Load the first page of this tab from the server
+    loadApplications();
+}
+
+function loadMoreApplications() {
+    loadApplications(true);
 }
 
 function displayApplications(applications) {
@@ -194,7 +205,13 @@ function displayApplications(applications) {
                 ` : ''}
             </div>
         </div>
-    `).join('');
+    `).join('') + (hasMoreApplications ? `
+        <div class="empty-state">
+            <button class="btn-secondary" onclick="loadMoreApplications()">
+                <i class="fas fa-chevron-down"></i> Load more
+            </button>
+        </div>
+    ` : '');
 }
 
 function viewApplication(appId) {
@@ -6,10 +6,12 @@ if (typeof window.API_BASE_URL === 'undefined') {
     console.warn('⚠️ API_BASE_URL was undefined in admin-users.js, using fallback:', window.API_BASE_URL);
 }
 
+// Only the current page of users is loaded; filtering and paging happen on the server
 let allUsers = [];
-let filteredUsers = [];
+let totalFilteredUsers = 0;
 let currentPage = 1;
 const usersPerPage = 10;
+let filterTimeout = null;
 
 // Initialize page
 document.addEventListener('DOMContentLoaded', function() {
@@ -60,14 +62,39 @@ function loadUserInfo() {
     }
 }
 
-// Load all users from API
-async function loadAllUsers() {
+// Filters and search currently applied to the user list
+function buildUserFilters() {
+    const params = new URLSearchParams();
+    
+    const searchTerm = document.getElementById('userSearch').value.trim();
+    const typeFilter = document.getElementById('userTypeFilter').value;
+    const statusFilter = document.getElementById('statusFilter').value;
+    
+    if (searchTerm) params.set('search', searchTerm);
+    if (typeFilter) params.set('user_type', typeFilter);
+    if (statusFilter) params.set('is_active', statusFilter === 'active' ? 'true' : 'false');
+    
+    return params;
+}
+
+// Build the query string for the current page, filters and search
+function buildUsersQuery(includeStats) {
+    const params = buildUserFilters();
+    params.set('limit', usersPerPage);
+    params.set('offset', (currentPage - 1) * usersPerPage);
+    if (includeStats) params.set('stats', '1');
+    
+    return params.toString();
+}
+
+// Load the current page of users from API (stats only on first load and refresh)
+async function loadAllUsers(includeStats = true) {
     try {
         console.log('Loading users...');
         const token = localStorage.getItem('access_token');
         console.log('Token:', token ? 'Found' : 'Not found');
         
-        const response = await fetch(`${window.API_BASE_URL}/api/accounts/users/`, {
+        const response = await fetch(`${window.API_BASE_URL}/api/accounts/users/?${buildUsersQuery(includeStats)}`, {
             headers: {
                 'Authorization': `Bearer ${token}`,
                 'Content-Type': 'application/json'
@@ -77,10 +104,13 @@ async function loadAllUsers() {
         console.log('Response status:', response.status);
         
         if (response.ok) {
-            allUsers = await response.json();
-            console.log('Users loaded:', allUsers.length, allUsers);
-            filteredUsers = [...allUsers];
-            updateUserStatistics();
+            const data = await response.json();
+            allUsers = data.users;
+            totalFilteredUsers = data.pagination.total_count;
+            console.log('Users loaded:', allUsers.length, 'of', totalFilteredUsers);
+            if (data.stats) {
+                updateUserStatistics(data.stats);
+            }
             displayUsers();
             createPagination();
         } else {
@@ -124,7 +154,7 @@ async function loadAllUsers() {
                     date_joined: new Date(Date.now() - 172800000).toISOString()
                 }
             ];
-            filteredUsers = [...allUsers];
+            totalFilteredUsers = allUsers.length;
             updateUserStatistics();
             displayUsers();
             createPagination();
@@ -161,32 +191,34 @@ async function loadAllUsers() {
                 date_joined: new Date(Date.now() - 86400000).toISOString()
             }
         ];
-        filteredUsers = [...allUsers];
+        totalFilteredUsers = allUsers.length;
         updateUserStatistics();
         displayUsers();
         createPagination();
     }
 }
 
-// Update user statistics
-function updateUserStatistics() {
-    const totalUsers = allUsers.length;
-    const customers = allUsers.filter(user => user.user_type === 'customer').length;
-    const salonOwners = allUsers.filter(user => user.user_type === 'salon_owner').length;
-    const admins = allUsers.filter(user => user.is_staff || user.is_superuser).length;
-    
-    document.getElementById('totalUsersCount').textContent = totalUsers;
-    document.getElementById('customersCount').textContent = customers;
-    document.getElementById('salonOwnersCount').textContent = salonOwners;
-    document.getElementById('adminsCount').textContent = admins;
+// Update user statistics (server totals, or counted from the sample data)
+function updateUserStatistics(stats) {
+    if (!stats) {
+        stats = {
+            total: allUsers.length,
+            customers: allUsers.filter(user => user.user_type === 'customer').length,
+            salon_owners: allUsers.filter(user => user.user_type === 'salon_owner').length,
+            admins: allUsers.filter(user => user.is_staff || user.is_superuser).length
+        };
+    }
+    
+    document.getElementById('totalUsersCount').textContent = stats.total;
+    document.getElementById('customersCount').textContent = stats.customers;
+    document.getElementById('salonOwnersCount').textContent = stats.salon_owners;
+    document.getElementById('adminsCount').textContent = stats.admins;
 }
 
 // Display users in table
 function displayUsers() {
     const tbody = document.getElementById('usersTableBody');
-    const start = (currentPage - 1) * usersPerPage;
-    const end = start + usersPerPage;
-    const paginatedUsers = filteredUsers.slice(start, end);
+    const paginatedUsers = allUsers;
     
     if (paginatedUsers.length === 0) {
         tbody.innerHTML = '<tr><td colspan="8" class="no-data">No users found</td></tr>';
@@ -235,38 +267,18 @@ function getUserTypeLabel(user) {
     return 'Customer';
 }
 
-// Filter users
+// Filter users (debounced, so typing in the search box sends one request)
 function filterUsers() {
-    const searchTerm = document.getElementById('userSearch').value.toLowerCase();
-    const typeFilter = document.getElementById('userTypeFilter').value;
-    const statusFilter = document.getElementById('statusFilter').value;
-    
-    filteredUsers = allUsers.filter(user => {
-        const matchesSearch = 
-            user.first_name.toLowerCase().includes(searchTerm) ||
-            user.last_name.toLowerCase().includes(searchTerm) ||
-            user.email.toLowerCase().includes(searchTerm) ||
-            (user.phone && user.phone.includes(searchTerm));
-        
-        const matchesType = !typeFilter || 
-            (typeFilter === 'admin' && (user.is_staff || user.is_superuser)) ||
-            (typeFilter !== 'admin' && user.user_type === typeFilter);
-        
-        const matchesStatus = !statusFilter ||
-            (statusFilter === 'active' && user.is_active) ||
-            (statusFilter === 'inactive' && !user.is_active);
-        
-        return matchesSearch && matchesType && matchesStatus;
-    });
-    
-    currentPage = 1;
-    displayUsers();
-    createPagination();
+    clearTimeout(filterTimeout);
+    filterTimeout = setTimeout(() => {
+        currentPage = 1;
+        loadAllUsers(false);
+    }, 300);
 }
 
 // Create pagination
 function createPagination() {
-    const totalPages = Math.ceil(filteredUsers.length / usersPerPage);
+    const totalPages = Math.ceil(totalFilteredUsers / usersPerPage);
     const pagination = document.getElementById('usersPagination');
     
     if (totalPages <= 1) {
@@ -312,11 +324,10 @@ function createPagination() {
 
 // Change page
 function changePage(page) {
-    const totalPages = Math.ceil(filteredUsers.length / usersPerPage);
+    const totalPages = Math.ceil(totalFilteredUsers / usersPerPage);
     if (page >= 1 && page <= totalPages) {
         currentPage = page;
-        displayUsers();
-        createPagination();
+        loadAllUsers(false);
     }
 }
 
@@ -458,25 +469,32 @@ function refreshUsers() {
     loadAllUsers();
 }
 
-// Export users
-function exportUsers() {
+// Export every user matching the current filters (streamed by the server, not just the page on screen)
+async function exportUsers() {
     try {
-        const csvContent = "data:text/csv;charset=utf-8," 
-            + "ID,First Name,Last Name,Email,Phone,User Type,Status,Date Joined\n"
-            + filteredUsers.map(user => 
-                `${user.id},"${user.first_name}","${user.last_name}","${user.email}","${user.phone || ''}","${getUserTypeLabel(user)}","${user.is_active ? 'Active' : 'Inactive'}","${formatDate(user.date_joined)}"`
-            ).join("\n");
+        const token = localStorage.getItem('access_token');
+        const response = await fetch(`${window.API_BASE_URL}/api/accounts/users/export/?${buildUserFilters()}`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+        
+        if (!response.ok) {
+            throw new Error(`Export failed: ${response.status}`);
+        }
         
-        const encodedUri = encodeURI(csvContent);
+        const url = URL.createObjectURL(await response.blob());
         const link = document.createElement("a");
-        link.setAttribute("href", encodedUri);
+        link.setAttribute("href", url);
         link.setAttribute("download", `salon_users_${new Date().toISOString().split('T')[0]}.csv`);
         document.body.appendChild(link);
         link.click();
         document.body.removeChild(link);
+        URL.revokeObjectURL(url);
         
         showNotification('Users exported successfully', 'success');
     } catch (error) {
+        console.error('Error exporting users:', error);
         showNotification('Error exporting users', 'error');
     }
 }
@@ -568,7 +586,7 @@ document.getElementById('editUserForm').addEventListener('submit', async functio
         
         showNotification('User updated successfully (demo)', 'success');
         closeModal('editUserModal');
-        filterUsers(); // Refresh display
+        displayUsers(); // Refresh display
         
     } catch (error) {
         console.error('Error updating user:', error);
@@ -594,11 +594,14 @@ class ChatManager {
             let contentHTML = '';
             // Check for image in multiple possible fields (image, image_url, or content for external URLs)
             const imageUrl = message.image || message.image_url;
+            // Lists show the thumbnail; clicking opens the web-sized image
+            const thumbnailUrl = message.image_thumbnail || imageUrl;
             
             if ((message.message_type === 'image' || message.message_type === 'gif' || message.message_type === 'sticker') && imageUrl) {
                 const fullImageUrl = imageUrl.startsWith('http') ? imageUrl : `${window.API_BASE_URL}${imageUrl}`;
+                const fullThumbnailUrl = thumbnailUrl.startsWith('http') ? thumbnailUrl : `${window.API_BASE_URL}${thumbnailUrl}`;
                 const cssClass = message.message_type === 'sticker' ? 'chat-sticker' : 'chat-image';
-                contentHTML = `<img src="${fullImageUrl}" alt="${message.message_type}" class="${cssClass}" onclick="window.open('${fullImageUrl}', '_blank')">`;
+                contentHTML = `<img src="${fullThumbnailUrl}" alt="${message.message_type}" class="${cssClass}" loading="lazy" onclick="window.open('${fullImageUrl}', '_blank')">`;
             } else if ((message.message_type === 'gif' || message.message_type === 'sticker') && message.content && message.content.startsWith('http')) {
                 const cssClass = message.message_type === 'sticker' ? 'chat-sticker' : 'chat-image';
                 contentHTML = `<img src="${message.content}" alt="${message.message_type}" class="${cssClass}" onclick="window.open('${message.content}', '_blank')">`;
@@ -1558,11 +1561,14 @@ class SalonChatManager {
             let contentHTML = '';
             // Check for image in multiple possible fields (image, image_url, or content for external URLs)
             const imageUrl = message.image || message.image_url;
+            // Lists show the thumbnail; clicking opens the web-sized image
+            const thumbnailUrl = message.image_thumbnail || imageUrl;
             
             if ((message.message_type === 'image' || message.message_type === 'gif' || message.message_type === 'sticker') && imageUrl) {
                 const fullImageUrl = imageUrl.startsWith('http') ? imageUrl : `${window.API_BASE_URL}${imageUrl}`;
+                const fullThumbnailUrl = thumbnailUrl.startsWith('http') ? thumbnailUrl : `${window.API_BASE_URL}${thumbnailUrl}`;
                 const cssClass = message.message_type === 'sticker' ? 'chat-sticker' : 'chat-image';
-                contentHTML = `<img src="${fullImageUrl}" alt="${message.message_type}" class="${cssClass}" onclick="window.open('${fullImageUrl}', '_blank')">`;
+                contentHTML = `<img src="${fullThumbnailUrl}" alt="${message.message_type}" class="${cssClass}" loading="lazy" onclick="window.open('${fullImageUrl}', '_blank')">`;
             } else if ((message.message_type === 'gif' || message.message_type === 'sticker') && message.content && message.content.startsWith('http')) {
                 const cssClass = message.message_type === 'sticker' ? 'chat-sticker' : 'chat-image';
                 contentHTML = `<img src="${message.content}" alt="${message.message_type}" class="${cssClass}" onclick="window.open('${message.content}', '_blank')">`;
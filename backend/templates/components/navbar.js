@@ -66,21 +66,25 @@ function loadNavbar() {
 // Load existing notifications from API
 async function loadExistingNotifications() {
     try {
-        const response = await authenticatedFetchNavbar(`${window.API_BASE_URL}/api/notifications/`);
+        const response = await authenticatedFetchNavbar(`${window.API_BASE_URL}/api/notifications/?compact=true`);
         
         if (!response || !response.ok) {
             console.log('Could not load notifications');
             return;
         }
         
-        const notifications = await response.json();
+        // Latest page only; the badge uses the server-side unread counter
+        const data = await response.json();
+        const notifications = data.results || [];
         
         // Store in localStorage for offline access
         localStorage.setItem('salon_notifications', JSON.stringify(notifications));
         
         if (notifications.length > 0) {
-            // Count only unread notifications for badge
-            const unreadCount = notifications.filter(n => !n.is_read).length;
+            const countResponse = await authenticatedFetchNavbar(`${window.API_BASE_URL}/api/notifications/unread_count/`);
+            const unreadCount = countResponse && countResponse.ok
+                ? (await countResponse.json()).unread_count
+                : notifications.filter(n => !n.is_read).length;
             
             // Show badge with unread count
             const badge = document.getElementById('notificationBadge');
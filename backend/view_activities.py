@@ -1,49 +1,327 @@
 #!/usr/bin/env python3
 """
-Activity Log Viewer - View recent user and salon activities
+Activity Log Viewer - Query user and salon activities
 Usage: python view_activities.py [options]
+
+Reads the JSON-lines activity logs (live file plus rotated .gz segments).
+Tail queries read the live file backwards through mmap. Each segment gets a
+sidecar `.idx` file with the byte offset of every hour and the offsets of
+every line per user, salon, booking and transaction id, so filtered queries
+only touch the lines they return. Indexes are built on first use and then
+extended incrementally as the live file grows.
 """
 
 import os
+import re
+import sys
+import glob
+import gzip
+import json
+import mmap
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-def read_log_file(file_path, lines=10):
-    """Read last N lines from log file"""
-    if not os.path.exists(file_path):
-        return f"❌ Log file not found: {file_path}"
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-            
-        if not all_lines:
-            return f"📝 Log file is empty: {file_path}"
-            
-        # Get last N non-empty lines
-        recent_lines = [line.strip() for line in all_lines if line.strip()]
-        recent_lines = recent_lines[-lines:] if len(recent_lines) > lines else recent_lines
-        
-        return recent_lines
-    except Exception as e:
-        return f"❌ Error reading log file: {e}"
+LOG_STREAMS = {
+    'user': 'user_activities',
+    'salon': 'salon_activities',
+}
+
+INDEX_VERSION = 1
+HOUR_FORMAT = '%Y%m%d%H'
+SEGMENT_PATTERN = re.compile(r'\.(\d{8}-\d{6})(?:-(\d+))?\.jsonl\.gz$')
+
+
+# ----------------------------------------------------------------------
+# Segments and sidecar indexes
+# ----------------------------------------------------------------------
+
+def segment_paths(logs_dir, stem):
+    """Rotated segments oldest first, then the live file"""
+    def rotation_order(path):
+        match = SEGMENT_PATTERN.search(path)
+        return (match.group(1), int(match.group(2) or 0)) if match else ('', 0)
+
+    rotated = sorted(glob.glob(os.path.join(logs_dir, f'{stem}.*.jsonl.gz')), key=rotation_order)
+    live = os.path.join(logs_dir, f'{stem}.jsonl')
+    return rotated + ([live] if os.path.exists(live) else [])
+
+
+def is_compressed(path):
+    return path.endswith('.gz')
+
+
+def parse_ts(value):
+    return datetime.fromisoformat(value)
+
+
+def hour_key(ts):
+    return ts.astimezone(timezone.utc).strftime(HOUR_FORMAT)
+
+
+def entity_keys(entry):
+    """Index keys for a log entry, e.g. user:6, salon:2, booking:13"""
+    keys = []
+    user = entry.get('user') or {}
+    if user.get('id') is not None:
+        keys.append(f"user:{user['id']}")
+    salon = entry.get('salon') or {}
+    if salon.get('id') is not None:
+        keys.append(f"salon:{salon['id']}")
+    details = entry.get('details') or {}
+    if details.get('booking_id') is not None:
+        keys.append(f"booking:{details['booking_id']}")
+    transaction_id = details.get('transaction_id')
+    if transaction_id is not None:
+        digits = re.sub(r'\D', '', str(transaction_id))
+        if digits:
+            keys.append(f'transaction:{int(digits)}')
+    return keys
+
+
+def empty_index(stat):
+    return {
+        'version': INDEX_VERSION,
+        'inode': stat.st_ino,
+        'indexed_bytes': 0,
+        'first_ts': None,
+        'last_ts': None,
+        'hours': {},
+        'entities': {},
+    }
+
+
+def load_index(path, rebuild=False):
+    """
+    Load the sidecar index for a segment, extending or rebuilding it as needed
+
+    Rotated segments never change, so their index is built once. The live file
+    is append-only: only bytes past `indexed_bytes` are scanned, unless the file
+    was rotated (new inode) or truncated, in which case it is rebuilt.
+    """
+    index_path = f'{path}.idx'
+    stat = os.stat(path)
+    index = None
+
+    if not rebuild and os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+
+    if index is not None and index.get('version') != INDEX_VERSION:
+        index = None
+    if index is not None and not is_compressed(path):
+        if index['inode'] != stat.st_ino or index['indexed_bytes'] > stat.st_size:
+            index = None  # rotated or truncated since it was indexed
+    if index is not None and (is_compressed(path) or index['indexed_bytes'] == stat.st_size):
+        return index
+
+    if index is None:
+        index = empty_index(stat)
+
+    if extend_index(path, index):
+        tmp_path = f'{index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+    return index
+
+
+def extend_index(path, index):
+    """Scan complete lines after index['indexed_bytes']. Returns True if anything was added."""
+    opener = gzip.open if is_compressed(path) else open
+    start = index['indexed_bytes']
+    added = False
+
+    with opener(path, 'rb') as f:
+        if start:
+            f.seek(start)
+        offset = start
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break  # partially written last line, index it next time
+            try:
+                entry = json.loads(raw)
+                ts = parse_ts(entry['ts'])
+            except (ValueError, KeyError):
+                offset += len(raw)
+                continue
+
+            # First and last line offset of every hour (workers can interleave slightly)
+            hour = index['hours'].setdefault(hour_key(ts), [offset, offset])
+            hour[1] = offset
+            for key in entity_keys(entry):
+                index['entities'].setdefault(key, []).append(offset)
+            if index['first_ts'] is None:
+                index['first_ts'] = entry['ts']
+            index['last_ts'] = entry['ts']
+
+            offset += len(raw)
+            added = True
+
+    if offset != index['indexed_bytes']:
+        index['indexed_bytes'] = offset
+        added = True
+    return added
+
+
+def offset_range(index, since=None, until=None):
+    """Byte range [start, end) holding every line in [since, until], from the hour index"""
+    start, end = 0, index['indexed_bytes']
+    if since is not None:
+        since_hour = hour_key(since)
+        firsts = [first for hour, (first, last) in index['hours'].items() if hour >= since_hour]
+        start = min(firsts) if firsts else end
+    if until is not None:
+        until_hour = hour_key(until)
+        lasts = [last for hour, (first, last) in index['hours'].items() if hour <= until_hour]
+        end = max(lasts) + 1 if lasts else start
+    return start, end
+
+
+def segment_overlaps(index, since=None, until=None):
+    if index['first_ts'] is None:
+        return False
+    if since is not None and parse_ts(index['last_ts']) < since:
+        return False
+    if until is not None and parse_ts(index['first_ts']) > until:
+        return False
+    return True
+
+
+# ----------------------------------------------------------------------
+# Reading lines
+# ----------------------------------------------------------------------
+
+def iter_lines_reverse(path, start=0, end=None):
+    """Yield complete lines starting in [start, end) from the end backwards"""
+    if is_compressed(path):
+        # Segments are size-bounded, so decompressing one range into memory is fine
+        with gzip.open(path, 'rb') as f:
+            f.seek(start)
+            # Read through the end of the line that starts just before `end`
+            data = f.read() if end is None else f.read(end - start) + f.readline()
+        lines = data.split(b'\n')
+        if data and not data.endswith(b'\n'):
+            lines = lines[:-1]
+        for line in reversed(lines):
+            if line:
+                yield line
+        return
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            limit = size if end is None else min(end, size)
+            # Last complete line starting before `limit`
+            line_end = mm.find(b'\n', limit - 1) if limit < size else mm.rfind(b'\n')
+            if line_end == -1:
+                line_end = mm.rfind(b'\n', 0, limit)
+            while line_end >= start and line_end > 0:
+                line_start = mm.rfind(b'\n', 0, line_end) + 1
+                if line_start < start:
+                    break
+                if line_end > line_start:
+                    yield mm[line_start:line_end]
+                line_end = line_start - 1
+
+
+def read_lines_at(path, offsets):
+    """Read the lines starting at the given byte offsets (ascending)"""
+    if is_compressed(path):
+        with gzip.open(path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)  # forward seek decompresses only up to the offset
+                yield f.readline().rstrip(b'\n')
+        return
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in offsets:
+                line_end = mm.find(b'\n', offset)
+                yield mm[offset:line_end if line_end != -1 else len(mm)]
 
-def format_activity_line(line):
-    """Format a log line for better readability"""
+
+# ----------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------
+
+def matches(entry, since=None, until=None, action=None):
+    ts = parse_ts(entry['ts'])
+    if since is not None and ts < since:
+        return False
+    if until is not None and ts > until:
+        return False
+    if action and action.upper() not in entry.get('action', '').upper():
+        return False
+    return True
+
+
+def query_stream(logs_dir, stem, limit, entity=None, since=None, until=None, action=None, rebuild=False):
+    """
+    Newest-first entries from one stream
+
+    Args:
+        entity: Index key such as 'booking:123' (None for a plain tail)
+        since/until: Aware datetimes bounding the entries
+        action: Case-insensitive substring of the action
+    """
+    results = []
+    for path in reversed(segment_paths(logs_dir, stem)):
+        index = load_index(path, rebuild=rebuild)
+        if not segment_overlaps(index, since, until):
+            if since is not None and index['last_ts'] and parse_ts(index['last_ts']) < since:
+                break  # every older segment is older still
+            continue
+
+        start, end = offset_range(index, since, until)
+
+        if entity is None:
+            lines = iter_lines_reverse(path, start, end)
+        else:
+            offsets = [o for o in index['entities'].get(entity, []) if start <= o < end]
+            lines = reversed(list(read_lines_at(path, offsets)))
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if matches(entry, since, until, action):
+                results.append(entry)
+                if len(results) >= limit:
+                    return results
+    return results
+
+
+def parse_when(value):
+    """'7d', '24h', '30m' relative to now, or an ISO date/datetime (local time if naive)"""
+    if value is None:
+        return None
+    relative = re.fullmatch(r'(\d+)([dhm])', value)
+    if relative:
+        amount, unit = int(relative.group(1)), relative.group(2)
+        delta = {'d': timedelta(days=amount), 'h': timedelta(hours=amount), 'm': timedelta(minutes=amount)}[unit]
+        return datetime.now(timezone.utc) - delta
+    when = datetime.fromisoformat(value)
+    return when if when.tzinfo else when.astimezone()
+
+
+# ----------------------------------------------------------------------
+# Output
+# ----------------------------------------------------------------------
+
+def format_activity(entry):
+    """Format a log entry for better readability"""
     try:
-        # Split the line into components
-        parts = line.split(' | ')
-        if len(parts) < 3:
-            return line
-            
-        timestamp = parts[0]
-        actor = parts[1]
-        action_part = parts[2]
-        
-        # Parse timestamp
-        dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-        time_ago = datetime.now() - dt
-        
+        dt = parse_ts(entry['ts'])
+        time_ago = datetime.now(timezone.utc) - dt
+
         if time_ago.days > 0:
             time_str = f"{time_ago.days}d ago"
         elif time_ago.seconds > 3600:
@@ -54,10 +332,13 @@ def format_activity_line(line):
             time_str = f"{minutes}m ago"
         else:
             time_str = "just now"
-            
-        # Extract action
-        action = action_part.split(': ')[1].split(' | ')[0] if ': ' in action_part else action_part
-        
+
+        if entry.get('stream') == 'salon':
+            actor = f"{entry['salon']['name']} (ID: {entry['salon']['id']})"
+        else:
+            actor = f"{entry['user']['email']} (ID: {entry['user']['id']})"
+        action = entry['action']
+
         # Color coding based on action type
         if 'LOGIN' in action:
             emoji = '[LOGIN]'
@@ -73,138 +354,58 @@ def format_activity_line(line):
             emoji = '[ERROR]'
         else:
             emoji = '[INFO]'
-            
+
         return f"{emoji} {time_str:>8} | {actor:>30} | {action}"
-        
-    except Exception as e:
-        return line
-
-def view_activities(user_lines=10, salon_lines=10, filter_action=None, since_hours=None):
-    """View recent activities from both log files"""
-    
-    # Define log file paths
-    user_log = os.path.join('logs', 'user_activities.txt')
-    salon_log = os.path.join('logs', 'salon_activities.txt')
-    
-    print("=" + "="*80)
-    print("SALON BOOKING SYSTEM - ACTIVITY VIEWER")
-    print("=" + "="*80)
-    print()
-    
-    # User Activities
-    print(f"USER ACTIVITIES (Last {user_lines} entries)")
-    print("-" * 60)
-    
-    user_activities = read_log_file(user_log, user_lines)
-    if isinstance(user_activities, str):
-        print(user_activities)
-    else:
-        filtered_activities = []
-        
-        for line in user_activities:
-            # Apply time filter
-            if since_hours:
-                try:
-                    timestamp_str = line.split(' | ')[0]
-                    line_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                    cutoff_time = datetime.now() - timedelta(hours=since_hours)
-                    if line_time < cutoff_time:
-                        continue
-                except:
-                    pass
-                    
-            # Apply action filter
-            if filter_action and filter_action.upper() not in line.upper():
-                continue
-                
-            filtered_activities.append(line)
-        
-        if not filtered_activities:
-            print("No matching activities found")
-        else:
-            for line in filtered_activities:
-                print(format_activity_line(line))
-    
-    print()
-    
-    # Salon Activities  
-    print(f"SALON ACTIVITIES (Last {salon_lines} entries)")
-    print("-" * 60)
-    
-    salon_activities = read_log_file(salon_log, salon_lines)
-    if isinstance(salon_activities, str):
-        print(salon_activities)
-    else:
-        filtered_activities = []
-        
-        for line in salon_activities:
-            # Apply time filter
-            if since_hours:
-                try:
-                    timestamp_str = line.split(' | ')[0]
-                    line_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                    cutoff_time = datetime.now() - timedelta(hours=since_hours)
-                    if line_time < cutoff_time:
-                        continue
-                except:
-                    pass
-                    
-            # Apply action filter
-            if filter_action and filter_action.upper() not in line.upper():
-                continue
-                
-            filtered_activities.append(line)
-        
-        if not filtered_activities:
-            print("No matching activities found")
-        else:
-            for line in filtered_activities:
-                print(format_activity_line(line))
-    
-    print()
-    print("=" + "="*80)
-    
-    # Statistics
+
+    except (KeyError, TypeError, ValueError):
+        return json.dumps(entry)
+
+
+def format_bytes(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f}{unit}"
+        size /= 1024.0
+    return f"{size:.1f}TB"
+
+
+def print_statistics(logs_dir, file=sys.stdout):
+    print("STATISTICS:", file=file)
+    for stream, stem in LOG_STREAMS.items():
+        paths = segment_paths(logs_dir, stem)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"   {stream.title()} Log: {len(paths)} segment(s), {format_bytes(size)} on disk", file=file)
+
+
+def default_logs_dir():
+    """ACTIVITY_LOG_DIR from the Django settings, where activity_logger writes"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, script_dir)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon_booking.settings')
     try:
-        user_total = len(open(user_log, 'r').readlines()) if os.path.exists(user_log) else 0
-        salon_total = len(open(salon_log, 'r').readlines()) if os.path.exists(salon_log) else 0
-        
-        print(f"STATISTICS:")
-        print(f"   Total User Activities: {user_total}")
-        print(f"   Total Salon Activities: {salon_total}")
-        print(f"   Total Activities: {user_total + salon_total}")
-        
-        # Log file sizes
-        user_size = os.path.getsize(user_log) if os.path.exists(user_log) else 0
-        salon_size = os.path.getsize(salon_log) if os.path.exists(salon_log) else 0
-        
-        def format_bytes(bytes):
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if bytes < 1024.0:
-                    return f"{bytes:.1f}{unit}"
-                bytes /= 1024.0
-            return f"{bytes:.1f}TB"
-            
-        print(f"   User Log Size: {format_bytes(user_size)}")
-        print(f"   Salon Log Size: {format_bytes(salon_size)}")
-        
+        from django.conf import settings
+        return settings.ACTIVITY_LOG_DIR
     except Exception as e:
-        print(f"Error calculating statistics: {e}")
+        fallback = os.environ.get('ACTIVITY_LOG_DIR') or os.path.join(script_dir, 'logs')
+        print(f"Could not load Django settings ({e}); reading {fallback}", file=sys.stderr)
+        return fallback
+
 
 def main():
     parser = argparse.ArgumentParser(
-        description='View recent activities from salon booking system logs',
+        description='Query activities from salon booking system logs',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
-  python view_activities.py                    # View last 10 activities from each log
-  python view_activities.py -u 20 -s 15       # View last 20 user and 15 salon activities
-  python view_activities.py -f LOGIN          # Filter for LOGIN activities only
-  python view_activities.py -t 2              # Show activities from last 2 hours
-  python view_activities.py -f PAYMENT -t 24  # Show payment activities from last 24 hours
+  python view_activities.py                       # Last 10 activities from each log
+  python view_activities.py -u 20 -s 15          # Last 20 user and 15 salon activities
+  python view_activities.py -f LOGIN             # LOGIN activities only
+  python view_activities.py -t 2                 # Activities from the last 2 hours
+  python view_activities.py --booking 123 --since 7d   # Everything on booking #123 last week
+  python view_activities.py --user 6 --json      # Raw JSON for user #6
         """
     )
-    
+
     parser.add_argument('-u', '--user-lines', type=int, default=10,
                        help='Number of user activity lines to show (default: 10)')
     parser.add_argument('-s', '--salon-lines', type=int, default=10,
@@ -213,15 +414,59 @@ Examples:
                        help='Filter activities by action (e.g., LOGIN, BOOKING, PAYMENT)')
     parser.add_argument('-t', '--since-hours', type=int,
                        help='Show activities from last N hours only')
-    
+    parser.add_argument('--since', type=str,
+                       help="Start of the time range: 7d, 24h, 30m or an ISO date")
+    parser.add_argument('--until', type=str,
+                       help='End of the time range (same formats as --since)')
+    parser.add_argument('--user', type=int, help='Only activities by or about this user id')
+    parser.add_argument('--salon', type=int, help='Only activities for this salon id')
+    parser.add_argument('--booking', type=int, help='Only activities for this booking id')
+    parser.add_argument('--transaction', type=int, help='Only activities for this transaction id')
+    parser.add_argument('--json', action='store_true',
+                       help='Print only raw JSON lines (headers and statistics go to stderr)')
+    parser.add_argument('--reindex', action='store_true', help='Rebuild the sidecar indexes')
+    parser.add_argument('--logs-dir', default=None,
+                       help='Directory holding the activity logs (default: ACTIVITY_LOG_DIR from the settings)')
+
     args = parser.parse_args()
-    
-    view_activities(
-        user_lines=args.user_lines,
-        salon_lines=args.salon_lines,
-        filter_action=args.filter,
-        since_hours=args.since_hours
-    )
+    logs_dir = args.logs_dir or default_logs_dir()
+    # Keep stdout to the JSON lines when piping into jq and the like
+    out = sys.stderr if args.json else sys.stdout
+
+    since = parse_when(args.since)
+    if args.since_hours:
+        since = datetime.now(timezone.utc) - timedelta(hours=args.since_hours)
+    until = parse_when(args.until)
+
+    entity = None
+    for kind in ('user', 'salon', 'booking', 'transaction'):
+        if getattr(args, kind) is not None:
+            entity = f'{kind}:{getattr(args, kind)}'
+
+    print("=" + "=" * 80, file=out)
+    print("SALON BOOKING SYSTEM - ACTIVITY VIEWER", file=out)
+    print("=" + "=" * 80, file=out)
+    print(file=out)
+
+    for stream, limit in (('user', args.user_lines), ('salon', args.salon_lines)):
+        if limit <= 0:
+            continue
+        print(f"{stream.upper()} ACTIVITIES (Last {limit} entries)", file=out)
+        print("-" * 60, file=out)
+
+        entries = query_stream(
+            logs_dir, LOG_STREAMS[stream], limit,
+            entity=entity, since=since, until=until, action=args.filter, rebuild=args.reindex
+        )
+        if not entries:
+            print("No matching activities found", file=out)
+        for entry in reversed(entries):
+            print(json.dumps(entry) if args.json else format_activity(entry))
+        print(file=out)
+
+    print("=" + "=" * 80, file=out)
+    print_statistics(logs_dir, file=out)
+
 
 if __name__ == '__main__':
     main()
@@ -231,7 +231,9 @@ function displaySalonInfo() {
     const coverEl = document.getElementById('salonCover');
     if (coverEl) {
         if (salonData.cover_image_url || salonData.cover_image) {
-            const rawUrl = salonData.cover_image_url || 
+            // The header is full width: prefer the hero variant over the listing-sized card
+            const heroUrl = salonData.cover_image_variants && salonData.cover_image_variants.hero;
+            const rawUrl = heroUrl || salonData.cover_image_url || 
                 (salonData.cover_image.startsWith('http') 
                     ? salonData.cover_image 
                     : `${window.API_BASE_URL}${salonData.cover_image}`);